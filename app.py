@@ -2,19 +2,41 @@ import io
 import os
 import sys
 import string
+import time
 from pathlib import Path
 
 import streamlit as st
+import streamlit.components.v1 as components
 from PIL import Image
 
 from src.lineup.io_google import (
-    fetch_google_sheet_csv,
+    clear_sheet_names_cache,
     fetch_google_sheet_names,
-    load_lineup_colors_from_csv,
     load_screens_from_google_csv,
 )
-from src.lineup.renderer import RenderOptions, render_lineup_png
-from src.lineup.models import ScreenSpec, TileType, validate_screen_against_tiles
+from src.lineup.audit import audit_outputs
+from src.lineup.contact import contact_sheet_size, render_contact_sheet
+from src.lineup.export import (
+    encode_png,
+    export_filename,
+    export_pngs_to_dir,
+    export_variant_matrix,
+    iter_png_zip,
+    iter_rendered_pngs,
+    lineup_file_prefix,
+    variant_matrix_count,
+)
+from src.lineup.deepzoom import get_deepzoom_server
+from src.lineup.downloads import get_download_server
+from src.lineup.pool import RenderRejected, estimate_render_cost, get_render_pool
+from src.lineup.prefetch import Prefetcher
+from src.lineup.profiling import SamplingProfiler
+from src.lineup.preview import PreviewRenderer
+from src.lineup.renderer import RenderOptions, render_spec_key
+from src.lineup.snapshot import SnapshotRevalidator, open_show, snapshot_path
+from src.lineup.vector import render_lineup_pdf, render_lineup_svg
+from src.lineup.catalog import ScreenCatalog
+from src.lineup.models import ScreenSpec, TileType
 from src.lineup.palette import PALETTE
 
 st.set_page_config(page_title="Lineup Guide Generator", layout="wide")
@@ -41,6 +63,32 @@ def _normalize_hex_color(value: str) -> str | None:
         return None
     return f"#{raw.upper()}"
 
+def _get_default_output_dir() -> Path:
+    if getattr(sys, "frozen", False):
+        exe_path = Path(sys.executable).resolve()
+        if sys.platform == "darwin" and "Contents" in exe_path.parts:
+            # Move outside the .app bundle.
+            try:
+                app_bundle = exe_path.parents[2]
+                return app_bundle.parent / "outputs"
+            except IndexError:
+                pass
+        return exe_path.parent / "outputs"
+    return Path.cwd() / "outputs"
+
+def _side_server_host() -> str:
+    """Address the app's helper HTTP servers bind to: the one Streamlit serves on."""
+    return os.environ.get("LINEUP_HTTP_HOST") or st.get_option("server.address") or "0.0.0.0"
+
+def _browser_url(port: int, path: str) -> str:
+    """URL of a helper server path as reached from this session's browser."""
+    host = os.environ.get("LINEUP_PUBLIC_HOST")
+    if not host:
+        # The host the browser used for the app also reaches the helper ports.
+        headers = getattr(getattr(st, "context", None), "headers", None) or {}
+        host = (headers.get("Host") or "").rsplit(":", 1)[0] or "localhost"
+    return f"http://{host}:{port}{path}"
+
 st.markdown(
     """
     <style>
@@ -58,6 +106,8 @@ data_source = st.radio("Data source", ["Google Sheets", "Upload CSV", "Manual En
 tiles = None
 screens = None
 lineup_colors: dict[str, str] = {}
+# Seconds between background checks of a Google Sheet for edits
+SHEET_RECHECK_S = 30
 
 if data_source == "Upload CSV":
     sheet_file = st.file_uploader("Screen notes CSV", type=["csv"], key="screen_notes")
@@ -85,13 +135,11 @@ elif data_source == "Google Sheets":
     def _get_sheet_names(url: str) -> list[str]:
         return fetch_google_sheet_names(url)
 
-    @st.cache_data(show_spinner=False)
-    def _get_lineup_colors(url: str) -> dict[str, str]:
-        colors_text = fetch_google_sheet_csv(url, sheet_name="LineupColors")
-        return load_lineup_colors_from_csv(colors_text)
-
     if refresh_clicked:
         st.cache_data.clear()
+        clear_sheet_names_cache()
+        st.session_state.pop("show_snapshot", None)
+        st.session_state["force_sheet_fetch"] = True
         st.rerun()
 
     if not sheet_url:
@@ -103,13 +151,49 @@ elif data_source == "Google Sheets":
         value="",
     ).strip() or None
 
+    snapshot_dir = _get_default_output_dir().parent / "snapshots"
+
+    def _open_sheet_show(url: str, name: str | None):
+        # A show opened before loads from its snapshot next to outputs/ with no
+        # fetch; the live sheet is re-checked in the background (and every
+        # SHEET_RECHECK_S after that) and swapped in if it changed.
+        state = st.session_state.get("show_snapshot")
+        if state is None or state["key"] != (url, name):
+            snap, revalidator = open_show(url, snapshot_dir, sheet_name=name, colors_source=url)
+            # Refresh waits for the live sheet instead of showing the saved copy first.
+            if st.session_state.pop("force_sheet_fetch", False) and revalidator is not None:
+                revalidator.wait()
+            state = {
+                "key": (url, name),
+                "snapshot": snap,
+                "revalidator": revalidator,
+                "checked_at": time.monotonic(),
+                # Fetched just now, or confirmed against the live sheet since opening
+                "verified": revalidator is None,
+            }
+            st.session_state["show_snapshot"] = state
+        revalidator = state["revalidator"]
+        status = revalidator.status if revalidator is not None else None
+        if status == "updated":
+            state["snapshot"] = revalidator.snapshot
+            st.toast("The sheet changed; showing the latest version.")
+        elif status == "failed":
+            st.caption(f"Showing the saved copy of this sheet; the live sheet could not be checked: {revalidator.error}")
+        elif status == "checking" and not state["verified"]:
+            saved = time.strftime("%Y-%m-%d %H:%M", time.localtime(state["snapshot"].saved_at))
+            st.caption(f"Opened the copy saved {saved}; checking the live sheet for changes...")
+        if status in {"fresh", "updated"}:
+            state["verified"] = True
+        if status not in {None, "checking"}:
+            state["revalidator"] = None
+        if state["revalidator"] is None and time.monotonic() - state["checked_at"] > SHEET_RECHECK_S:
+            state["revalidator"] = SnapshotRevalidator(state["snapshot"], snapshot_path(snapshot_dir, url, name))
+            state["checked_at"] = time.monotonic()
+        return state["snapshot"]
+
     try:
-        try:
-            lineup_colors = _get_lineup_colors(sheet_url)
-        except Exception:
-            lineup_colors = {}
-        sheet_text = fetch_google_sheet_csv(sheet_url, sheet_name=sheet_name)
-        tiles, screens = load_screens_from_google_csv(sheet_text, lineup_colors=lineup_colors)
+        show = _open_sheet_show(sheet_url, sheet_name)
+        tiles, screens, lineup_colors = show.tiles, show.screens, show.lineup_colors
     except ValueError as exc:
         st.error(str(exc))
         st.stop()
@@ -218,62 +302,47 @@ lineup_type_map = {
 }
 lineup_type_label = lineup_type_map[lineup_type]
 
-def _has_tile_specs(spec) -> bool:
-    return spec.default_tile_type_id in tiles
-
-def _has_expected_size(spec) -> bool:
-    return (spec.expected_w_px or 0) > 0 and (spec.expected_h_px or 0) > 0
-
-def _has_delivery_label(spec) -> bool:
-    return bool(spec.tile_label)
+def _get_catalog(screens: list[ScreenSpec], tiles: dict[str, TileType]) -> ScreenCatalog:
+    # Built once per loaded show; reruns with the same data only do lookups.
+    show_key = (tuple(screens), tuple(sorted(tiles.items())))
+    cached = st.session_state.get("screen_catalog")
+    if cached is None or cached[0] != show_key:
+        cached = (show_key, ScreenCatalog(screens, tiles))
+        st.session_state["screen_catalog"] = cached
+    return cached[1]
+
+catalog = _get_catalog(screens, tiles)
+if catalog.duplicate_names:
+    st.warning(
+        "Duplicate screen names: " + ", ".join(catalog.duplicate_names)
+        + ". They are listed with their delivery labels."
+    )
+if catalog.duplicate_labels:
+    st.warning(
+        "Duplicate delivery labels: " + ", ".join(catalog.duplicate_labels)
+        + ". Exports with the same label overwrite each other."
+    )
 
-if lineup_type_label == "CircleXGrid":
-    eligible_screens = [s for s in screens if _has_expected_size(s) and _has_delivery_label(s)]
-    if not eligible_screens:
+eligible_entries = catalog.eligible(lineup_type_label)
+if not eligible_entries:
+    if lineup_type_label == "CircleXGrid":
         st.error("No screens with delivery label + pixel width/height (columns D/F/G).")
-        st.stop()
-elif lineup_type_label == "GreyscaleSteps":
-    eligible_screens = [
-        s for s in screens if _has_delivery_label(s) and (_has_tile_specs(s) or _has_expected_size(s))
-    ]
-    if not eligible_screens:
+    elif lineup_type_label == "GreyscaleSteps":
         st.error("No screens with delivery label + either tile specs or pixel width/height.")
-        st.stop()
-else:
-    eligible_screens = [s for s in screens if _has_tile_specs(s)]
-    if not eligible_screens:
+    else:
         st.error("No screens with LED tile specs (cols/rows + tile pixel size).")
-        st.stop()
+    st.stop()
+eligible_screens = [entry.screen for entry in eligible_entries]
 
-screen_names = [s.screen_name for s in eligible_screens]
-selected = st.selectbox("Select a screen", screen_names)
-screen = next(s for s in eligible_screens if s.screen_name == selected)
-
-if lineup_type_label == "CircleXGrid":
-    warnings = []
-    if not _has_delivery_label(screen):
-        warnings.append("Delivery label (column D) is required.")
-    if not _has_expected_size(screen):
-        warnings.append("Pixels width/height (columns F/G) are required for Circle X Grid.")
-elif lineup_type_label == "GreyscaleSteps":
-    warnings = []
-    if not _has_delivery_label(screen):
-        warnings.append("Delivery label (column D) is required.")
-    if not (_has_tile_specs(screen) or _has_expected_size(screen)):
-        warnings.append("Greyscale needs either tile specs or pixels width/height.")
-else:
-    warnings = validate_screen_against_tiles(screen, tiles)
+eligible_names = [entry.display_name for entry in eligible_entries]
+selected = st.selectbox("Select a screen", eligible_names)
+selected_entry = catalog.get(selected)
+screen = selected_entry.screen
 
+warnings = selected_entry.warnings[lineup_type_label]
 if warnings:
     st.warning("\n".join(f"- {w}" for w in warnings))
 
-if lineup_type_label == "RGB" and screen.default_tile_type_id not in tiles:
-    st.error("RGB requires LED tile specs (cols/rows + tile pixel size).")
-    st.stop()
-if lineup_type_label == "GreyscaleSteps" and not (_has_tile_specs(screen) or _has_expected_size(screen)):
-    st.error("Greyscale requires tile specs or pixel width/height.")
-    st.stop()
-
 if lineup_type_label in {"CircleXGrid", "GreyscaleSteps"} and warnings:
     st.stop()
 
@@ -302,43 +371,141 @@ opts = RenderOptions(
     branding_image=branding_image,
     circlex_grid_black_bg=circlex_black_bg,
 )
-img = render_lineup_png(screen, tiles, opts)
+# Renders from every session share one pool, so concurrent large previews queue
+# instead of exhausting memory.
+render_status = st.empty()
+
+
+def _render_wait_notice(status):
+    def on_wait(position: int) -> None:
+        if position:
+            status.info(f"Waiting for a render slot (#{position} in the queue)...")
+        else:
+            status.info("Rendering...")
+
+    return on_wait
+
+
+_show_render_wait = _render_wait_notice(render_status)
+
+
+def _latest_manual_preview() -> Image.Image:
+    # Manual Entry reruns on every edit: render in the background, debounced,
+    # and let each new spec abandon the render it supersedes.
+    preview = st.session_state.get("preview_renderer")
+    if preview is None:
+        preview = st.session_state["preview_renderer"] = PreviewRenderer()
+    key = preview.submit(screen, tiles, opts)
+    stale = preview.last_image
+    if stale is not None:
+        render_status.image(stale, use_container_width=True)
+    wait_note = st.empty()
+    while True:
+        latest = preview.wait(key, 0.2)
+        if latest is not None:
+            wait_note.empty()
+            return latest
+        # Streamlit only interrupts a superseded run at an st call.
+        wait_note.caption("Updating preview...")
+
+
+def _prefetched_preview() -> Image.Image:
+    # Operators click through the screen list in order: serve earlier
+    # speculative renders, then queue the neighbors of this selection as
+    # background work that never delays an interactive render.
+    prefetcher = st.session_state.get("prefetcher")
+    if prefetcher is None:
+        prefetcher = st.session_state["prefetcher"] = Prefetcher()
+    cached = prefetcher.get(screen, tiles, opts)
+    if cached is None:
+        cached = get_render_pool().render(screen, tiles, opts, on_wait=_show_render_wait)
+        prefetcher.remember(screen, tiles, opts, cached)
+    prefetcher.schedule(eligible_screens, tiles, opts, eligible_names.index(selected))
+    return cached
+
+
+try:
+    if data_source == "Manual Entry":
+        # A show's speculative renders are of no use to manual entry.
+        stale_prefetcher = st.session_state.pop("prefetcher", None)
+        if stale_prefetcher is not None:
+            stale_prefetcher.close()
+        img = _latest_manual_preview()
+    else:
+        # Free the manual preview's last full-size image once it is no longer shown.
+        stale_preview = st.session_state.pop("preview_renderer", None)
+        if stale_preview is not None:
+            stale_preview.close()
+        img = _prefetched_preview()
+except RenderRejected as exc:
+    render_status.error(str(exc))
+    st.stop()
+render_status.empty()
 
-st.image(img, caption=f"{screen.screen_name} ({img.width}x{img.height})", use_container_width=True)
+deep_zoom = st.toggle(
+    "Deep zoom",
+    value=False,
+    help="Zoom and pan the full-resolution render to check tile numbers and label fit.",
+)
+if deep_zoom:
+    # The spec key identifies the pixels, so reruns reuse the pyramid. It is only
+    # recomputed when the preview image itself changes.
+    zoom_img, zoom_key = st.session_state.get("deepzoom_key", (None, None))
+    if zoom_img is not img:
+        zoom_key = render_spec_key(screen, tiles, opts)
+        st.session_state["deepzoom_key"] = (img, zoom_key)
+    deepzoom = get_deepzoom_server(_side_server_host())
+    components.iframe(_browser_url(deepzoom.port, deepzoom.publish(zoom_key, img)), height=700)
+    st.caption(f"{screen.screen_name} ({img.width}x{img.height})")
+else:
+    st.image(img, caption=f"{screen.screen_name} ({img.width}x{img.height})", use_container_width=True)
 
 st.header("Export")
 
-def _get_default_output_dir() -> Path:
-    if getattr(sys, "frozen", False):
-        exe_path = Path(sys.executable).resolve()
-        if sys.platform == "darwin" and "Contents" in exe_path.parts:
-            # Move outside the .app bundle.
-            try:
-                app_bundle = exe_path.parents[2]
-                return app_bundle.parent / "outputs"
-            except IndexError:
-                pass
-        return exe_path.parent / "outputs"
-    return Path.cwd() / "outputs"
-
 default_out_dir = _get_default_output_dir()
 version = st.text_input("Version", value="v001").strip() or "v001"
 overlay_suffix = "_OV" if show_overlay else ""
-if lineup_type_label == "GreyscaleSteps":
-    file_prefix = "GREY"
-elif lineup_type_label == "CircleXGrid":
-    file_prefix = "CircleX"
-else:
-    file_prefix = lineup_type_label
-default_out_name = f"{file_prefix}{overlay_suffix}_{screen.tile_label}_{version}.png"
+file_prefix = lineup_file_prefix(lineup_type_label)
+default_out_name = export_filename(screen.tile_label, lineup_type_label, show_overlay, version)
 out_name = st.text_input("Output Filename", value=default_out_name)
 out_dir = st.text_input("Output Folder", value=str(default_out_dir))
 out_path_dir = Path(out_dir)
 if not out_path_dir.is_absolute():
     out_path_dir = default_out_dir.parent / out_path_dir
 out_path_dir.mkdir(parents=True, exist_ok=True)
+hardlink_identical = st.checkbox(
+    "Hard-link identical exports",
+    value=False,
+    help="Screens whose PNGs are byte-identical share one file on disk instead of separate copies.",
+)
+write_manifest = st.checkbox(
+    "Write export manifest",
+    value=False,
+    help="Record each PNG's screen data and digest in lineup-manifest.json so an audit can spot stale files.",
+)
+profile_exports = st.checkbox(
+    "Profile batch exports",
+    value=False,
+    help="Sample where export time goes and save a flame graph (open it at speedscope.app) "
+    "plus a hotspot summary next to the PNGs. Attach both to slow-export reports.",
+)
+
+
+def _start_export_profile() -> SamplingProfiler | None:
+    return SamplingProfiler().start() if profile_exports else None
+
+
+def _finish_export_profile(profiler: SamplingProfiler | None) -> None:
+    if profiler is None:
+        return
+    profiler.stop()
+    profile_path = out_path_dir / f"export_profile_{version}_{time.strftime('%Y%m%d-%H%M%S')}.speedscope.json"
+    summary_path = profiler.write(profile_path)
+    st.info(f"Profile saved: {profile_path.name} and {summary_path.name}")
+    st.code(profiler.format_summary(), language=None)
 
-btn_col1, btn_col2, _btn_spacer = st.columns([1, 1, 8])
+
+btn_col1, btn_col2, btn_col3, btn_col4, _btn_spacer = st.columns([1, 1, 1, 1, 6])
 
 if btn_col1.button("Export PNG"):
     out_path = out_path_dir / out_name
@@ -358,8 +525,124 @@ if btn_col1.button("Export PNG"):
 if btn_col2.button("Export ALL PNGs"):
     progress = st.progress(0)
     total = len(eligible_screens)
-    for idx, scr in enumerate(eligible_screens, start=1):
-        out_path = out_path_dir / f"{file_prefix}{overlay_suffix}_{scr.tile_label}_{version}.png"
-        render_lineup_png(scr, tiles, opts).save(out_path, format="PNG")
-        progress.progress(idx / total)
+    profiler = _start_export_profile()
+    try:
+        export_pngs_to_dir(
+            eligible_screens,
+            tiles,
+            opts,
+            out_path_dir,
+            version,
+            hardlink_identical=hardlink_identical,
+            progress=lambda done: progress.progress(done / total),
+            profiler=profiler,
+            write_manifest=write_manifest,
+            render_pool=get_render_pool(),
+        )
+    finally:
+        _finish_export_profile(profiler)
     st.success(f"Saved {total} files to: {out_path_dir.resolve()}")
+
+if btn_col3.button("ZIP ALL PNGs"):
+    # The archive is rendered, encoded and streamed to the browser one screen at
+    # a time by the download server; it is never held in memory or spooled to disk.
+    # Each frame takes its share of the render pool's budget while it is encoded.
+    zip_screens, zip_opts = list(eligible_screens), opts
+    downloads = get_download_server(_side_server_host())
+    zip_path = downloads.register(
+        f"{file_prefix}{overlay_suffix}_{version}.zip",
+        lambda: iter_png_zip(iter_rendered_pngs(zip_screens, tiles, zip_opts, version, get_render_pool())),
+        "application/zip",
+    )
+    st.link_button("Download ZIP", _browser_url(downloads.port, zip_path))
+
+if btn_col4.button("Export SVG + PDF", help="Vector proofs for review; PNGs remain the playback deliverable."):
+    svg_name = export_filename(screen.tile_label, lineup_type_label, show_overlay, version, ext="svg")
+    pdf_name = export_filename(screen.tile_label, lineup_type_label, show_overlay, version, ext="pdf")
+    vector_status = st.empty()
+    try:
+        # Vector proofs hold no canvas, but the rasterized branding scales with
+        # it, so the raster estimate bounds them from above.
+        svg_text, pdf_data = get_render_pool().run(
+            lambda: (render_lineup_svg(screen, tiles, opts), render_lineup_pdf(screen, tiles, opts)),
+            *estimate_render_cost(screen, tiles, opts),
+            on_wait=_render_wait_notice(vector_status),
+        )
+    except RenderRejected as exc:
+        vector_status.error(str(exc))
+        st.stop()
+    vector_status.empty()
+    (out_path_dir / svg_name).write_text(svg_text, encoding="utf-8")
+    (out_path_dir / pdf_name).write_bytes(pdf_data)
+    st.success(f"Saved {svg_name} and {pdf_name} to: {out_path_dir.resolve()}")
+    st.download_button(label="Download SVG", data=svg_text, file_name=svg_name, mime="image/svg+xml")
+    st.download_button(label="Download PDF", data=pdf_data, file_name=pdf_name, mime="application/pdf")
+
+with st.expander("Export all variants"):
+    st.caption("Exports every selected lineup type, with and/or without the overlay, in one pass.")
+    overlay_choices = {"With overlay (_OV)": True, "Without overlay": False}
+    matrix_types = st.multiselect("Lineup types", list(lineup_type_map), default=list(lineup_type_map))
+    matrix_overlays = st.multiselect("Overlay", list(overlay_choices), default=list(overlay_choices))
+    if st.button("Export variant matrix"):
+        types = [lineup_type_map[label] for label in matrix_types]
+        states = [overlay_choices[label] for label in matrix_overlays]
+        total = variant_matrix_count(catalog, types, states)
+        if not total:
+            st.warning("No eligible screens for the selected variants.")
+        else:
+            progress = st.progress(0)
+            profiler = _start_export_profile()
+            try:
+                export_variant_matrix(
+                    catalog,
+                    opts,
+                    out_path_dir,
+                    version,
+                    lineup_types=types,
+                    overlay_states=states,
+                    hardlink_identical=hardlink_identical,
+                    progress=lambda done: progress.progress(done / total),
+                    profiler=profiler,
+                    write_manifest=write_manifest,
+                    render_pool=get_render_pool(),
+                )
+            finally:
+                _finish_export_profile(profiler)
+            st.success(f"Saved {total} files to: {out_path_dir.resolve()}")
+
+with st.expander("Audit output folder"):
+    st.caption(
+        "Checks the PNGs already in the output folder against this show by reading only their headers: "
+        "missing, wrong-size, stale (needs a manifest) and unexpected files."
+    )
+    if st.button("Audit folder"):
+        report = audit_outputs(out_path_dir, catalog, version)
+        if report.ok:
+            st.success(report.format())
+        else:
+            st.warning(f"{len(report.issues)} issue(s) found.")
+            st.code(report.format(), language=None)
+
+with st.expander("Show overview"):
+    st.caption("One labeled image of every screen for the current lineup type, for approval emails.")
+    if st.button("Build contact sheet"):
+        sheet_title = f"{lineup_type_label} overview"
+        sheet_w, sheet_h = contact_sheet_size(catalog, opts, title=sheet_title)
+        sheet_status = st.empty()
+        try:
+            sheet = get_render_pool().run(
+                lambda: render_contact_sheet(catalog, opts, title=sheet_title),
+                sheet_w * sheet_h,
+                on_wait=_render_wait_notice(sheet_status),
+            )
+        except (ValueError, RenderRejected) as exc:
+            sheet_status.warning(str(exc))
+        else:
+            sheet_status.empty()
+            st.image(sheet, use_container_width=True)
+            st.download_button(
+                "Download contact sheet",
+                data=encode_png(sheet),
+                file_name=f"ContactSheet_{file_prefix}_{version}.png",
+                mime="image/png",
+            )
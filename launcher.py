@@ -8,11 +8,18 @@ from pathlib import Path
 
 import streamlit.web.cli as stcli
 
+from src.lineup.metrics import start_metrics_file_writer, start_metrics_server
+
 _ROOT = Path(getattr(sys, "_MEIPASS", Path(__file__).resolve().parent))
 APP_PATH = _ROOT / "app.py"
 LOG_PATH = Path(tempfile.gettempdir()) / "lineup_generator.log"
 STREAMLIT_PORT = 8501
 STREAMLIT_HOST = "127.0.0.1"
+# Prometheus text at http://127.0.0.1:8503/metrics; set LINEUP_METRICS_PORT=0 to disable.
+METRICS_PORT = int(os.environ.get("LINEUP_METRICS_PORT", "8503"))
+# Optional JSON snapshot path, rewritten every LINEUP_METRICS_INTERVAL seconds.
+METRICS_FILE = os.environ.get("LINEUP_METRICS_FILE")
+METRICS_INTERVAL = float(os.environ.get("LINEUP_METRICS_INTERVAL", "15"))
 
 
 def _write_log(text: str) -> None:
@@ -22,6 +29,19 @@ def _write_log(text: str) -> None:
         if not text.endswith("\n"):
             handle.write("\n")
 
+
+def _start_metrics() -> None:
+    # Streamlit runs app.py in this process, so the app's renders and exports
+    # land in the same registry the endpoint reads from.
+    if METRICS_PORT:
+        try:
+            start_metrics_server(STREAMLIT_HOST, METRICS_PORT)
+        except OSError as exc:
+            _write_log(f"Metrics endpoint disabled: could not bind port {METRICS_PORT} ({exc})")
+    if METRICS_FILE:
+        start_metrics_file_writer(Path(METRICS_FILE), METRICS_INTERVAL)
+
+
 def _run_streamlit() -> None:
     try:
         stcli.main()
@@ -57,6 +77,7 @@ def main() -> None:
         "--global.developmentMode",
         "false",
     ]
+    _start_metrics()
     _run_streamlit()
 
 
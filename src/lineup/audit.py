@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Sequence
+
+from .catalog import CatalogEntry, ScreenCatalog
+from .export import export_filename, lineup_file_prefix, read_manifest
+from .metrics import METRICS
+from .models import LINEUP_TYPES
+from .renderer import screen_spec_key
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Length, type, width, height, bit depth, color type, compression, filter, interlace
+_IHDR = struct.Struct(">I4sIIBBBBB")
+PNG_HEADER_BYTES = len(PNG_SIGNATURE) + _IHDR.size
+
+ISSUE_KINDS = ("missing", "unreadable", "wrong_size", "expected_size", "stale", "modified", "orphan")
+
+
+@dataclass(frozen=True)
+class PngHeader:
+    width: int
+    height: int
+    bit_depth: int
+    color_type: int
+
+
+def parse_png_header(data: bytes) -> PngHeader:
+    """Parse the signature and IHDR chunk at the start of a PNG file."""
+    if len(data) < PNG_HEADER_BYTES or not data.startswith(PNG_SIGNATURE):
+        raise ValueError("not a PNG file")
+    length, chunk, width, height, bit_depth, color_type, *_ = _IHDR.unpack_from(data, len(PNG_SIGNATURE))
+    if chunk != b"IHDR" or length != 13:
+        raise ValueError("PNG is missing its IHDR header")
+    return PngHeader(width, height, bit_depth, color_type)
+
+
+def read_png_header(path: Path) -> PngHeader:
+    """Read only the first PNG_HEADER_BYTES of `path`; pixel data is never decoded."""
+    with open(path, "rb") as f:
+        return parse_png_header(f.read(PNG_HEADER_BYTES))
+
+
+@dataclass(frozen=True)
+class AuditIssue:
+    kind: str
+    filename: str
+    detail: str = ""
+
+
+@dataclass
+class AuditReport:
+    out_dir: Path
+    # Files the show should have produced, per the audited variants
+    expected: int = 0
+    # Expected files found on disk
+    checked: int = 0
+    issues: list[AuditIssue] = field(default_factory=list)
+    used_manifest: bool = False
+    elapsed_s: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.issues
+
+    def by_kind(self) -> dict[str, list[AuditIssue]]:
+        grouped: dict[str, list[AuditIssue]] = {}
+        for issue in self.issues:
+            grouped.setdefault(issue.kind, []).append(issue)
+        return {kind: grouped[kind] for kind in ISSUE_KINDS if kind in grouped}
+
+    def format(self, limit: int = 20) -> str:
+        """Plain-text summary, listing up to `limit` files per kind of issue."""
+        lines = [
+            f"Audited {self.out_dir}: {self.checked}/{self.expected} expected file(s) present "
+            f"in {self.elapsed_s:.2f}s" + ("" if self.used_manifest else " (no manifest; stale files not checked)")
+        ]
+        for kind, issues in self.by_kind().items():
+            lines.append(f"{kind}: {len(issues)}")
+            for issue in issues[:limit]:
+                lines.append(f"  {issue.filename}" + (f"  {issue.detail}" if issue.detail else ""))
+            if len(issues) > limit:
+                lines.append(f"  ... and {len(issues) - limit} more")
+        if self.ok:
+            lines.append("No issues found.")
+        return "\n".join(lines)
+
+
+def _export_name_pattern(version: str) -> re.Pattern:
+    prefixes = sorted({lineup_file_prefix(t) for t in LINEUP_TYPES}, key=len, reverse=True)
+    return re.compile(rf"^(?:{'|'.join(map(re.escape, prefixes))})(?:_OV)?_.+_{re.escape(version)}\.png$")
+
+
+def _file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _inspect(path: Path, verify_digest: bool) -> tuple[Optional[PngHeader], Optional[str], str]:
+    """Return (header, sha256 or None, error) for one file."""
+    try:
+        header = read_png_header(path)
+        return header, _file_digest(path) if verify_digest else None, ""
+    except (OSError, ValueError) as exc:
+        return None, None, str(exc)
+
+
+@METRICS.timed("audit")
+def audit_outputs(
+    out_dir: Path,
+    catalog: ScreenCatalog,
+    version: str,
+    lineup_types: Optional[Sequence[str]] = None,
+    overlay_states: Optional[Sequence[bool]] = None,
+    verify_digests: bool = False,
+    max_workers: int = 16,
+) -> AuditReport:
+    """Check an export folder against a show without decoding any pixel data.
+
+    Files are matched to screens by export_filename. Each present file's size
+    comes from its PNG header and is compared with the canvas the catalog
+    expects for its lineup type (tile resolution, or the sheet's pixel size for
+    Circle X / greyscale); RGB files that match their tiles but not a filled-in
+    sheet pixel size are reported as `expected_size`. When the folder has an
+    export manifest, files rendered from different sheet data are `stale` and
+    files whose byte count (or, with `verify_digests`, sha256) no longer
+    matches are `modified`.
+
+    `lineup_types` and `overlay_states` default to the variants that have at
+    least one file in the folder, so a folder exported with `--overlay off` is
+    not reported as missing every overlay file. Other files named like an
+    export of this version are `orphan`s.
+    """
+    started = time.perf_counter()
+    out_dir = Path(out_dir)
+    report = AuditReport(out_dir)
+    pattern = _export_name_pattern(version)
+    present: dict[str, int] = {}
+    with os.scandir(out_dir) as it:
+        for item in it:
+            if item.is_file() and pattern.match(item.name):
+                present[item.name] = item.stat().st_size
+
+    audited = [
+        (t, ov)
+        for t in (LINEUP_TYPES if lineup_types is None else lineup_types)
+        for ov in ((True, False) if overlay_states is None else overlay_states)
+    ]
+    if lineup_types is None or overlay_states is None:
+        exported = [
+            (t, ov)
+            for t, ov in audited
+            if any(export_filename(e.screen.tile_label, t, ov, version) in present for e in catalog.eligible(t))
+        ]
+        audited = exported or audited
+
+    # Later screens with the same label overwrite earlier ones on export, so the last one wins here too.
+    expected: dict[str, tuple[CatalogEntry, str]] = {}
+    for lineup_type, show_overlay in audited:
+        for entry in catalog.eligible(lineup_type):
+            expected[export_filename(entry.screen.tile_label, lineup_type, show_overlay, version)] = (entry, lineup_type)
+    report.expected = len(expected)
+
+    manifest = read_manifest(out_dir)
+    report.used_manifest = bool(manifest)
+    names = [name for name in expected if name in present]
+    for name in expected:
+        if name not in present:
+            report.issues.append(AuditIssue("missing", name, expected[name][0].display_name))
+    for name in sorted(set(present) - set(expected)):
+        report.issues.append(AuditIssue("orphan", name))
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="lineup-audit") as pool:
+        results = pool.map(lambda n: _inspect(out_dir / n, verify_digests and n in manifest), names)
+        for name, (header, digest, error) in zip(names, results):
+            report.checked += 1
+            entry, lineup_type = expected[name]
+            if header is None:
+                report.issues.append(AuditIssue("unreadable", name, error))
+                continue
+            want = entry.canvas_sizes[lineup_type]
+            got = (header.width, header.height)
+            if got != want:
+                report.issues.append(AuditIssue("wrong_size", name, f"{got[0]}x{got[1]}, expected {want[0]}x{want[1]}"))
+            elif lineup_type == "RGB" and entry.screen.expected_w_px and entry.screen.expected_h_px:
+                sheet = (entry.screen.expected_w_px, entry.screen.expected_h_px)
+                if sheet != got:
+                    report.issues.append(
+                        AuditIssue("expected_size", name, f"{got[0]}x{got[1]} from tiles, sheet says {sheet[0]}x{sheet[1]}")
+                    )
+            recorded = manifest.get(name)
+            if recorded is None:
+                continue
+            if recorded.get("screen") != screen_spec_key(entry.screen, catalog.tiles):
+                report.issues.append(AuditIssue("stale", name, f"{entry.display_name} changed since export"))
+            if recorded.get("bytes") != present[name] or (digest is not None and recorded.get("sha256") != digest):
+                report.issues.append(AuditIssue("modified", name, "contents differ from the export manifest"))
+    report.elapsed_s = time.perf_counter() - started
+    return report
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional
+
+from .models import (
+    LINEUP_TYPES,
+    ScreenSpec,
+    TileType,
+    compute_row_tile_type_id,
+    screen_supports_lineup,
+    validate_screen_against_tiles,
+)
+from .renderer import lineup_canvas_size
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    screen: ScreenSpec
+    # Position in the loaded show; stable across lineup types
+    index: int
+    # Unique label for pickers; screen_name unless the name is duplicated
+    display_name: str
+    # Canvas (width, height) for each lineup type the screen can be rendered as
+    canvas_sizes: Dict[str, tuple[int, int]] = field(default_factory=dict)
+    warnings: Dict[str, tuple[str, ...]] = field(default_factory=dict)
+
+    @property
+    def resolution(self) -> Optional[tuple[int, int]]:
+        """Tile-derived resolution if known, else the expected pixel size."""
+        for lineup_type in ("RGB", "GreyscaleSteps", "CircleXGrid"):
+            if lineup_type in self.canvas_sizes:
+                return self.canvas_sizes[lineup_type]
+        return None
+
+    def supports(self, lineup_type: str) -> bool:
+        return lineup_type in self.canvas_sizes
+
+
+def _lineup_warnings(screen: ScreenSpec, tiles: Dict[str, TileType], lineup_type: str) -> list[str]:
+    has_expected_size = (screen.expected_w_px or 0) > 0 and (screen.expected_h_px or 0) > 0
+    if lineup_type == "CircleXGrid":
+        warnings = []
+        if not screen.tile_label:
+            warnings.append("Delivery label (column D) is required.")
+        if not has_expected_size:
+            warnings.append("Pixels width/height (columns F/G) are required for Circle X Grid.")
+        return warnings
+    if lineup_type == "GreyscaleSteps":
+        warnings = []
+        if not screen.tile_label:
+            warnings.append("Delivery label (column D) is required.")
+        if not (screen.default_tile_type_id in tiles or has_expected_size):
+            warnings.append("Greyscale needs either tile specs or pixels width/height.")
+        return warnings
+    return validate_screen_against_tiles(screen, tiles)
+
+
+def _canvas_size(screen: ScreenSpec, tiles: Dict[str, TileType], lineup_type: str) -> Optional[tuple[int, int]]:
+    if not screen_supports_lineup(screen, tiles, lineup_type):
+        return None
+    if lineup_type != "CircleXGrid" and not (
+        lineup_type == "GreyscaleSteps" and screen.expected_w_px and screen.expected_h_px
+    ):
+        # Rows on a tile type missing from the show would fail mid-render.
+        if any(compute_row_tile_type_id(screen, r) not in tiles for r in range(screen.rows)):
+            return None
+    w, h = lineup_canvas_size(screen, tiles, lineup_type)
+    return (w, h) if w > 0 and h > 0 else None
+
+
+class ScreenCatalog:
+    """Screens from one loaded show, indexed and pre-validated once.
+
+    Resolution, per-lineup-type eligibility and warnings are computed up front so
+    pickers and batch export only do lookups. Screens sharing a `screen_name`
+    are all kept; `duplicate_names` lists them and `display_name` tells them apart.
+    """
+
+    def __init__(self, screens: Iterable[ScreenSpec], tiles: Dict[str, TileType]) -> None:
+        self.tiles = tiles
+        screens = list(screens)
+
+        name_counts: dict[str, int] = {}
+        for scr in screens:
+            name_counts[scr.screen_name] = name_counts.get(scr.screen_name, 0) + 1
+
+        self.entries: list[CatalogEntry] = []
+        self._by_display_name: dict[str, CatalogEntry] = {}
+        self._by_name: dict[str, list[CatalogEntry]] = {}
+        self._by_label: dict[str, list[CatalogEntry]] = {}
+        self._by_tile_type: dict[str, list[CatalogEntry]] = {}
+        self._eligible: dict[str, list[CatalogEntry]] = {t: [] for t in LINEUP_TYPES}
+
+        for index, scr in enumerate(screens):
+            display_name = scr.screen_name
+            if name_counts[scr.screen_name] > 1:
+                display_name = f"{scr.screen_name} ({scr.tile_label})"
+            if display_name in self._by_display_name:
+                display_name = f"{display_name} #{index + 1}"
+
+            canvas_sizes = {}
+            for lineup_type in LINEUP_TYPES:
+                size = _canvas_size(scr, tiles, lineup_type)
+                if size is not None:
+                    canvas_sizes[lineup_type] = size
+            entry = CatalogEntry(
+                screen=scr,
+                index=index,
+                display_name=display_name,
+                canvas_sizes=canvas_sizes,
+                warnings={t: tuple(_lineup_warnings(scr, tiles, t)) for t in LINEUP_TYPES},
+            )
+
+            self.entries.append(entry)
+            self._by_display_name[display_name] = entry
+            self._by_name.setdefault(scr.screen_name, []).append(entry)
+            self._by_label.setdefault(scr.tile_label, []).append(entry)
+            tile_ids = {scr.default_tile_type_id, scr.secondary_tile_type_id} - {None}
+            for tile_id in sorted(tile_ids):
+                self._by_tile_type.setdefault(tile_id, []).append(entry)
+            for lineup_type in canvas_sizes:
+                self._eligible[lineup_type].append(entry)
+
+        self.duplicate_names = sorted(name for name, count in name_counts.items() if count > 1)
+        self.duplicate_labels = sorted(label for label, group in self._by_label.items() if len(group) > 1)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def eligible(self, lineup_type: str) -> list[CatalogEntry]:
+        """Entries that can be rendered as `lineup_type`, in show order."""
+        return self._eligible.get(lineup_type, [])
+
+    def eligible_screens(self, lineup_type: str) -> list[ScreenSpec]:
+        return [entry.screen for entry in self.eligible(lineup_type)]
+
+    def get(self, display_name: str) -> Optional[CatalogEntry]:
+        return self._by_display_name.get(display_name)
+
+    def by_name(self, screen_name: str) -> list[CatalogEntry]:
+        return self._by_name.get(screen_name, [])
+
+    def by_label(self, tile_label: str) -> list[CatalogEntry]:
+        return self._by_label.get(tile_label, [])
+
+    def by_tile_type(self, tile_type_id: str) -> list[CatalogEntry]:
+        return self._by_tile_type.get(tile_type_id, [])
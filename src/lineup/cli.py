@@ -0,0 +1,361 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+from .audit import audit_outputs
+from .catalog import ScreenCatalog
+from .contact import DEFAULT_THUMB_SIZE, render_contact_sheet
+from .export import export_variant_matrix, variant_matrix_count
+from .io_google import load_lineup_colors_from_csv, load_screens_from_google_csv
+from .loadtest import generate_screen_notes_csv, run_load_test, run_memory_benchmark
+from .models import LINEUP_TYPES
+from .profiling import DEFAULT_TOP, SamplingProfiler
+from .renderer import RenderOptions
+from .service import DEFAULT_HOST, DEFAULT_MAX_CANVAS_PIXELS, DEFAULT_PORT, RenderService, make_server
+from .snapshot import (
+    SNAPSHOT_SUFFIX,
+    SnapshotRevalidator,
+    build_snapshot,
+    fetch_show_source,
+    load_snapshot,
+    save_snapshot,
+    snapshot_path,
+)
+from .watch import ShowWatcher
+
+
+def _add_render_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--out", type=Path, default=Path("outputs"), help="Output folder (default: outputs)")
+    parser.add_argument("--lineup-type", choices=LINEUP_TYPES, default="RGB")
+    parser.add_argument("--no-overlay", action="store_true", help="Omit the screen name + resolution overlay")
+    parser.add_argument("--circlex-black-bg", action="store_true", help="Circle X Grid: black background")
+    parser.add_argument("--version", default="v001", help="Version suffix for filenames (default: v001)")
+    parser.add_argument("--colors", type=Path, help="LineupColors CSV (Name,Hex) used to resolve colors")
+
+
+def _render_options(args: argparse.Namespace) -> RenderOptions:
+    return RenderOptions(
+        show_overlay=not args.no_overlay,
+        lineup_type=args.lineup_type,
+        circlex_grid_black_bg=args.circlex_black_bg,
+    )
+
+
+def _lineup_colors(args: argparse.Namespace) -> dict[str, str] | None:
+    if args.colors is None:
+        return None
+    return load_lineup_colors_from_csv(args.colors.read_text(encoding="utf-8"))
+
+
+def _load_show(args: argparse.Namespace) -> tuple[dict, list, SnapshotRevalidator | None]:
+    """Load (tiles, screens, revalidator) from a screen notes CSV or a show snapshot.
+
+    A snapshot opens without parsing and is checked against its source while
+    the command runs; see _report_revalidation.
+    """
+    if args.path.suffix == SNAPSHOT_SUFFIX:
+        snap = load_snapshot(args.path)
+        return snap.tiles, snap.screens, SnapshotRevalidator(snap, args.path)
+    tiles, screens = load_screens_from_google_csv(
+        args.path.read_text(encoding="utf-8"), lineup_colors=_lineup_colors(args)
+    )
+    return tiles, screens, None
+
+
+def _report_revalidation(revalidator: SnapshotRevalidator | None) -> None:
+    if revalidator is None or not revalidator.wait(timeout=30):
+        return
+    if revalidator.status == "updated":
+        print(
+            f"Note: {revalidator.snapshot.source} changed since the snapshot was saved. "
+            f"{revalidator.path} now holds the latest version; re-run to use it.",
+            file=sys.stderr,
+        )
+    elif revalidator.status == "failed":
+        print(f"Note: could not check the snapshot's source ({revalidator.error}).", file=sys.stderr)
+
+
+def _cmd_watch(args: argparse.Namespace) -> int:
+    if not args.path.exists():
+        print(f"Not found: {args.path}", file=sys.stderr)
+        return 2
+    watcher = ShowWatcher(
+        args.path,
+        args.out,
+        _render_options(args),
+        args.version,
+        lineup_colors=_lineup_colors(args),
+        debounce_s=args.debounce,
+    )
+    print(f"Watching {args.path} -> {args.out.resolve()} (Ctrl+C to stop)")
+    try:
+        watcher.run(poll_s=args.poll)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _cmd_export(args: argparse.Namespace) -> int:
+    try:
+        tiles, screens, revalidator = _load_show(args)
+    except (OSError, ValueError) as exc:
+        print(f"Could not load {args.path}: {exc}", file=sys.stderr)
+        return 2
+    catalog = ScreenCatalog(screens, tiles)
+    overlay_states = {"on": (True,), "off": (False,), "both": (True, False)}[args.overlay]
+    total = variant_matrix_count(catalog, args.lineup_types, overlay_states)
+    args.out.mkdir(parents=True, exist_ok=True)
+    opts = RenderOptions(circlex_grid_black_bg=args.circlex_black_bg, render_workers=args.render_workers)
+    count = export_variant_matrix(
+        catalog,
+        opts,
+        args.out,
+        args.version,
+        lineup_types=args.lineup_types,
+        overlay_states=overlay_states,
+        hardlink_identical=args.hardlink,
+        progress=lambda done: print(f"\r{done}/{total}", end="", flush=True),
+        profiler=args.profiler,
+        write_manifest=args.manifest,
+    )
+    print(f"\nExported {count} PNG(s) to {args.out.resolve()}")
+    _report_revalidation(revalidator)
+    return 0
+
+
+def _cmd_audit(args: argparse.Namespace) -> int:
+    if not args.out.is_dir():
+        print(f"Not a folder: {args.out}", file=sys.stderr)
+        return 2
+    try:
+        tiles, screens, revalidator = _load_show(args)
+    except (OSError, ValueError) as exc:
+        print(f"Could not load {args.path}: {exc}", file=sys.stderr)
+        return 2
+    overlay_states = {"on": (True,), "off": (False,), "both": (True, False), None: None}[args.overlay]
+    report = audit_outputs(
+        args.out,
+        ScreenCatalog(screens, tiles),
+        args.version,
+        lineup_types=args.lineup_types,
+        overlay_states=overlay_states,
+        verify_digests=args.verify_digests,
+    )
+    print(report.format(limit=args.limit))
+    _report_revalidation(revalidator)
+    return 0 if report.ok else 1
+
+
+def _cmd_contact(args: argparse.Namespace) -> int:
+    try:
+        tiles, screens, revalidator = _load_show(args)
+        opts = RenderOptions(lineup_type=args.lineup_type, show_overlay=not args.no_overlay)
+        thumb_size = (args.thumb_width, round(args.thumb_width * DEFAULT_THUMB_SIZE[1] / DEFAULT_THUMB_SIZE[0]))
+        sheet = render_contact_sheet(
+            ScreenCatalog(screens, tiles), opts, thumb_size, columns=args.columns, title=args.title or args.path.stem
+        )
+    except (OSError, ValueError) as exc:
+        print(f"Could not build a contact sheet from {args.path}: {exc}", file=sys.stderr)
+        return 2
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    sheet.save(args.out)
+    print(f"Wrote {sheet.width}x{sheet.height} contact sheet to {args.out.resolve()}")
+    _report_revalidation(revalidator)
+    return 0
+
+
+def _cmd_snapshot(args: argparse.Namespace) -> int:
+    colors_source = str(args.colors) if args.colors else ""
+    if not colors_source and args.source.startswith(("http://", "https://")):
+        colors_source = args.source  # the sheet's own LineupColors tab, as in the app
+    try:
+        sheet_text, colors_text = fetch_show_source(args.source, args.sheet_name, colors_source)
+        snap = build_snapshot(args.source, sheet_text, colors_text, args.sheet_name, colors_source)
+    except (OSError, ValueError) as exc:
+        print(f"Could not load {args.source}: {exc}", file=sys.stderr)
+        return 2
+    path = args.out or snapshot_path(args.snapshot_dir, args.source, args.sheet_name)
+    save_snapshot(path, snap)
+    print(f"Saved {len(snap.screens)} screen(s), {len(snap.tiles)} tile type(s) to {Path(path).resolve()}")
+    return 0
+
+
+def _cmd_serve(args: argparse.Namespace) -> int:
+    service = RenderService(max_workers=args.workers, max_pending=args.max_pending, max_pixels=args.max_pixels)
+    server = make_server(service, args.host, args.port)
+    print(f"Render service on http://{args.host}:{server.server_port}/render (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+
+def _size_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        try:
+            mix[name.strip()] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"expected name=weight pairs, got {part!r}") from None
+    return mix
+
+
+def _cmd_loadtest(args: argparse.Namespace) -> int:
+    if args.write_csv:
+        args.write_csv.write_text(
+            generate_screen_notes_csv(
+                args.screens,
+                half_row_ratio=args.half_row_ratio,
+                playback_ratio=args.playback_ratio,
+                size_mix=args.size_mix,
+                seed=args.seed,
+            ),
+            encoding="utf-8",
+        )
+        print(f"Wrote {args.screens} synthetic screens to {args.write_csv}")
+        return 0
+    if args.memory:
+        print(
+            run_memory_benchmark(
+                args.screens,
+                seed=args.seed,
+                half_row_ratio=args.half_row_ratio,
+                playback_ratio=args.playback_ratio,
+                size_mix=args.size_mix,
+            ).format()
+        )
+        return 0
+    report = run_load_test(
+        args.screens,
+        seed=args.seed,
+        half_row_ratio=args.half_row_ratio,
+        playback_ratio=args.playback_ratio,
+        size_mix=args.size_mix,
+        latency_s=args.latency,
+        fetch_rounds=args.fetch_rounds,
+        lineup_types=args.lineup_types,
+        out_dir=args.out,
+    )
+    print(report.format())
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="lineup", description="Lineup Guide Generator command line tools")
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        help="Sample the command and write a flame graph here (.json: speedscope, .folded: collapsed stacks)",
+    )
+    parser.add_argument("--profile-top", type=int, default=DEFAULT_TOP, help="Hotspots listed per lineup type")
+    parser.set_defaults(profiler=None)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    watch = sub.add_parser("watch", help="Re-export changed screens whenever a screen notes CSV is saved")
+    watch.add_argument("path", type=Path, help="Screen notes CSV, or a folder of them")
+    _add_render_args(watch)
+    watch.add_argument("--debounce", type=float, default=2.0, help="Seconds of quiet before exporting")
+    watch.add_argument("--poll", type=float, default=0.5, help="Seconds between file checks")
+    watch.set_defaults(func=_cmd_watch)
+
+    export = sub.add_parser("export", help="Export every lineup type x overlay variant of a show in one pass")
+    export.add_argument("path", type=Path, help=f"Screen notes CSV or show snapshot ({SNAPSHOT_SUFFIX})")
+    export.add_argument("--out", type=Path, default=Path("outputs"), help="Output folder (default: outputs)")
+    export.add_argument("--lineup-types", nargs="+", choices=LINEUP_TYPES, default=list(LINEUP_TYPES))
+    export.add_argument("--overlay", choices=("on", "off", "both"), default="both")
+    export.add_argument("--circlex-black-bg", action="store_true", help="Circle X Grid: black background")
+    export.add_argument("--version", default="v001", help="Version suffix for filenames (default: v001)")
+    export.add_argument("--colors", type=Path, help="LineupColors CSV (Name,Hex) used to resolve colors")
+    export.add_argument("--hardlink", action="store_true", help="Hard-link byte-identical outputs")
+    export.add_argument(
+        "--render-workers", type=int, default=1, help="Processes per canvas for very large screens (default: 1)"
+    )
+    export.add_argument("--manifest", action="store_true", help="Record each file's screen and digest for `audit`")
+    export.set_defaults(func=_cmd_export)
+
+    audit = sub.add_parser("audit", help="Check an outputs folder for missing, stale or wrong-size PNGs")
+    audit.add_argument("path", type=Path, help=f"Screen notes CSV or show snapshot ({SNAPSHOT_SUFFIX})")
+    audit.add_argument("--out", type=Path, default=Path("outputs"), help="Folder to audit (default: outputs)")
+    audit.add_argument("--version", default="v001", help="Version suffix of the files (default: v001)")
+    audit.add_argument(
+        "--lineup-types", nargs="+", choices=LINEUP_TYPES, help="Default: the types with files in the folder"
+    )
+    audit.add_argument("--overlay", choices=("on", "off", "both"), help="Default: the states with files in the folder")
+    audit.add_argument("--colors", type=Path, help="LineupColors CSV (Name,Hex) used to resolve colors")
+    audit.add_argument("--verify-digests", action="store_true", help="Hash every file against the export manifest")
+    audit.add_argument("--limit", type=int, default=20, help="Files listed per kind of issue (default: 20)")
+    audit.set_defaults(func=_cmd_audit)
+
+    contact = sub.add_parser("contact", help="Write one labeled overview image of every screen in a show")
+    contact.add_argument("path", type=Path, help=f"Screen notes CSV or show snapshot ({SNAPSHOT_SUFFIX})")
+    contact.add_argument("--out", type=Path, default=Path("outputs/ContactSheet.png"))
+    contact.add_argument("--lineup-type", choices=LINEUP_TYPES, default="RGB")
+    contact.add_argument("--no-overlay", action="store_true", help="Omit the screen name + resolution overlay")
+    contact.add_argument("--thumb-width", type=int, default=DEFAULT_THUMB_SIZE[0])
+    contact.add_argument("--columns", type=int)
+    contact.add_argument("--title", help="Heading (default: the CSV file name)")
+    contact.add_argument("--colors", type=Path, help="LineupColors CSV (Name,Hex) used to resolve colors")
+    contact.set_defaults(func=_cmd_contact)
+
+    snapshot = sub.add_parser("snapshot", help="Save a show (sheet URL or CSV) as a snapshot that reopens instantly")
+    snapshot.add_argument("source", help="Google Sheet URL or screen notes CSV path")
+    snapshot.add_argument("--sheet-name", help="Sheet tab to read (default: the first)")
+    snapshot.add_argument("--colors", type=Path, help="LineupColors CSV (default: the sheet's LineupColors tab)")
+    snapshot.add_argument("--snapshot-dir", type=Path, default=Path("snapshots"), help="Folder (default: snapshots)")
+    snapshot.add_argument("--out", type=Path, help="Exact snapshot path (overrides --snapshot-dir)")
+    snapshot.set_defaults(func=_cmd_snapshot)
+
+    serve = sub.add_parser("serve", help="Serve lineup PNGs over HTTP for media-server/show-control tools")
+    serve.add_argument("--host", default=DEFAULT_HOST)
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--workers", type=int, default=2, help="Concurrent renders (default: 2)")
+    serve.add_argument("--max-pending", type=int, default=16, help="Distinct renders queued before 503")
+    serve.add_argument(
+        "--max-pixels",
+        type=int,
+        default=DEFAULT_MAX_CANVAS_PIXELS,
+        help=f"Largest canvas per request; larger ones get 413 (default: {DEFAULT_MAX_CANVAS_PIXELS:,})",
+    )
+    serve.set_defaults(func=_cmd_serve)
+
+    loadtest = sub.add_parser("loadtest", help="Time fetch/parse/render/export on a synthetic show served locally")
+    loadtest.add_argument("--screens", type=int, default=50)
+    loadtest.add_argument("--seed", type=int, default=0)
+    loadtest.add_argument("--half-row-ratio", type=float, default=0.15)
+    loadtest.add_argument("--playback-ratio", type=float, default=0.1, help="Share of fixed-resolution playback screens")
+    loadtest.add_argument("--size-mix", type=_size_mix, help="Size class weights, e.g. small=0.6,medium=0.3,large=0.1")
+    loadtest.add_argument("--latency", type=float, default=0.0, help="Seconds added to each fake Sheets response")
+    loadtest.add_argument("--fetch-rounds", type=int, default=3)
+    loadtest.add_argument("--lineup-types", nargs="+", choices=LINEUP_TYPES, default=list(LINEUP_TYPES))
+    loadtest.add_argument("--out", type=Path, help="Keep exported PNGs here (default: temporary folder)")
+    loadtest.add_argument("--write-csv", type=Path, help="Only write the generated screen notes CSV here")
+    loadtest.add_argument(
+        "--memory", action="store_true", help="Only measure the memory of the parsed show (try --screens 100000)"
+    )
+    loadtest.set_defaults(func=_cmd_loadtest)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.profile is None:
+        return args.func(args)
+    # The process runs only this command, so every thread belongs to it.
+    profiler = args.profiler = SamplingProfiler(all_threads=True)
+    with profiler:
+        code = args.func(args)
+    summary = profiler.write(args.profile, args.profile_top)
+    print(profiler.format_summary(args.profile_top), file=sys.stderr)
+    print(f"Profile written to {args.profile.resolve()} (hotspots: {summary.resolve()})", file=sys.stderr)
+    return code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
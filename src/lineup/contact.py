@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import math
+from typing import Dict, Optional
+
+from PIL import Image, ImageDraw
+
+from .cache import LRUCache, image_nbytes
+from .catalog import CatalogEntry, ScreenCatalog
+from .metrics import METRICS
+from .models import ScreenSpec, TileType
+from .plan import scale_plan
+from .renderer import PillowBackend, RenderOptions, _load_font, compile_render_plan, plan_images, render_spec_key
+
+DEFAULT_THUMB_SIZE = (320, 180)
+THUMB_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Text smaller than this is unreadable in a thumbnail and only adds noise.
+_MIN_THUMB_FONT_PX = 5
+
+_BACKGROUND = (24, 24, 24)
+_CELL_BACKGROUND = (40, 40, 40)
+_LABEL_RGB = (235, 235, 235)
+_DETAIL_RGB = (160, 160, 160)
+_PAD = 16
+
+_thumb_cache = LRUCache(THUMB_CACHE_MAX_BYTES)
+
+
+@METRICS.timed("thumbnail")
+def render_thumbnail(
+    screen: ScreenSpec,
+    tiles: Dict[str, TileType],
+    opts: RenderOptions,
+    max_size: tuple[int, int] = DEFAULT_THUMB_SIZE,
+) -> Image.Image:
+    """Render a lineup directly at thumbnail scale, fitted inside `max_size`.
+
+    The render plan is scaled before rasterizing, so the full-resolution canvas
+    is never drawn. Thumbnails are cached by a hash of their spec; callers must
+    not mutate the result.
+    """
+    key = (render_spec_key(screen, tiles, opts), max_size)
+    cached = _thumb_cache.get(key)
+    if cached is not None:
+        return cached
+
+    plan = compile_render_plan(screen, tiles, opts)
+    scale = min(1.0, max_size[0] / plan.width, max_size[1] / plan.height)
+    small = scale_plan(plan, scale, min_font_px=_MIN_THUMB_FONT_PX)
+    img = PillowBackend(plan_images(opts), use_cache=opts.use_layer_cache).execute(small)
+    _thumb_cache.put(key, img, image_nbytes(img))
+    return img
+
+
+def _fit_text(draw: ImageDraw.ImageDraw, text: str, font, max_w: int) -> str:
+    if draw.textlength(text, font=font) <= max_w:
+        return text
+    while text and draw.textlength(text + "...", font=font) > max_w:
+        text = text[:-1]
+    return text + "..."
+
+
+def _sheet_layout(
+    count: int,
+    thumb_size: tuple[int, int],
+    columns: Optional[int],
+    title: Optional[str],
+) -> tuple[int, int, int, int, int, int, int]:
+    """Return (columns, rows, label_size, detail_size, cell_w, cell_h, header_h) for `count` cells."""
+    thumb_w, thumb_h = thumb_size
+    if columns is None:
+        columns = max(1, math.ceil(math.sqrt(count * 16 / 9 * thumb_h / thumb_w)))
+    columns = min(columns, count)
+    rows = math.ceil(count / columns)
+    label_size = max(10, thumb_h // 11)
+    detail_size = max(9, thumb_h // 14)
+    caption_h = int(label_size * 1.4 + detail_size * 1.4)
+    header_h = int(label_size * 3) if title else 0
+    return columns, rows, label_size, detail_size, thumb_w + _PAD, thumb_h + caption_h + _PAD, header_h
+
+
+def contact_sheet_size(
+    catalog: ScreenCatalog,
+    opts: RenderOptions,
+    thumb_size: tuple[int, int] = DEFAULT_THUMB_SIZE,
+    columns: Optional[int] = None,
+    title: Optional[str] = None,
+) -> tuple[int, int]:
+    """Return the (width, height) render_contact_sheet will produce, or (0, 0) if no screen is eligible."""
+    count = len(catalog.eligible(opts.lineup_type))
+    if not count:
+        return 0, 0
+    columns, rows, _, _, cell_w, cell_h, header_h = _sheet_layout(count, thumb_size, columns, title)
+    return columns * cell_w + _PAD, header_h + rows * cell_h + _PAD
+
+
+def render_contact_sheet(
+    catalog: ScreenCatalog,
+    opts: RenderOptions,
+    thumb_size: tuple[int, int] = DEFAULT_THUMB_SIZE,
+    columns: Optional[int] = None,
+    title: Optional[str] = None,
+) -> Image.Image:
+    """Lay out a labeled thumbnail of every screen eligible for `opts.lineup_type`.
+
+    Each cell shows the thumbnail centered in a `thumb_size` box, then the
+    screen's display name and its delivery label + resolution. `columns`
+    defaults to a roughly 16:9 grid.
+    """
+    entries: list[CatalogEntry] = catalog.eligible(opts.lineup_type)
+    if not entries:
+        raise ValueError(f"No screens in this show can be rendered as {opts.lineup_type}.")
+    thumb_w, thumb_h = thumb_size
+    columns, rows, label_size, detail_size, cell_w, cell_h, header_h = _sheet_layout(
+        len(entries), thumb_size, columns, title
+    )
+    label_font = _load_font(opts.font_name, label_size)
+    detail_font = _load_font(opts.font_name, detail_size)
+    title_font = _load_font(opts.font_name, label_size * 2)
+
+    sheet = Image.new("RGB", (columns * cell_w + _PAD, header_h + rows * cell_h + _PAD), _BACKGROUND)
+    draw = ImageDraw.Draw(sheet)
+    if title:
+        draw.text((_PAD, _PAD), _fit_text(draw, title, title_font, sheet.width - 2 * _PAD), font=title_font, fill=_LABEL_RGB)
+
+    for i, entry in enumerate(entries):
+        x = _PAD + (i % columns) * cell_w
+        y = _PAD + header_h + (i // columns) * cell_h
+        draw.rectangle([x, y, x + thumb_w - 1, y + thumb_h - 1], fill=_CELL_BACKGROUND)
+        thumb = render_thumbnail(entry.screen, catalog.tiles, opts, thumb_size)
+        sheet.paste(thumb, (x + (thumb_w - thumb.width) // 2, y + (thumb_h - thumb.height) // 2))
+        w, h = entry.canvas_sizes[opts.lineup_type]
+        name = _fit_text(draw, entry.display_name, label_font, thumb_w)
+        detail = _fit_text(draw, f"{entry.screen.tile_label}  {w}x{h}", detail_font, thumb_w)
+        draw.text((x, y + thumb_h + 4), name, font=label_font, fill=_LABEL_RGB)
+        draw.text((x, y + thumb_h + 4 + int(label_size * 1.4)), detail, font=detail_font, fill=_DETAIL_RGB)
+    return sheet
@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import math
+import re
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from PIL import Image
+
+from .cache import LRUCache, image_nbytes
+from .export import encode_png
+
+DEFAULT_TILE_SIZE = 254
+DEFAULT_OVERLAP = 1
+# Memory for pyramids kept for quick back-and-forth between screens. Each holds
+# its full-resolution source render plus its levels (up to a third more).
+PYRAMID_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+TILE_CACHE_MAX_BYTES = 128 * 1024 * 1024
+
+
+class DeepZoomPyramid:
+    """Deep Zoom (DZI) tile pyramid over a rendered lineup.
+
+    Levels are built lazily by halving the next larger level, and tiles are only
+    cropped when requested. Level `max_level` is the source image itself.
+    """
+
+    def __init__(self, image: Image.Image, tile_size: int = DEFAULT_TILE_SIZE, overlap: int = DEFAULT_OVERLAP) -> None:
+        self.image = image
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.width, self.height = image.size
+        self.max_level = max(0, math.ceil(math.log2(max(self.width, self.height))))
+        self._levels: dict[int, Image.Image] = {self.max_level: image}
+        self._lock = threading.Lock()
+        # Source plus every level once all are built
+        self.nbytes = image_nbytes(image) * 4 // 3
+
+    def level_size(self, level: int) -> tuple[int, int]:
+        scale = 2 ** (self.max_level - level)
+        return max(1, math.ceil(self.width / scale)), max(1, math.ceil(self.height / scale))
+
+    def tile_grid(self, level: int) -> tuple[int, int]:
+        w, h = self.level_size(level)
+        return math.ceil(w / self.tile_size), math.ceil(h / self.tile_size)
+
+    def _level_image(self, level: int) -> Image.Image:
+        with self._lock:
+            cached = self._levels.get(level)
+            if cached is not None:
+                return cached
+            # Walk down from the nearest built level so each level is one 2x reduction.
+            built = min(lvl for lvl in self._levels if lvl > level)
+            img = self._levels[built]
+            for lvl in range(built - 1, level - 1, -1):
+                img = img.resize(self.level_size(lvl), Image.BOX)
+                self._levels[lvl] = img
+            return img
+
+    def tile(self, level: int, col: int, row: int) -> Image.Image:
+        if not 0 <= level <= self.max_level:
+            raise KeyError(f"level {level} out of range")
+        cols, rows = self.tile_grid(level)
+        if not (0 <= col < cols and 0 <= row < rows):
+            raise KeyError(f"tile {col}_{row} out of range at level {level}")
+        w, h = self.level_size(level)
+        left = col * self.tile_size - (self.overlap if col else 0)
+        top = row * self.tile_size - (self.overlap if row else 0)
+        right = min(w, (col + 1) * self.tile_size + self.overlap)
+        bottom = min(h, (row + 1) * self.tile_size + self.overlap)
+        return self._level_image(level).crop((left, top, right, bottom))
+
+    def dzi_xml(self, fmt: str = "png") -> str:
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" Format="{fmt}" '
+            f'Overlap="{self.overlap}" TileSize="{self.tile_size}">'
+            f'<Size Width="{self.width}" Height="{self.height}"/></Image>\n'
+        )
+
+
+_VIEWER_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Lineup deep zoom</title>
+<style>
+html, body { margin: 0; height: 100%; background: #111; overflow: hidden; font: 12px sans-serif; color: #ccc; }
+canvas { display: block; width: 100%; height: 100%; cursor: grab; }
+#hud { position: absolute; left: 8px; bottom: 6px; pointer-events: none; }
+</style></head>
+<body><canvas id="c"></canvas><div id="hud"></div>
+<script>
+const W = __WIDTH__, H = __HEIGHT__, TS = __TILE_SIZE__, OV = __OVERLAP__, MAX = __MAX_LEVEL__;
+const BASE = "__BASE__";
+const canvas = document.getElementById("c"), ctx = canvas.getContext("2d"), hud = document.getElementById("hud");
+const tiles = new Map();
+let scale = 1, ox = 0, oy = 0, fitted = false;
+
+function resize() {
+  canvas.width = canvas.clientWidth * devicePixelRatio;
+  canvas.height = canvas.clientHeight * devicePixelRatio;
+  if (!fitted) { fit(); fitted = true; }
+  draw();
+}
+function fit() {
+  scale = Math.min(canvas.width / W, canvas.height / H);
+  ox = (canvas.width - W * scale) / 2; oy = (canvas.height - H * scale) / 2;
+}
+function tile(level, col, row) {
+  const key = level + "/" + col + "_" + row;
+  let img = tiles.get(key);
+  if (!img) {
+    img = new Image();
+    img.onload = draw;
+    img.src = BASE + "_files/" + key + ".png";
+    tiles.set(key, img);
+  }
+  return img;
+}
+function drawLevel(level, onlyLoaded) {
+  const f = Math.pow(2, MAX - level), s = scale * f;
+  const lw = Math.ceil(W / f), lh = Math.ceil(H / f);
+  const c0 = Math.max(0, Math.floor(-ox / s / TS)), r0 = Math.max(0, Math.floor(-oy / s / TS));
+  const c1 = Math.min(Math.ceil(lw / TS) - 1, Math.floor((canvas.width - ox) / s / TS));
+  const r1 = Math.min(Math.ceil(lh / TS) - 1, Math.floor((canvas.height - oy) / s / TS));
+  let pending = 0;
+  for (let r = r0; r <= r1; r++) for (let c = c0; c <= c1; c++) {
+    const key = level + "/" + c + "_" + r;
+    if (onlyLoaded && !tiles.has(key)) continue;
+    const img = tile(level, c, r);
+    if (!img.complete || !img.naturalWidth) { pending++; continue; }
+    const x = c * TS - (c ? OV : 0), y = r * TS - (r ? OV : 0);
+    ctx.drawImage(img, ox + x * s, oy + y * s, img.naturalWidth * s, img.naturalHeight * s);
+  }
+  return pending;
+}
+function draw() {
+  ctx.imageSmoothingEnabled = scale < 1;
+  ctx.fillStyle = "#111"; ctx.fillRect(0, 0, canvas.width, canvas.height);
+  // Sharpest level whose pixels are no smaller than screen pixels.
+  const level = Math.max(0, Math.min(MAX, Math.ceil(MAX + Math.log2(scale))));
+  // Coarser levels that are already loaded fill in while the target level loads.
+  for (let l = Math.max(0, level - 3); l < level; l++) drawLevel(l, true);
+  const pending = drawLevel(level, false);
+  hud.textContent = W + "x" + H + "  zoom " + (scale * 100).toFixed(scale < 0.1 ? 1 : 0) + "%" +
+    (pending ? "  loading " + pending : "") + "  (wheel: zoom, drag: pan, double-click: fit)";
+}
+canvas.addEventListener("wheel", e => {
+  e.preventDefault();
+  const k = Math.exp(-e.deltaY * 0.0015), px = e.offsetX * devicePixelRatio, py = e.offsetY * devicePixelRatio;
+  const next = Math.min(16, Math.max(0.01, scale * k));
+  ox = px - (px - ox) * next / scale; oy = py - (py - oy) * next / scale; scale = next;
+  draw();
+}, { passive: false });
+let drag = null;
+canvas.addEventListener("mousedown", e => { drag = [e.clientX, e.clientY]; canvas.style.cursor = "grabbing"; });
+window.addEventListener("mouseup", () => { drag = null; canvas.style.cursor = "grab"; });
+window.addEventListener("mousemove", e => {
+  if (!drag) return;
+  ox += (e.clientX - drag[0]) * devicePixelRatio; oy += (e.clientY - drag[1]) * devicePixelRatio;
+  drag = [e.clientX, e.clientY]; draw();
+});
+canvas.addEventListener("dblclick", () => { fit(); draw(); });
+window.addEventListener("resize", resize);
+resize();
+</script></body></html>
+"""
+
+
+def viewer_html(pyramid: DeepZoomPyramid, base_url: str) -> str:
+    """Return a self-contained zoom/pan viewer for `pyramid` served at `base_url`."""
+    replacements = {
+        "__WIDTH__": str(pyramid.width),
+        "__HEIGHT__": str(pyramid.height),
+        "__TILE_SIZE__": str(pyramid.tile_size),
+        "__OVERLAP__": str(pyramid.overlap),
+        "__MAX_LEVEL__": str(pyramid.max_level),
+        "__BASE__": base_url,
+    }
+    html = _VIEWER_HTML
+    for token, value in replacements.items():
+        html = html.replace(token, value)
+    return html
+
+
+_TILE_PATH = re.compile(r"^/dz/([0-9a-f]+)_files/(\d+)/(\d+)_(\d+)\.png$")
+_DZI_PATH = re.compile(r"^/dz/([0-9a-f]+)\.dzi$")
+_VIEWER_PATH = re.compile(r"^/dz/([0-9a-f]+)/viewer\.html$")
+
+
+class DeepZoomServer:
+    """Serve published pyramids, their tiles and a viewer page over HTTP.
+
+    Tiles are encoded on first request and kept in a byte-bounded cache. The
+    most recently published pyramids are kept while they fit in `max_bytes`;
+    the newest one is always kept.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, max_bytes: int = PYRAMID_CACHE_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._pyramids: OrderedDict[str, DeepZoomPyramid] = OrderedDict()
+        self._lock = threading.Lock()
+        self.tile_cache = LRUCache(TILE_CACHE_MAX_BYTES)
+        self.httpd = ThreadingHTTPServer((host, port), _DeepZoomHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.deepzoom = self  # type: ignore[attr-defined]
+        threading.Thread(target=self.httpd.serve_forever, name="lineup-deepzoom", daemon=True).start()
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def publish(self, pyramid_id: str, image: Image.Image) -> str:
+        """Make `image` browsable under `pyramid_id` and return its viewer's path.
+
+        Re-publishing an existing id keeps its built levels and cached tiles.
+        """
+        with self._lock:
+            if pyramid_id in self._pyramids:
+                self._pyramids.move_to_end(pyramid_id)
+            else:
+                self._pyramids[pyramid_id] = DeepZoomPyramid(image)
+                total = sum(p.nbytes for p in self._pyramids.values())
+                while total > self.max_bytes and len(self._pyramids) > 1:
+                    total -= self._pyramids.popitem(last=False)[1].nbytes
+        return f"/dz/{pyramid_id}/viewer.html"
+
+    def pyramid(self, pyramid_id: str) -> DeepZoomPyramid | None:
+        with self._lock:
+            return self._pyramids.get(pyramid_id)
+
+    def tile_png(self, pyramid_id: str, level: int, col: int, row: int) -> bytes | None:
+        pyramid = self.pyramid(pyramid_id)
+        if pyramid is None:
+            return None
+        key = (pyramid_id, level, col, row)
+        data = self.tile_cache.get(key)
+        if data is None:
+            data = encode_png(pyramid.tile(level, col, row))
+            self.tile_cache.put(key, data, len(data))
+        return data
+
+    def shutdown(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _DeepZoomHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        server: DeepZoomServer = self.server.deepzoom  # type: ignore[attr-defined]
+        path = urlparse(self.path).path
+        match = _TILE_PATH.match(path)
+        if match:
+            try:
+                data = server.tile_png(match.group(1), int(match.group(2)), int(match.group(3)), int(match.group(4)))
+            except KeyError:
+                data = None
+            self._send(data, "image/png", cache=True)
+            return
+        match = _DZI_PATH.match(path)
+        if match:
+            pyramid = server.pyramid(match.group(1))
+            self._send(pyramid.dzi_xml().encode("utf-8") if pyramid else None, "application/xml")
+            return
+        match = _VIEWER_PATH.match(path)
+        if match:
+            pyramid = server.pyramid(match.group(1))
+            html = viewer_html(pyramid, f"/dz/{match.group(1)}") if pyramid else None
+            self._send(html.encode("utf-8") if html else None, "text/html; charset=utf-8")
+            return
+        self._send(None, "text/plain")
+
+    def _send(self, body: bytes | None, content_type: str, cache: bool = False) -> None:
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        # Pyramid ids are content digests, so tiles never change under a URL.
+        self.send_header("Cache-Control", "max-age=86400, immutable" if cache else "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:  # noqa: A002 - BaseHTTPRequestHandler signature
+        pass
+
+
+_server: DeepZoomServer | None = None
+_server_lock = threading.Lock()
+
+
+def get_deepzoom_server(host: str = "127.0.0.1") -> DeepZoomServer:
+    """Return the process-wide deep zoom server, starting it on `host` on first use."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = DeepZoomServer(host)
+        return _server
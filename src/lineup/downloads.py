@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterable
+from urllib.parse import quote, urlparse
+
+from .metrics import METRICS
+
+# A link stays valid this long after it was offered, so a slow click still works.
+DOWNLOAD_TTL_S = 60 * 60
+MAX_DOWNLOADS = 64
+
+_DOWNLOAD_PATH = re.compile(r"^/dl/([A-Za-z0-9_-]+)/[^/]+$")
+
+
+class _Download:
+    def __init__(self, filename: str, make_chunks: Callable[[], Iterable[bytes]], content_type: str) -> None:
+        self.filename = filename
+        self.make_chunks = make_chunks
+        self.content_type = content_type
+        self.created_at = time.monotonic()
+
+
+class DownloadServer:
+    """Serve generated files over HTTP as they are produced.
+
+    `register` stores a chunk generator factory under an unguessable token;
+    each request for the link runs the factory and writes its chunks with
+    chunked transfer encoding, so the file is never held in memory or written
+    to disk. Links expire after DOWNLOAD_TTL_S, and only the newest
+    MAX_DOWNLOADS are kept.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self._downloads: OrderedDict[str, _Download] = OrderedDict()
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _DownloadHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.downloads = self  # type: ignore[attr-defined]
+        threading.Thread(target=self.httpd.serve_forever, name="lineup-downloads", daemon=True).start()
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def register(
+        self,
+        filename: str,
+        make_chunks: Callable[[], Iterable[bytes]],
+        content_type: str = "application/octet-stream",
+    ) -> str:
+        """Offer `make_chunks()` as `filename` and return the link's path."""
+        token = secrets.token_urlsafe(16)
+        now = time.monotonic()
+        with self._lock:
+            for key in [k for k, d in self._downloads.items() if now - d.created_at > DOWNLOAD_TTL_S]:
+                del self._downloads[key]
+            self._downloads[token] = _Download(filename, make_chunks, content_type)
+            while len(self._downloads) > MAX_DOWNLOADS:
+                self._downloads.popitem(last=False)
+        return f"/dl/{token}/{quote(filename)}"
+
+    def get(self, token: str) -> _Download | None:
+        with self._lock:
+            download = self._downloads.get(token)
+        if download is None or time.monotonic() - download.created_at > DOWNLOAD_TTL_S:
+            return None
+        return download
+
+    def shutdown(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _DownloadHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        server: DownloadServer = self.server.downloads  # type: ignore[attr-defined]
+        match = _DOWNLOAD_PATH.match(urlparse(self.path).path)
+        download = server.get(match.group(1)) if match else None
+        if download is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", download.content_type)
+        self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(download.filename)}")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        try:
+            for chunk in download.make_chunks():
+                if chunk:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+            METRICS.inc("downloads_served")
+        except (BrokenPipeError, ConnectionResetError):
+            # The browser cancelled; stop generating the rest.
+            METRICS.inc("downloads_cancelled")
+        except Exception:
+            # Without the final chunk the browser reports the download as failed.
+            METRICS.inc("downloads_failed")
+        self.close_connection = True
+
+    def log_message(self, format, *args) -> None:  # noqa: A002 - BaseHTTPRequestHandler signature
+        pass
+
+
+_server: DownloadServer | None = None
+_server_lock = threading.Lock()
+
+
+def get_download_server(host: str = "127.0.0.1") -> DownloadServer:
+    """Return the process-wide download server, starting it on `host` on first use."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = DownloadServer(host)
+        return _server
@@ -0,0 +1,557 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import queue
+import threading
+import zipfile
+from collections import Counter
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Sequence
+
+from PIL import Image
+
+from .catalog import ScreenCatalog
+from .metrics import METRICS
+from .models import LINEUP_TYPES, ScreenSpec, TileType
+from .pool import RenderLease, RenderPool, estimate_render_cost
+from .profiling import SamplingProfiler
+from .renderer import RenderOptions, base_layer_key, composite_lineup_layers, render_base_layer, screen_spec_key
+
+# Written next to the PNGs by exports with write_manifest; read by audit_outputs.
+MANIFEST_NAME = "lineup-manifest.json"
+MANIFEST_FORMAT = 1
+
+FILE_PREFIXES = {
+    "GreyscaleSteps": "GREY",
+    "CircleXGrid": "CircleX",
+}
+
+
+def lineup_file_prefix(lineup_type: str) -> str:
+    """Return the filename prefix used for exports of `lineup_type`."""
+    return FILE_PREFIXES.get(lineup_type, lineup_type)
+
+
+def export_filename(tile_label: str, lineup_type: str, show_overlay: bool, version: str, ext: str = "png") -> str:
+    """Return `{prefix}{_OV}_{tile_label}_{version}.{ext}` for an export."""
+    overlay_suffix = "_OV" if show_overlay else ""
+    return f"{lineup_file_prefix(lineup_type)}{overlay_suffix}_{tile_label}_{version}.{ext}"
+
+
+@METRICS.timed("encode")
+def encode_png(img: Image.Image) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@dataclass
+class ExportedPng:
+    screen: ScreenSpec
+    filename: str
+    data: bytes
+    # Filename of an earlier export in the same batch with byte-identical data
+    duplicate_of: str | None = None
+
+
+@dataclass
+class _ExportJob:
+    screen: ScreenSpec
+    filename: str
+    # Composited frame; None when the job repeats an earlier job's output
+    image: Image.Image | None
+    duplicate_of: str | None = None
+    # A later job in the batch repeats this job's (or its original's) output
+    reused_later: bool = False
+    # screen_spec_key of the sheet data the job was rendered from
+    screen_key: str = ""
+    size: tuple[int, int] | None = None
+    lineup_type: str = ""
+
+
+def _iter_export_jobs(
+    screens: Iterable[ScreenSpec],
+    tiles: Dict[str, TileType],
+    opts: RenderOptions,
+    version: str,
+    reserve: Callable[[int, int], None] | None = None,
+    overlay_states: Sequence[bool] | None = None,
+) -> Iterator[_ExportJob]:
+    """Composite `screens`, rendering each shared base layer once.
+
+    Screens are grouped by the inputs that affect their background + tiles, and
+    each group's base layer is rendered once and reused for every state in
+    `overlay_states` (default: just `opts.show_overlay`). Only the overlay is
+    applied per screen; screens whose output would be byte-identical (same
+    overlay, or no overlay) are emitted as duplicates of the first. Groups are
+    emitted in order of first appearance. `reserve(pixels, nbytes)` runs before
+    each new frame is allocated, with estimate_render_cost for the group (base
+    layer plus composite); for a group's first frame that is before its base
+    layer is rendered.
+    """
+    if overlay_states is None:
+        overlay_states = (opts.show_overlay,)
+    groups: dict[tuple, list[ScreenSpec]] = {}
+    for scr in screens:
+        groups.setdefault(base_layer_key(scr, tiles, opts), []).append(scr)
+
+    for group in groups.values():
+        # The group's first frame is reserved with its base layer, before either is allocated.
+        cost = estimate_render_cost(group[0], tiles, opts) if reserve else None
+        reserved = reserve is not None
+        if reserved:
+            reserve(*cost)
+        base = render_base_layer(group[0], tiles, opts)
+        for show_overlay in overlay_states:
+            variant_opts = replace(opts, show_overlay=show_overlay)
+            overlay_keys = [scr.screen_name if show_overlay else None for scr in group]
+            remaining = Counter(overlay_keys)
+            first_names: dict[str | None, str] = {}
+            for scr, overlay_key in zip(group, overlay_keys):
+                filename = export_filename(scr.tile_label, opts.lineup_type, show_overlay, version)
+                remaining[overlay_key] -= 1
+                reused_later = remaining[overlay_key] > 0
+                screen_key = screen_spec_key(scr, tiles)
+                if overlay_key in first_names:
+                    yield _ExportJob(
+                        scr, filename, None, first_names[overlay_key], reused_later, screen_key, base.size, opts.lineup_type
+                    )
+                    continue
+                if reserve and not reserved:
+                    reserve(*cost)
+                reserved = False
+                first_names[overlay_key] = filename
+                image = composite_lineup_layers(base, scr, variant_opts)
+                yield _ExportJob(scr, filename, image, None, reused_later, screen_key, image.size, opts.lineup_type)
+        base = None
+
+
+def iter_export_pngs(
+    screens: Iterable[ScreenSpec],
+    tiles: Dict[str, TileType],
+    opts: RenderOptions,
+    version: str,
+    render_pool: RenderPool | None = None,
+) -> Iterator[ExportedPng]:
+    """Render and encode `screens` one at a time, deduplicating identical outputs.
+
+    See _iter_export_jobs for how work is shared; duplicates reuse the first
+    encoded PNG. With a `render_pool`, each frame holds a lease on the pool's
+    budget from before its memory is allocated until it is encoded.
+    """
+    kept: dict[str, bytes] = {}
+    lease: RenderLease | None = None
+
+    def reserve(pixels: int, nbytes: int) -> None:
+        nonlocal lease
+        lease = render_pool.reserve(pixels, nbytes)
+
+    try:
+        for job in _iter_export_jobs(screens, tiles, opts, version, reserve=reserve if render_pool else None):
+            if job.image is None:
+                data = kept[job.duplicate_of] if job.reused_later else kept.pop(job.duplicate_of)
+            else:
+                data = encode_png(job.image)
+                job.image = None
+                if lease is not None:
+                    lease.release()
+                    lease = None
+                if job.reused_later:
+                    kept[job.filename] = data
+            yield ExportedPng(job.screen, job.filename, data, duplicate_of=job.duplicate_of)
+    finally:
+        if lease is not None:
+            lease.release()
+
+
+def iter_rendered_pngs(
+    screens: Iterable[ScreenSpec],
+    tiles: Dict[str, TileType],
+    opts: RenderOptions,
+    version: str,
+    render_pool: RenderPool | None = None,
+) -> Iterator[tuple[str, bytes]]:
+    """Yield (filename, png_bytes) for each screen, one encoded PNG at a time."""
+    for exported in iter_export_pngs(screens, tiles, opts, version, render_pool):
+        yield exported.filename, exported.data
+
+
+class _PixelBudget:
+    """Counting limit on pixels held by frames that are rendered but not yet encoded.
+
+    A single frame larger than the whole budget is admitted once nothing else is
+    in flight, so oversized screens still export (one at a time).
+    """
+
+    def __init__(self, max_pixels: int) -> None:
+        self.max_pixels = max_pixels
+        self.in_flight = 0
+        self.peak = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, pixels: int, cancelled: threading.Event) -> None:
+        with self._cond:
+            while self.in_flight and self.in_flight + pixels > self.max_pixels:
+                if cancelled.is_set():
+                    raise _PipelineCancelled()
+                self._cond.wait(0.1)
+            self.in_flight += pixels
+            self.peak = max(self.peak, self.in_flight)
+
+    def release(self, pixels: int) -> None:
+        with self._cond:
+            self.in_flight -= pixels
+            self._cond.notify_all()
+
+
+class _PipelineCancelled(Exception):
+    pass
+
+
+# ~600 MB of RGB frames in flight; comfortable on 8 GB show laptops.
+DEFAULT_MAX_INFLIGHT_PIXELS = 200_000_000
+
+_DONE = object()
+
+
+def _profiled(profiler: SamplingProfiler | None, label: str):
+    return profiler.section(label) if profiler else nullcontext()
+
+
+def _write_export(out_dir: Path, filename: str, data: bytes, link_to: str | None) -> bool:
+    """Write `data` to `out_dir/filename` (or hard-link `link_to`); return True if linked."""
+    out_path = out_dir / filename
+    # Never write through an existing path: it may be a hard link from an earlier export.
+    out_path.unlink(missing_ok=True)
+    if link_to not in (None, filename):
+        try:
+            os.link(out_dir / link_to, out_path)
+            return True
+        except OSError:
+            pass
+    with METRICS.timed("write"):
+        out_path.write_bytes(data)
+    METRICS.inc("bytes_written", len(data))
+    return False
+
+
+def read_manifest(out_dir: Path) -> dict[str, dict]:
+    """Return the export manifest's per-file entries, or {} if there is none."""
+    try:
+        doc = json.loads((Path(out_dir) / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(doc, dict) or doc.get("format") != MANIFEST_FORMAT or not isinstance(doc.get("files"), dict):
+        return {}
+    return doc["files"]
+
+
+def _update_manifest(out_dir: Path, entries: dict[str, dict]) -> None:
+    files = read_manifest(out_dir)
+    files.update(entries)
+    path = out_dir / MANIFEST_NAME
+    tmp = path.with_name(f".{MANIFEST_NAME}.tmp")
+    tmp.write_text(json.dumps({"format": MANIFEST_FORMAT, "files": files}, indent=1, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _run_export_pipeline(
+    make_jobs: Callable[[Callable[[int, int], None]], Iterator[_ExportJob]],
+    out_dir: Path,
+    hardlink_identical: bool,
+    progress: Callable[[int], None] | None,
+    max_inflight_pixels: int,
+    encode_workers: int | None,
+    queue_size: int,
+    write_manifest: bool = False,
+    render_pool: RenderPool | None = None,
+    profiler: SamplingProfiler | None = None,
+) -> int:
+    """Drive jobs from `make_jobs(reserve)` through encode and write stages.
+
+    With a `profiler`, every pipeline thread is sampled, and encodes and writes
+    are attributed to their job's lineup type; `make_jobs` labels rendering.
+    """
+    if encode_workers is None:
+        encode_workers = max(1, min(4, (os.cpu_count() or 2) - 1))
+    budget = _PixelBudget(max_inflight_pixels)
+    cancelled = threading.Event()
+    pending: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+    # (pixels, lease) reserved for the frame being rendered, handed to its encode
+    held: list[tuple[int, RenderLease | None]] = []
+
+    def reserve(pixels: int, nbytes: int) -> None:
+        budget.acquire(pixels, cancelled)
+        if render_pool is None:
+            held.append((pixels, None))
+            return
+        try:
+            held.append((pixels, render_pool.reserve(pixels, nbytes, cancelled=cancelled)))
+        except BaseException:
+            budget.release(pixels)
+            if cancelled.is_set():
+                raise _PipelineCancelled()
+            raise
+
+    def encode(img: Image.Image, pixels: int, lease: RenderLease | None, lineup_type: str) -> bytes:
+        try:
+            with _profiled(profiler, lineup_type):
+                return encode_png(img)
+        finally:
+            budget.release(pixels)
+            if lease is not None:
+                lease.release()
+
+    def put(item) -> None:
+        while True:
+            if cancelled.is_set():
+                raise _PipelineCancelled()
+            try:
+                pending.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    encode_threads: list[int] = []
+
+    def track_encode_thread() -> None:
+        encode_threads.append(threading.get_ident())
+        profiler.track_thread()
+
+    def render_stage(pool: ThreadPoolExecutor) -> None:
+        if profiler:
+            profiler.track_thread()
+        try:
+            for job in make_jobs(reserve):
+                future = None
+                if job.image is not None:
+                    future = pool.submit(encode, job.image, *held.pop(), job.lineup_type)
+                job.image = None
+                put((job, future))
+            put(_DONE)
+        except _PipelineCancelled:
+            pass
+        except BaseException as exc:  # surfaced to the writer
+            try:
+                put(exc)
+            except _PipelineCancelled:
+                pass
+        finally:
+            # A frame whose render failed never reached an encode.
+            while held:
+                pixels, lease = held.pop()
+                budget.release(pixels)
+                if lease is not None:
+                    lease.release()
+            if profiler:
+                profiler.untrack_thread()
+
+    count = 0
+    kept: dict[str, bytes] = {}
+    manifest: dict[str, dict] = {}
+    if profiler:
+        profiler.track_thread()
+    with ThreadPoolExecutor(
+        max_workers=encode_workers,
+        thread_name_prefix="lineup-encode",
+        initializer=track_encode_thread if profiler else None,
+    ) as pool:
+        renderer = threading.Thread(target=render_stage, args=(pool,), name="lineup-render", daemon=True)
+        renderer.start()
+        try:
+            while True:
+                item = pending.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                job, future = item
+                with _profiled(profiler, job.lineup_type):
+                    if future is not None:
+                        data = future.result()
+                        if job.reused_later:
+                            kept[job.filename] = data
+                        _write_export(out_dir, job.filename, data, None)
+                    else:
+                        data = kept[job.duplicate_of] if job.reused_later else kept.pop(job.duplicate_of)
+                        _write_export(out_dir, job.filename, data, job.duplicate_of if hardlink_identical else None)
+                    if write_manifest:
+                        original = manifest.get(job.duplicate_of) if job.duplicate_of else None
+                        manifest[job.filename] = {
+                            "screen": job.screen_key,
+                            "width": job.size[0],
+                            "height": job.size[1],
+                            "bytes": len(data),
+                            "sha256": original["sha256"] if original else hashlib.sha256(data).hexdigest(),
+                        }
+                METRICS.inc("pngs_exported")
+                count += 1
+                if progress:
+                    progress(count)
+        finally:
+            cancelled.set()
+            renderer.join()
+    if profiler:
+        # Encode threads have exited; their idents may be reused by unrelated threads.
+        for ident in encode_threads:
+            profiler.untrack_thread(ident)
+    if manifest:
+        _update_manifest(out_dir, manifest)
+    return count
+
+
+@METRICS.timed("export")
+def export_pngs_to_dir(
+    screens: Iterable[ScreenSpec],
+    tiles: Dict[str, TileType],
+    opts: RenderOptions,
+    out_dir: Path,
+    version: str,
+    hardlink_identical: bool = False,
+    progress: Callable[[int], None] | None = None,
+    max_inflight_pixels: int = DEFAULT_MAX_INFLIGHT_PIXELS,
+    encode_workers: int | None = None,
+    queue_size: int = 4,
+    profiler: SamplingProfiler | None = None,
+    write_manifest: bool = False,
+    render_pool: RenderPool | None = None,
+) -> int:
+    """Write one PNG per screen into `out_dir` and return the number written.
+
+    Rendering, PNG encoding and file writes run as overlapping stages: a render
+    thread composites frames, a pool of `encode_workers` encodes them, and the
+    calling thread writes files in screen order (so `progress` is always called
+    from the caller's thread). Rendered-but-unencoded frames are capped at
+    `max_inflight_pixels`, and at most `queue_size` encodes wait for the writer.
+
+    With `hardlink_identical`, byte-identical outputs are hard-linked to the
+    first copy instead of being written again; filesystems without hard-link
+    support fall back to a normal write. A running `profiler` samples the
+    export's threads in a section named after the lineup type. With
+    `write_manifest`, each file's screen key, size and digest are merged into
+    MANIFEST_NAME in `out_dir` for audit_outputs. With a `render_pool`, each
+    rendered frame also holds a lease on the pool's budget until it is
+    encoded, so exports and interactive renders share one memory limit.
+    """
+
+    def make_jobs(reserve: Callable[[int, int], None]) -> Iterator[_ExportJob]:
+        with _profiled(profiler, opts.lineup_type):
+            yield from _iter_export_jobs(screens, tiles, opts, version, reserve=reserve)
+
+    return _run_export_pipeline(
+        make_jobs,
+        out_dir,
+        hardlink_identical,
+        progress,
+        max_inflight_pixels,
+        encode_workers,
+        queue_size,
+        write_manifest,
+        render_pool,
+        profiler,
+    )
+
+
+def variant_matrix_count(
+    catalog: ScreenCatalog,
+    lineup_types: Sequence[str] = LINEUP_TYPES,
+    overlay_states: Sequence[bool] = (True, False),
+) -> int:
+    """Return how many PNGs export_variant_matrix will write."""
+    return sum(len(catalog.eligible(t)) for t in lineup_types) * len(overlay_states)
+
+
+@METRICS.timed("export")
+def export_variant_matrix(
+    catalog: ScreenCatalog,
+    opts: RenderOptions,
+    out_dir: Path,
+    version: str,
+    lineup_types: Sequence[str] = LINEUP_TYPES,
+    overlay_states: Sequence[bool] = (True, False),
+    hardlink_identical: bool = False,
+    progress: Callable[[int], None] | None = None,
+    max_inflight_pixels: int = DEFAULT_MAX_INFLIGHT_PIXELS,
+    encode_workers: int | None = None,
+    queue_size: int = 4,
+    profiler: SamplingProfiler | None = None,
+    write_manifest: bool = False,
+    render_pool: RenderPool | None = None,
+) -> int:
+    """Export every lineup type x overlay state variant of a show in one pass.
+
+    Each lineup type exports the screens the catalog marks eligible for it. Base
+    layers are rendered once per group and shared by all overlay states, and
+    font fitting is reused through the layer cache. Filenames follow
+    export_filename, so variants never collide. `opts` supplies everything else
+    (colors, branding, fonts); its lineup_type and show_overlay are ignored.
+
+    All variants run through one pipeline, profiled or not. A running
+    `profiler` attributes each stage's work to the lineup type of the job it
+    is handling, so types that overlap in the pipeline are not mixed.
+    `write_manifest` and `render_pool` are as for export_pngs_to_dir.
+    """
+
+    def make_jobs(reserve: Callable[[int, int], None]) -> Iterator[_ExportJob]:
+        for lineup_type in lineup_types:
+            with _profiled(profiler, lineup_type):
+                yield from _iter_export_jobs(
+                    catalog.eligible_screens(lineup_type),
+                    catalog.tiles,
+                    replace(opts, lineup_type=lineup_type),
+                    version,
+                    reserve=reserve,
+                    overlay_states=overlay_states,
+                )
+
+    return _run_export_pipeline(
+        make_jobs,
+        out_dir,
+        hardlink_identical,
+        progress,
+        max_inflight_pixels,
+        encode_workers,
+        queue_size,
+        write_manifest,
+        render_pool,
+        profiler,
+    )
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to the caller."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> list[bytes]:
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+
+def iter_png_zip(entries: Iterable[tuple[str, bytes]]) -> Iterator[bytes]:
+    """Stream a ZIP_STORED archive of `entries`, one chunk batch per entry.
+
+    PNGs are already deflate-compressed, so entries are stored as-is. Only the
+    entry currently being written is held in memory; the archive itself is never
+    buffered or spooled to disk.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        for name, data in entries:
+            zf.writestr(name, data)
+            yield from sink.drain()
+    yield from sink.drain()
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import mmap
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from PIL import Image
+
+from .metrics import METRICS
+from .models import ScreenSpec, TileType
+from .renderer import (
+    BANDED_MIN_PIXELS,
+    RenderOptions,
+    iter_lineup_bands,
+    lineup_canvas_size,
+    render_lineup_png,
+)
+
+# Byte layouts a frame can be packed as, with bytes per pixel. X bytes are
+# padding (0xFF for RGBX, 0x00 for the others); RGBA is opaque.
+PIXEL_FORMATS: Dict[str, int] = {
+    "RGB": 3,
+    "BGR": 3,
+    "RGBX": 4,
+    "RGBA": 4,
+    "BGRX": 4,
+    "XRGB": 4,
+    "XBGR": 4,
+}
+
+# Rows are packed in bands of about this many bytes, so no full-frame byte
+# string is ever built on the way into the destination buffer.
+_BAND_BYTES = 4 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class FrameLayout:
+    width: int
+    height: int
+    pixel_format: str
+    # Bytes from the start of one row to the next (>= width * bytes per pixel)
+    stride: int
+
+    @property
+    def row_bytes(self) -> int:
+        return self.width * PIXEL_FORMATS[self.pixel_format]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes a buffer needs to hold the frame (the last row is not padded)."""
+        return self.stride * (self.height - 1) + self.row_bytes if self.height else 0
+
+
+def frame_layout(
+    screen: ScreenSpec,
+    tiles: Dict[str, TileType],
+    opts: RenderOptions,
+    pixel_format: str = "RGB",
+    stride: Optional[int] = None,
+) -> FrameLayout:
+    """Return the raw frame layout for a lineup without rendering it.
+
+    Use it to size a shared memory block or output file before calling
+    render_lineup_into.
+    """
+    if pixel_format not in PIXEL_FORMATS:
+        raise ValueError(f"Unsupported pixel format {pixel_format!r}; expected one of {', '.join(PIXEL_FORMATS)}.")
+    width, height = lineup_canvas_size(screen, tiles, opts.lineup_type)
+    row_bytes = width * PIXEL_FORMATS[pixel_format]
+    stride = row_bytes if stride is None else stride
+    if stride < row_bytes:
+        raise ValueError(f"Stride {stride} is smaller than a {width}px {pixel_format} row ({row_bytes} bytes).")
+    return FrameLayout(width, height, pixel_format, stride)
+
+
+def _row_bands(
+    screen: ScreenSpec,
+    tiles: Dict[str, TileType],
+    opts: RenderOptions,
+    layout: FrameLayout,
+) -> Iterator[tuple[int, Image.Image]]:
+    """Yield (top row, band image) pieces of the rendered canvas, top to bottom."""
+    if opts.render_workers > 1 and layout.width * layout.height >= BANDED_MIN_PIXELS:
+        # Bands are rendered in parallel and packed as they finish; the full
+        # canvas is never allocated.
+        for rect, band in iter_lineup_bands(screen, tiles, opts):
+            yield rect[1], band
+        return
+    img = render_lineup_png(screen, tiles, opts)
+    band_rows = max(1, _BAND_BYTES // max(layout.row_bytes, 1))
+    for top in range(0, layout.height, band_rows):
+        yield top, img.crop((0, top, layout.width, min(top + band_rows, layout.height)))
+
+
+def _check_writable(view: memoryview) -> Optional[int]:
+    """Validate a destination view and return its own row stride, if it has one."""
+    if view.readonly:
+        raise ValueError("Destination buffer is read-only.")
+    if not view.c_contiguous:
+        raise ValueError("Destination buffer must be C-contiguous; pass the underlying buffer and a stride instead.")
+    # Multi-dimensional buffers (e.g. an (h, w, 3) uint8 array) carry their row stride.
+    return view.strides[0] if view.ndim > 1 else None
+
+
+@METRICS.timed("render_into")
+def render_lineup_into(
+    buffer: Any,
+    screen: ScreenSpec,
+    tiles: Dict[str, TileType],
+    opts: RenderOptions,
+    pixel_format: str = "RGB",
+    stride: Optional[int] = None,
+    offset: int = 0,
+) -> FrameLayout:
+    """Render a lineup as raw pixels straight into a caller-provided buffer.
+
+    `buffer` is anything writable that exposes the buffer protocol: bytearray,
+    memoryview, mmap, multiprocessing.shared_memory.SharedMemory.buf or a
+    C-contiguous NumPy array. Row `y` starts at `offset + y * stride`; `stride`
+    defaults to the buffer's own row stride for multi-dimensional buffers and
+    to a tightly packed row otherwise. Bytes between rows are left untouched.
+    Returns the layout that was written.
+    """
+    # Views are released on exit so mmap/shared memory owners can close.
+    with memoryview(buffer) as raw:
+        buffer_stride = _check_writable(raw)
+        layout = frame_layout(screen, tiles, opts, pixel_format, stride if stride is not None else buffer_stride)
+        if offset < 0 or offset + layout.nbytes > raw.nbytes:
+            raise ValueError(
+                f"Buffer of {raw.nbytes} bytes cannot hold a {layout.width}x{layout.height} {pixel_format} frame "
+                f"(stride {layout.stride}) at offset {offset}."
+            )
+        row_bytes, line = layout.row_bytes, layout.stride
+        with raw.cast("B") as view:
+            for top, part in _row_bands(screen, tiles, opts, layout):
+                band = memoryview(part.tobytes("raw", pixel_format))
+                start = offset + top * line
+                if line == row_bytes:
+                    view[start:start + band.nbytes] = band
+                    continue
+                for y in range(part.height):
+                    view[start + y * line:start + y * line + row_bytes] = band[y * row_bytes:(y + 1) * row_bytes]
+    return layout
+
+
+def write_raw_frame(
+    path: Path,
+    screen: ScreenSpec,
+    tiles: Dict[str, TileType],
+    opts: RenderOptions,
+    pixel_format: str = "RGB",
+    stride: Optional[int] = None,
+) -> FrameLayout:
+    """Render a lineup into a memory-mapped raw frame file (no header, no encoding).
+
+    An existing file of the right size is rewritten in place, so a playback
+    process that keeps it mapped picks up the new frame; readers may see a
+    partially updated frame while this runs. Otherwise the file is created or
+    resized. The file holds exactly `layout.nbytes` bytes, e.g. for
+    `ffmpeg -f rawvideo -pix_fmt rgb24 -s {width}x{height}`.
+    """
+    layout = frame_layout(screen, tiles, opts, pixel_format, stride)
+    if layout.nbytes == 0:
+        raise ValueError("Cannot map an empty frame.")
+    path = Path(path)
+    mode = "r+b" if path.exists() and path.stat().st_size == layout.nbytes else "w+b"
+    with open(path, mode) as fh:
+        if mode == "w+b":
+            fh.truncate(layout.nbytes)
+        with mmap.mmap(fh.fileno(), layout.nbytes) as mapped:
+            render_lineup_into(mapped, screen, tiles, opts, pixel_format, layout.stride)
+            mapped.flush()
+    return layout
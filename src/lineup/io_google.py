@@ -1,15 +1,19 @@
 from __future__ import annotations
 
+import codecs
 import csv
 import json
 import re
 import string
+import threading
+import time
 from html import unescape
 from io import StringIO
 from urllib.parse import quote, urlparse
 from urllib.request import urlopen
 
-from .models import ScreenSpec, TileType
+from .metrics import METRICS
+from .models import ScreenSpec, TileType, intern_tile_type
 
 COL_SCREEN_NAME = 2   # C (PROD LABEL)
 COL_TILE_LABEL = 3    # D (DELIVERY LABEL)
@@ -23,6 +27,21 @@ COL_TILE_W = 36       # AK (Single Tile Pixel Width)
 COL_TILE_H = 37       # AL (Single Tile Pixel Height)
 COL_LED_FLAG = 1      # B (SCREEN COUNT)
 
+GOOGLE_DOCS_URL = "https://docs.google.com"
+
+FETCH_TIMEOUT_S = 15.0
+SHEET_NAMES_TTL_S = 300.0
+_NAMES_CHUNK_BYTES = 64 * 1024
+_NAMES_MATCH_OVERLAP = 1024
+_SHEET_NAME_PATTERNS = (
+    re.compile(r'"sheetId"\s*:\s*\d+\s*,\s*"name"\s*:\s*"((?:[^"\\]|\\.)+)"'),
+    re.compile(r'"sheetId"\s*:\s*\d+\s*,\s*"title"\s*:\s*"((?:[^"\\]|\\.)+)"'),
+)
+# Characters that open, close or escape JSON structure.
+_JSON_STRUCTURE = re.compile(r'[\[\]{}"\\]')
+_sheet_names_cache: dict[tuple[str, str], tuple[float, list[str]]] = {}
+_sheet_names_lock = threading.Lock()
+
 
 def _extract_sheet_id(sheet_url: str) -> str:
     parts = urlparse(sheet_url)
@@ -36,56 +55,182 @@ def _extract_sheet_id(sheet_url: str) -> str:
     return sheet_id
 
 
-def fetch_google_sheet_csv(sheet_url: str, sheet_name: str | None = None) -> str:
+@METRICS.timed("sheet_fetch")
+def fetch_google_sheet_csv(
+    sheet_url: str,
+    sheet_name: str | None = None,
+    timeout: float = FETCH_TIMEOUT_S,
+    origin: str = GOOGLE_DOCS_URL,
+) -> str:
+    """Fetch one tab (the first if `sheet_name` is None) as CSV text.
+
+    Only the spreadsheet id is taken from `sheet_url`; the request always goes
+    to `origin`, which a test harness may point at a local stand-in.
+    """
     sheet_id = _extract_sheet_id(sheet_url)
     if sheet_name:
         sheet_param = quote(sheet_name)
-        csv_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv&sheet={sheet_param}"
+        csv_url = f"{origin}/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv&sheet={sheet_param}"
     else:
-        csv_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
+        csv_url = f"{origin}/spreadsheets/d/{sheet_id}/export?format=csv"
 
-    with urlopen(csv_url) as resp:
+    with urlopen(csv_url, timeout=timeout) as resp:
         data = resp.read()
     return data.decode("utf-8")
 
 
-def fetch_google_sheet_names(sheet_url: str) -> list[str]:
-    sheet_id = _extract_sheet_id(sheet_url)
-    edit_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/edit"
-
-    with urlopen(edit_url) as resp:
-        html_text = resp.read().decode("utf-8", errors="replace")
-
-    patterns = (
-        r'"sheetId"\s*:\s*\d+\s*,\s*"name"\s*:\s*"([^"]+)"',
-        r'"sheetId"\s*:\s*\d+\s*,\s*"title"\s*:\s*"([^"]+)"',
-    )
-    names: list[str] = []
-    for pattern in patterns:
-        for match in re.findall(pattern, html_text):
-            try:
-                decoded = json.loads(f'"{match}"')
-            except json.JSONDecodeError:
-                decoded = unescape(match)
-            if decoded not in names:
-                names.append(decoded)
-
-    if names:
-        return names
-
-    feed_url = f"https://spreadsheets.google.com/feeds/worksheets/{sheet_id}/public/full?alt=json"
+def _decode_sheet_name(raw: str) -> str:
     try:
-        with urlopen(feed_url) as resp:
-            feed_text = resp.read().decode("utf-8", errors="replace")
-        feed = json.loads(feed_text)
-        entries = feed.get("feed", {}).get("entry", [])
-        for entry in entries:
-            title = entry.get("title", {}).get("$t")
-            if title and title not in names:
-                names.append(title)
-    except Exception:
-        return names
-
+        return json.loads(f'"{raw}"')
+    except json.JSONDecodeError:
+        return unescape(raw)
+
+
+class _JsonArrayEnd:
+    """Find where a JSON array closes, fed text starting at its opening bracket."""
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text: str) -> int:
+        """Return the index just past the closing bracket in `text`, or -1 if not reached yet."""
+        skip_to = 0
+        if self.escaped and text:
+            self.escaped = False
+            skip_to = 1
+        for match in _JSON_STRUCTURE.finditer(text, skip_to):
+            i = match.start()
+            if i < skip_to:
+                continue
+            ch = match.group()
+            if self.in_string:
+                if ch == "\\":
+                    if i + 1 == len(text):
+                        self.escaped = True
+                    skip_to = i + 2
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "[{":
+                self.depth += 1
+            elif ch in "]}":
+                self.depth -= 1
+                if self.depth == 0:
+                    return i + 1
+        return -1
+
+
+def _first_sheet_entry(window: str) -> re.Match | None:
+    matches = [m for m in (p.search(window) for p in _SHEET_NAME_PATTERNS) if m]
+    return min(matches, key=lambda m: m.start()) if matches else None
+
+
+def _scan_sheet_names(resp, deadline: float) -> list[str]:
+    """Read the /edit page in chunks and stop at the end of the tab list.
+
+    Tabs are listed together in one array of the page's bootstrap data, near
+    the top. Once the first entry is found, the array's brackets are tracked
+    and reading stops where it closes, so the rest of the (multi-megabyte)
+    page is never read. If the bracket before the first entry does not open
+    the array holding it, the whole page is read. Raises TimeoutError past `deadline` rather than
+    returning a partial list.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    names: list[str] = []
+    window = ""
+    array_end: _JsonArrayEnd | None = None
+    searching = True
+    while True:
+        if time.monotonic() > deadline:
+            raise TimeoutError("Timed out reading the Google Sheet page.")
+        chunk = resp.read(_NAMES_CHUNK_BYTES)
+        if not chunk:
+            return names
+        text = decoder.decode(chunk)
+        if searching:
+            text = window + text
+            window = ""
+            first = _first_sheet_entry(text)
+            if first is None:
+                window = text[-_NAMES_MATCH_OVERLAP:]
+                continue
+            searching = False
+            opening = text.rfind("[", 0, first.start())
+            # The nearest bracket may open an array inside an earlier entry; it only
+            # encloses the tab list if it is still open at the first entry.
+            if opening >= 0 and _JsonArrayEnd().feed(text[opening : first.start()]) < 0:
+                array_end = _JsonArrayEnd()
+                text = text[opening:]
+        end = array_end.feed(text) if array_end else -1
+        if end >= 0:
+            text = text[:end]
+        window += text
+        for pattern in _SHEET_NAME_PATTERNS:
+            for match in pattern.finditer(window):
+                name = _decode_sheet_name(match.group(1))
+                if name not in names:
+                    names.append(name)
+        if end >= 0:
+            return names
+        # Keep a tail so an entry split across chunks is matched next time;
+        # entries seen twice are dropped by the membership check above.
+        window = window[-_NAMES_MATCH_OVERLAP:]
+
+
+def clear_sheet_names_cache() -> None:
+    with _sheet_names_lock:
+        _sheet_names_cache.clear()
+
+
+@METRICS.timed("sheet_names_fetch")
+def fetch_google_sheet_names(
+    sheet_url: str,
+    timeout: float = FETCH_TIMEOUT_S,
+    ttl_s: float = SHEET_NAMES_TTL_S,
+    origin: str = GOOGLE_DOCS_URL,
+) -> list[str]:
+    """Return the tab names of a shared spreadsheet.
+
+    Names are cached per spreadsheet for `ttl_s` seconds (0 disables the
+    cache). `timeout` bounds the whole lookup, not just each socket read;
+    running out raises TimeoutError, and nothing is cached. Like
+    fetch_google_sheet_csv, the page is fetched from `origin`.
+    """
+    sheet_id = _extract_sheet_id(sheet_url)
+    key = (origin, sheet_id)
+    now = time.monotonic()
+    if ttl_s > 0:
+        with _sheet_names_lock:
+            cached = _sheet_names_cache.get(key)
+        if cached and now - cached[0] < ttl_s:
+            METRICS.inc("sheet_names_cache_hits")
+            return list(cached[1])
+
+    deadline = now + timeout
+    edit_url = f"{origin}/spreadsheets/d/{sheet_id}/edit"
+    with urlopen(edit_url, timeout=timeout) as resp:
+        names = _scan_sheet_names(resp, deadline)
+
+    if not names and origin == GOOGLE_DOCS_URL:
+        feed_url = f"https://spreadsheets.google.com/feeds/worksheets/{sheet_id}/public/full?alt=json"
+        try:
+            with urlopen(feed_url, timeout=max(0.1, deadline - time.monotonic())) as resp:
+                feed_text = resp.read().decode("utf-8", errors="replace")
+            feed = json.loads(feed_text)
+            entries = feed.get("feed", {}).get("entry", [])
+            for entry in entries:
+                title = entry.get("title", {}).get("$t")
+                if title and title not in names:
+                    names.append(title)
+        except Exception:
+            return names
+
+    if names and ttl_s > 0:
+        with _sheet_names_lock:
+            _sheet_names_cache[key] = (time.monotonic(), list(names))
     return names
 
 
@@ -173,6 +318,7 @@ def _is_number(value: str | None) -> bool:
     return True
 
 
+@METRICS.timed("load")
 def load_screens_from_google_csv(
     text: str,
     lineup_colors: dict[str, str] | None = None,
@@ -218,11 +364,7 @@ def load_screens_from_google_csv(
 
             default_tile_type_id = f"{w_px}x{h_px}"
             if default_tile_type_id not in tiles:
-                tiles[default_tile_type_id] = TileType(
-                    tile_type_id=default_tile_type_id,
-                    w_px=w_px,
-                    h_px=h_px,
-                )
+                tiles[default_tile_type_id] = intern_tile_type(default_tile_type_id, w_px, h_px)
 
             full_rows = int(rows_float)
             has_half_row = rows_float != full_rows
@@ -236,11 +378,7 @@ def load_screens_from_google_csv(
                     raise ValueError(f"Row {row_num}: invalid half-height for tile h_px {h_px}")
                 secondary_tile_type_id = f"{w_px}x{half_h}"
                 if secondary_tile_type_id not in tiles:
-                    tiles[secondary_tile_type_id] = TileType(
-                        tile_type_id=secondary_tile_type_id,
-                        w_px=w_px,
-                        h_px=half_h,
-                    )
+                    tiles[secondary_tile_type_id] = intern_tile_type(secondary_tile_type_id, w_px, half_h)
         else:
             cols = 1
             total_rows = 1
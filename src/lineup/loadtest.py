@@ -0,0 +1,546 @@
+from __future__ import annotations
+
+import csv
+import gc
+import random
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, field, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+from urllib.parse import parse_qs, urlparse
+
+from .catalog import ScreenCatalog
+from .export import export_variant_matrix
+from .io_google import (
+    COL_BASE_COLOR,
+    COL_COLS,
+    COL_EXPECTED_H,
+    COL_EXPECTED_W,
+    COL_LED_FLAG,
+    COL_ROWS,
+    COL_SCREEN_NAME,
+    COL_SECONDARY_PLACEMENT,
+    COL_TILE_H,
+    COL_TILE_LABEL,
+    COL_TILE_W,
+    clear_sheet_names_cache,
+    fetch_google_sheet_csv,
+    fetch_google_sheet_names,
+    load_lineup_colors_from_csv,
+    load_screens_from_google_csv,
+)
+from .models import LINEUP_TYPES
+from .palette import PALETTE
+from .renderer import RenderOptions, clear_layer_cache, render_lineup_png
+from .snapshot import ShowSnapshot, decode_snapshot, encode_snapshot, source_digest
+
+SHEET_WIDTH = 38  # A..AL
+
+# Columns the sheet fills in by formula; the loader ignores them but they make
+# generated rows as wide and noisy as real ones.
+_COL_TOTAL_PX = 7
+_COL_RATIO = 8
+_COL_AUTO_W = 10
+_COL_AUTO_H = 11
+_COL_COUNT = 15
+_COL_PRODUCT = 32
+_COL_TILE_MM_W = 34
+_COL_TILE_MM_H = 35
+
+# (cols range, full rows range) per size class
+SIZE_PROFILES: Dict[str, tuple[tuple[int, int], tuple[int, int]]] = {
+    "small": ((2, 8), (1, 4)),
+    "medium": ((8, 20), (3, 8)),
+    "large": ((16, 40), (6, 12)),
+}
+DEFAULT_SIZE_MIX: Dict[str, float] = {"small": 0.6, "medium": 0.3, "large": 0.1}
+
+# (product, tile px w, tile px h, tile mm w, tile mm h)
+TILE_PRODUCTS = (
+    ("Roe BP2V2", 176, 176, 500, 500),
+    ("Roe CB5", 120, 120, 600, 600),
+    ("Roe GP2.6", 192, 384, 500, 1000),
+    ("Absen PL2.5", 200, 200, 500, 500),
+    ("Unilumin Upad III 2.6", 192, 192, 500, 500),
+    ("Infiled AR3.9", 128, 128, 500, 500),
+)
+PLAYBACK_SIZES = ((1920, 1080), (3840, 2160), (1280, 720), (2560, 1440))
+
+_NAME_PARTS = (
+    "Upstage", "Downstage", "House Left", "House Right", "Center", "IMAG",
+    "Fascia", "Riser", "Header", "Portal", "Floor", "Pillar", "Ribbon", "Delay",
+)
+
+
+def _header_rows() -> list[list[str]]:
+    rows = [[""] * SHEET_WIDTH for _ in range(5)]
+    rows[1][1] = "SHOW - Screen_Notes"
+    rows[2][1] = "COMPLETE INFO IN ORANGE"
+    rows[3][COL_EXPECTED_W] = "PIXELS"
+    rows[3][_COL_TOTAL_PX] = "Total Per Screen"
+    rows[3][_COL_RATIO] = "Screen Ratio"
+    rows[3][_COL_AUTO_W] = "AUTO\nScreen Calc"
+    rows[3][COL_COLS] = "TILE LAYOUT"
+    rows[3][COL_TILE_W] = "Single Tile"
+    header = rows[4]
+    header[COL_LED_FLAG] = "SCREEN COUNT"
+    header[COL_SCREEN_NAME] = "PROD \nLABEL"
+    header[COL_TILE_LABEL] = "DELIVERY \nLABEL"
+    header[COL_BASE_COLOR] = "Lineup Color"
+    header[COL_EXPECTED_W] = header[_COL_AUTO_W] = header[COL_COLS] = "W"
+    header[COL_EXPECTED_H] = header[_COL_AUTO_H] = header[COL_ROWS] = "H"
+    header[_COL_COUNT] = "COUNT"
+    header[COL_SECONDARY_PLACEMENT] = "half tile position"
+    header[_COL_PRODUCT] = "PRODUCT"
+    header[COL_TILE_W] = "Pixel \nWidth"
+    header[COL_TILE_H] = "Pixel Height"
+    return rows
+
+
+def _formula_cells(row: list[str], w: int, h: int, auto_w: int, auto_h: int) -> None:
+    row[_COL_TOTAL_PX] = str(w * h)
+    row[_COL_RATIO] = f"{w / h:.9g}" if h else "#DIV/0!"
+    row[_COL_AUTO_W] = str(auto_w)
+    row[_COL_AUTO_H] = str(auto_h)
+    row[_COL_COUNT] = "0"
+
+
+def generate_screen_notes_csv(
+    screens: int = 50,
+    *,
+    half_row_ratio: float = 0.15,
+    playback_ratio: float = 0.1,
+    expected_size_ratio: float = 0.3,
+    duplicate_name_ratio: float = 0.0,
+    size_mix: Optional[Dict[str, float]] = None,
+    colors: Sequence[str] = tuple(PALETTE),
+    blank_rows: int = 10,
+    seed: int = 0,
+) -> str:
+    """Return a synthetic screen notes sheet as CSV, laid out like the real one.
+
+    Screens are LED walls built from TILE_PRODUCTS, sized by drawing a class
+    from `size_mix` (weights over SIZE_PROFILES), except `playback_ratio` of
+    them which are fixed-resolution playback outputs (Circle X Grid only).
+    `half_row_ratio` of the walls get a trailing half row (e.g. "5.5" rows) and
+    `expected_size_ratio` also fill the PIXELS W/H columns. The same arguments
+    and seed always produce the same text.
+    """
+    rng = random.Random(seed)
+    mix = size_mix or DEFAULT_SIZE_MIX
+    classes = [name for name in mix if mix[name] > 0]
+    weights = [mix[name] for name in classes]
+    for name in classes:
+        if name not in SIZE_PROFILES:
+            raise ValueError(f"Unknown size class: {name}")
+
+    rows = _header_rows()
+    names: list[str] = []
+    for n in range(1, screens + 1):
+        row = [""] * SHEET_WIDTH
+        row[COL_LED_FLAG] = str(n)
+        if names and rng.random() < duplicate_name_ratio:
+            name = rng.choice(names)
+        else:
+            name = f"{rng.choice(_NAME_PARTS)} Screen {n}"
+            names.append(name)
+        row[COL_SCREEN_NAME] = name
+        row[COL_TILE_LABEL] = f"SC{n:04d}"
+        row[COL_BASE_COLOR] = rng.choice(colors)
+
+        if rng.random() < playback_ratio:
+            w, h = rng.choice(PLAYBACK_SIZES)
+            row[COL_EXPECTED_W] = str(w)
+            row[COL_EXPECTED_H] = str(h)
+            _formula_cells(row, w, h, 0, 0)
+            rows.append(row)
+            continue
+
+        (c_lo, c_hi), (r_lo, r_hi) = SIZE_PROFILES[rng.choices(classes, weights)[0]]
+        product, tile_w, tile_h, mm_w, mm_h = rng.choice(TILE_PRODUCTS)
+        cols = rng.randint(c_lo, c_hi)
+        full_rows = rng.randint(r_lo, r_hi)
+        auto_w = cols * tile_w
+        auto_h = full_rows * tile_h
+        if rng.random() < half_row_ratio:
+            row[COL_ROWS] = f"{full_rows}.5"
+            row[COL_SECONDARY_PLACEMENT] = rng.choice(("top", "bottom", ""))
+            auto_h += tile_h // 2
+        else:
+            row[COL_ROWS] = str(full_rows)
+        row[COL_COLS] = str(cols)
+        row[COL_TILE_W] = str(tile_w)
+        row[COL_TILE_H] = str(tile_h)
+        row[_COL_PRODUCT] = product
+        row[_COL_TILE_MM_W] = str(mm_w)
+        row[_COL_TILE_MM_H] = str(mm_h)
+        if rng.random() < expected_size_ratio:
+            row[COL_EXPECTED_W] = str(auto_w)
+            row[COL_EXPECTED_H] = str(auto_h)
+            _formula_cells(row, auto_w, auto_h, auto_w, auto_h)
+        else:
+            _formula_cells(row, 0, 0, auto_w, auto_h)
+        rows.append(row)
+
+    # Sheets keep numbered, formula-only rows below the last screen.
+    for n in range(screens + 1, screens + 1 + blank_rows):
+        row = [""] * SHEET_WIDTH
+        row[COL_LED_FLAG] = str(n)
+        _formula_cells(row, 0, 0, 0, 0)
+        rows.append(row)
+
+    out = StringIO()
+    csv.writer(out, lineterminator="\r\n").writerows(rows)
+    return out.getvalue()
+
+
+def generate_lineup_colors_csv(count: int = 8, seed: int = 0) -> str:
+    """Return a LineupColors sheet (Name,Hex) with `count` custom colors.
+
+    Every fourth color is a dual "#AAAAAA/#BBBBBB" split color.
+    """
+    rng = random.Random(seed)
+    rows = [["Name", "Hex"]]
+    for n in range(1, count + 1):
+        value = f"#{rng.randrange(0x1000000):06X}"
+        if n % 4 == 0:
+            value = f"{value}/#{rng.randrange(0x1000000):06X}"
+        rows.append([f"Show Color {n}", value])
+    out = StringIO()
+    csv.writer(out, lineterminator="\r\n").writerows(rows)
+    return out.getvalue()
+
+
+def _gviz_csv(text: str) -> str:
+    # The gviz endpoint quotes every cell, unlike the plain export.
+    out = StringIO()
+    csv.writer(out, quoting=csv.QUOTE_ALL, lineterminator="\n").writerows(csv.reader(StringIO(text)))
+    return out.getvalue()
+
+
+_SHEET_PATH = re.compile(r"^/spreadsheets/d/([^/]+)/(export|gviz/tq|edit)$")
+
+
+class FakeSheetsServer:
+    """Local stand-in for the Google Sheets endpoints io_google fetches from.
+
+    Serves `sheets` (sheet name -> CSV text, first one is the default tab) for
+    one spreadsheet id under /spreadsheets/d/{id}/export?format=csv,
+    /gviz/tq?tqx=out:csv&sheet=NAME and /edit (an HTML page listing the sheet
+    names, padded to `edit_page_bytes` like the real editor). `latency_s` is
+    added to every response. Pass `base_url` as the `origin` of io_google's
+    fetch functions to read from it instead of Google.
+    """
+
+    def __init__(
+        self,
+        sheets: Dict[str, str],
+        spreadsheet_id: str = "FAKE_SHEET",
+        latency_s: float = 0.0,
+        edit_page_bytes: int = 512 * 1024,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        if not sheets:
+            raise ValueError("FakeSheetsServer needs at least one sheet.")
+        self.sheets = dict(sheets)
+        self.spreadsheet_id = spreadsheet_id
+        self.latency_s = latency_s
+        self.edit_page_bytes = edit_page_bytes
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _FakeSheetsHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake_sheets = self  # type: ignore[attr-defined]
+        threading.Thread(target=self.httpd.serve_forever, name="lineup-fake-sheets", daemon=True).start()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def sheet_url(self) -> str:
+        return f"{self.base_url}/spreadsheets/d/{self.spreadsheet_id}/edit#gid=0"
+
+    def edit_page(self) -> str:
+        tabs = ",".join(f'{{"sheetId":{i},"name":"{name}"}}' for i, name in enumerate(self.sheets))
+        head = f"<!DOCTYPE html><html><head><title>Sheet</title></head><body><script>var bootstrapData = {{\"sheets\":[{tabs}]}};</script>"
+        padding = max(0, self.edit_page_bytes - len(head) - len("</body></html>"))
+        return head + "<!--" + "x" * max(0, padding - 7) + "-->" + "</body></html>"
+
+    def respond(self, path: str, query: Dict[str, list[str]]) -> tuple[int, str, str]:
+        with self._lock:
+            self.requests += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        match = _SHEET_PATH.match(path)
+        if not match or match.group(1) != self.spreadsheet_id:
+            return 404, "text/plain", "Not found"
+        endpoint = match.group(2)
+        if endpoint == "edit":
+            return 200, "text/html; charset=utf-8", self.edit_page()
+        if endpoint == "export":
+            return 200, "text/csv; charset=utf-8", next(iter(self.sheets.values()))
+        name = query.get("sheet", [""])[0]
+        if name not in self.sheets:
+            return 400, "text/plain", f"Unable to parse range: {name}"
+        return 200, "text/csv; charset=utf-8", _gviz_csv(self.sheets[name])
+
+    def shutdown(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeSheetsServer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+
+
+class _FakeSheetsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        server: FakeSheetsServer = self.server.fake_sheets  # type: ignore[attr-defined]
+        parts = urlparse(self.path)
+        status, content_type, text = server.respond(parts.path, parse_qs(parts.query))
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # Tab discovery hangs up once it has the sheet names.
+            pass
+
+    def log_message(self, format, *args) -> None:  # noqa: A002 - BaseHTTPRequestHandler signature
+        pass
+
+
+@dataclass(frozen=True)
+class StageTiming:
+    name: str
+    seconds: float
+    items: int
+    unit: str
+    nbytes: int = 0
+    pixels: int = 0
+
+    def describe(self) -> str:
+        secs = max(self.seconds, 1e-9)
+        parts = [f"{self.name:<7} {self.seconds:8.3f}s  {self.items} {self.unit} ({self.items / secs:.1f}/s)"]
+        if self.nbytes:
+            parts.append(f"{self.nbytes / 1e6:.2f} MB ({self.nbytes / 1e6 / secs:.1f} MB/s)")
+        if self.pixels:
+            parts.append(f"{self.pixels / 1e6:.1f} MP ({self.pixels / 1e6 / secs:.1f} MP/s)")
+        return "  ".join(parts)
+
+
+@dataclass
+class LoadTestReport:
+    screens_generated: int
+    screens_parsed: int
+    stages: list[StageTiming] = field(default_factory=list)
+
+    def stage(self, name: str) -> Optional[StageTiming]:
+        return next((s for s in self.stages if s.name == name), None)
+
+    def format(self) -> str:
+        lines = [f"{self.screens_generated} screens generated, {self.screens_parsed} parsed"]
+        lines.extend(stage.describe() for stage in self.stages)
+        return "\n".join(lines)
+
+
+def run_load_test(
+    screens: int = 50,
+    *,
+    seed: int = 0,
+    half_row_ratio: float = 0.15,
+    playback_ratio: float = 0.1,
+    size_mix: Optional[Dict[str, float]] = None,
+    latency_s: float = 0.0,
+    fetch_rounds: int = 3,
+    lineup_types: Sequence[str] = LINEUP_TYPES,
+    opts: Optional[RenderOptions] = None,
+    out_dir: Optional[Path] = None,
+) -> LoadTestReport:
+    """Generate a show, serve it locally and time it through the whole pipeline.
+
+    Stages: fetch (sheet names, LineupColors and the screen sheet over HTTP,
+    `fetch_rounds` times), parse (CSV -> catalog), render (every eligible
+    screen x `lineup_types` with overlay, cold layer cache) and export (the
+    same variants rendered, encoded and written by export_variant_matrix into
+    `out_dir`, or a temporary folder that is removed afterwards).
+    """
+    opts = opts or RenderOptions()
+    colors_text = generate_lineup_colors_csv(seed=seed)
+    color_names = tuple(PALETTE) + tuple(load_lineup_colors_from_csv(colors_text))
+    sheet_name = "Screen_Notes"
+    sheet_text = generate_screen_notes_csv(
+        screens,
+        half_row_ratio=half_row_ratio,
+        playback_ratio=playback_ratio,
+        size_mix=size_mix,
+        colors=color_names,
+        seed=seed,
+    )
+    report = LoadTestReport(screens_generated=screens, screens_parsed=0)
+
+    with FakeSheetsServer({sheet_name: sheet_text, "LineupColors": colors_text}, latency_s=latency_s) as server:
+        nbytes = 0
+        start = time.perf_counter()
+        for _ in range(fetch_rounds):
+            clear_sheet_names_cache()
+            names = fetch_google_sheet_names(server.sheet_url, origin=server.base_url)
+            fetched_colors = fetch_google_sheet_csv(server.sheet_url, "LineupColors", origin=server.base_url)
+            fetched_sheet = fetch_google_sheet_csv(server.sheet_url, sheet_name, origin=server.base_url)
+            nbytes += len(fetched_colors) + len(fetched_sheet)
+        report.stages.append(
+            StageTiming("fetch", time.perf_counter() - start, fetch_rounds * 3, "requests", nbytes=nbytes)
+        )
+    if sheet_name not in names:
+        raise RuntimeError(f"Sheet names fetched from the stand-in server are incomplete: {names}")
+
+    start = time.perf_counter()
+    lineup_colors = load_lineup_colors_from_csv(fetched_colors)
+    tiles, parsed = load_screens_from_google_csv(fetched_sheet, lineup_colors=lineup_colors)
+    catalog = ScreenCatalog(parsed, tiles)
+    report.screens_parsed = len(parsed)
+    report.stages.append(
+        StageTiming("parse", time.perf_counter() - start, len(parsed), "screens", nbytes=len(fetched_sheet))
+    )
+
+    clear_layer_cache()
+    rendered = pixels = 0
+    start = time.perf_counter()
+    for lineup_type in lineup_types:
+        type_opts = replace(opts, lineup_type=lineup_type, show_overlay=True)
+        for entry in catalog.eligible(lineup_type):
+            img = render_lineup_png(entry.screen, tiles, type_opts)
+            pixels += img.width * img.height
+            rendered += 1
+    report.stages.append(StageTiming("render", time.perf_counter() - start, rendered, "images", pixels=pixels))
+
+    clear_layer_cache()
+    with tempfile.TemporaryDirectory(prefix="lineup-loadtest-") as tmp:
+        target = out_dir or Path(tmp)
+        target.mkdir(parents=True, exist_ok=True)
+        start = time.perf_counter()
+        count = export_variant_matrix(catalog, opts, target, "v001", lineup_types=lineup_types, overlay_states=(True,))
+        elapsed = time.perf_counter() - start
+        written = sum(p.stat().st_size for p in target.glob("*.png"))
+    report.stages.append(StageTiming("export", elapsed, count, "files", nbytes=written, pixels=pixels))
+    return report
+
+
+# ScreenSpec string fields checked for sharing in the memory benchmark
+_SPEC_STRING_FIELDS = ("screen_name", "tile_label", "default_tile_type_id", "secondary_tile_type_id", "base_color_name")
+
+
+@dataclass(frozen=True)
+class MemoryReport:
+    screens: int
+    parse_s: float
+    # Bytes still allocated for the parsed tiles + screens
+    retained_bytes: int
+    # Highest allocation while parsing (includes the csv module's row lists)
+    peak_bytes: int
+    snapshot_bytes: int
+    snapshot_load_s: float
+    snapshot_retained_bytes: int
+    # Distinct string objects behind all ScreenSpec string fields, and the
+    # number of references to them
+    distinct_strings: int
+    string_refs: int
+
+    def format(self) -> str:
+        per = max(self.screens, 1)
+        return "\n".join(
+            [
+                f"{self.screens} screens",
+                f"parse     {self.parse_s:8.3f}s  retained {self.retained_bytes / 2**20:.1f} MB "
+                f"({self.retained_bytes / per:.0f} B/screen), peak {self.peak_bytes / 2**20:.1f} MB",
+                f"snapshot  {self.snapshot_load_s:8.3f}s  retained {self.snapshot_retained_bytes / 2**20:.1f} MB "
+                f"({self.snapshot_retained_bytes / per:.0f} B/screen), file {self.snapshot_bytes / 2**20:.1f} MB",
+                f"strings   {self.distinct_strings} distinct objects for {self.string_refs} references",
+            ]
+        )
+
+
+def _traced(load):
+    """Run `load()` under tracemalloc; return (result, retained bytes, peak bytes)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = load()
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, retained, peak
+
+
+def run_memory_benchmark(
+    screens: int = 100_000,
+    *,
+    seed: int = 0,
+    half_row_ratio: float = 0.15,
+    playback_ratio: float = 0.1,
+    size_mix: Optional[Dict[str, float]] = None,
+) -> MemoryReport:
+    """Measure the memory a parsed show of `screens` screens holds.
+
+    The generated sheet is parsed once for time and once under tracemalloc
+    for retained and peak bytes; the same show is then encoded as a snapshot
+    and decoded the same way. Inputs (CSV text, snapshot bytes) are allocated
+    before tracing starts, so only the model objects are counted.
+    """
+    colors_text = generate_lineup_colors_csv(seed=seed)
+    lineup_colors = load_lineup_colors_from_csv(colors_text)
+    sheet_text = generate_screen_notes_csv(
+        screens,
+        half_row_ratio=half_row_ratio,
+        playback_ratio=playback_ratio,
+        size_mix=size_mix,
+        colors=tuple(PALETTE) + tuple(lineup_colors),
+        seed=seed,
+    )
+    start = time.perf_counter()
+    load_screens_from_google_csv(sheet_text, lineup_colors=lineup_colors)
+    parse_s = time.perf_counter() - start
+
+    (tiles, specs), retained, peak = _traced(
+        lambda: load_screens_from_google_csv(sheet_text, lineup_colors=lineup_colors)
+    )
+    refs = [getattr(spec, name) for spec in specs for name in _SPEC_STRING_FIELDS]
+    refs = [value for value in refs if value is not None]
+    distinct, n_refs = len({id(value) for value in refs}), len(refs)
+    data = encode_snapshot(
+        ShowSnapshot(tiles, specs, lineup_colors, "memory-benchmark", source_digest(sheet_text, colors_text))
+    )
+    count = len(specs)
+    # Drop the parsed show so the snapshot decode is measured on its own.
+    del tiles, specs, refs
+
+    start = time.perf_counter()
+    decode_snapshot(data)
+    snapshot_load_s = time.perf_counter() - start
+    _, snapshot_retained, _ = _traced(lambda: decode_snapshot(data))
+    return MemoryReport(
+        screens=count,
+        parse_s=parse_s,
+        retained_bytes=retained,
+        peak_bytes=peak,
+        snapshot_bytes=len(data),
+        snapshot_load_s=snapshot_load_s,
+        snapshot_retained_bytes=snapshot_retained,
+        distinct_strings=distinct,
+        string_refs=n_refs,
+    )
@@ -1,18 +1,49 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import sys
+import threading
+from dataclasses import dataclass, field
 from typing import Literal, Optional
 
 Placement = Literal["top", "bottom"]
 
-@dataclass(frozen=True)
+LINEUP_TYPES = ("RGB", "GreyscaleSteps", "CircleXGrid")
+
+# Distinct tile types seen by loaders are few; past this many (e.g. a service
+# fed arbitrary specs) new ones are no longer registered.
+_TILE_REGISTRY_MAX = 4096
+
+@dataclass(frozen=True, slots=True)
 class TileType:
     tile_type_id: str
     w_px: int
     h_px: int
 
-@dataclass(frozen=True)
+_tile_registry: dict[tuple[str, int, int], TileType] = {}
+_tile_registry_lock = threading.Lock()
+
+def intern_tile_type(tile_type_id: str, w_px: int, h_px: int) -> TileType:
+    """Return the shared TileType for these values, creating it on first use.
+
+    Every sheet load of the same show then reuses the same instances.
+    """
+    key = (tile_type_id, w_px, h_px)
+    tile = _tile_registry.get(key)
+    if tile is None:
+        tile = TileType(sys.intern(tile_type_id), w_px, h_px)
+        with _tile_registry_lock:
+            if len(_tile_registry) < _TILE_REGISTRY_MAX:
+                tile = _tile_registry.setdefault(key, tile)
+    return tile
+
+@dataclass(frozen=True, slots=True)
 class ScreenSpec:
+    """One screen of a show.
+
+    Slotted, with its string fields interned and its hash computed once, so
+    large shows stay small in memory and specs are cheap dict/cache keys.
+    """
+
     screen_name: str
     tile_label: str
     rows: int
@@ -24,6 +55,37 @@ class ScreenSpec:
     base_color_name: str = "Blue"
     expected_w_px: Optional[int] = None
     expected_h_px: Optional[int] = None
+    _hash: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Tile ids, color names and labels repeat across thousands of specs.
+        for name in ("screen_name", "tile_label", "default_tile_type_id", "secondary_tile_type_id", "base_color_name"):
+            value = getattr(self, name)
+            if type(value) is str:
+                object.__setattr__(self, name, sys.intern(value))
+        object.__setattr__(self, "_hash", hash(self._values()))
+
+    def _values(self) -> tuple:
+        return (
+            self.screen_name,
+            self.tile_label,
+            self.rows,
+            self.cols,
+            self.default_tile_type_id,
+            self.secondary_tile_type_id,
+            self.secondary_placement,
+            self.secondary_rows,
+            self.base_color_name,
+            self.expected_w_px,
+            self.expected_h_px,
+        )
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __reduce__(self):
+        # String hashes differ between processes: rebuild (and rehash) on unpickle.
+        return (ScreenSpec, self._values())
 
 def compute_row_tile_type_id(screen: ScreenSpec, row_idx: int) -> str:
     """Return the tile_type_id used for a given row (0-index)."""
@@ -46,11 +108,13 @@ def compute_screen_resolution(screen: ScreenSpec, tiles: dict[str, TileType]) ->
     default_tile = tiles[screen.default_tile_type_id]
     total_w = screen.cols * default_tile.w_px
 
-    # height: sum row heights based on tile used in each row
-    total_h = 0
-    for r in range(screen.rows):
-        t_id = compute_row_tile_type_id(screen, r)
-        total_h += tiles[t_id].h_px
+    # height: rows use the default tile except the secondary block (see compute_row_tile_type_id),
+    # counted in closed form so a huge row count costs nothing to size
+    total_h = screen.rows * default_tile.h_px
+    if screen.secondary_tile_type_id and screen.secondary_rows > 0 and screen.secondary_placement:
+        secondary_rows = min(screen.rows, screen.secondary_rows)
+        if secondary_rows > 0:
+            total_h += secondary_rows * (tiles[screen.secondary_tile_type_id].h_px - default_tile.h_px)
     return total_w, total_h
 
 def validate_screen_against_tiles(screen: ScreenSpec, tiles: dict[str, TileType]) -> list[str]:
@@ -79,7 +143,9 @@ def validate_screen_against_tiles(screen: ScreenSpec, tiles: dict[str, TileType]
                 f"Tile widths differ: default={default_w}px secondary={sec_w}px. This may create row width mismatches."
             )
 
-    # expected resolution check
+    # expected resolution check (needs every row's tile type)
+    if any(compute_row_tile_type_id(screen, r) not in tiles for r in range(screen.rows)):
+        return warnings
     computed_w, computed_h = compute_screen_resolution(screen, tiles)
     if screen.expected_w_px is not None and screen.expected_w_px != computed_w:
         warnings.append(f"Expected width {screen.expected_w_px}px but computed {computed_w}px")
@@ -87,3 +153,13 @@ def validate_screen_against_tiles(screen: ScreenSpec, tiles: dict[str, TileType]
         warnings.append(f"Expected height {screen.expected_h_px}px but computed {computed_h}px")
 
     return warnings
+
+def screen_supports_lineup(screen: ScreenSpec, tiles: dict[str, TileType], lineup_type: str) -> bool:
+    """Return True if `screen` has the data needed to render `lineup_type`."""
+    has_tile_specs = screen.default_tile_type_id in tiles
+    has_expected_size = (screen.expected_w_px or 0) > 0 and (screen.expected_h_px or 0) > 0
+    if lineup_type == "CircleXGrid":
+        return bool(screen.tile_label) and has_expected_size
+    if lineup_type == "GreyscaleSteps":
+        return bool(screen.tile_label) and (has_tile_specs or has_expected_size)
+    return has_tile_specs
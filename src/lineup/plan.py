@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from collections import Counter
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Optional, Protocol, Tuple, Union
+
+RGB = Tuple[int, int, int]
+Box = Tuple[float, float, float, float]
+
+
+# Boxes follow Pillow's ImageDraw conventions: (x0, y0, x1, y1) in canvas pixels,
+# inclusive of x1/y1. Every op also exposes `bounds`, a conservative box used by
+# backends to skip ops outside the region being rendered.
+
+@dataclass(frozen=True)
+class FillRect:
+    box: Box
+    rgb: RGB
+
+    @property
+    def bounds(self) -> Box:
+        return self.box
+
+
+@dataclass(frozen=True)
+class OutlineRect:
+    box: Box
+    rgb: RGB
+    width: int
+
+    @property
+    def bounds(self) -> Box:
+        return self.box
+
+
+@dataclass(frozen=True)
+class Line:
+    xy: Box
+    rgb: RGB
+    width: int
+
+    @property
+    def bounds(self) -> Box:
+        x0, y0, x1, y1 = self.xy
+        pad = self.width
+        return (min(x0, x1) - pad, min(y0, y1) - pad, max(x0, x1) + pad, max(y0, y1) + pad)
+
+
+@dataclass(frozen=True)
+class Ellipse:
+    box: Box
+    rgb: RGB
+    width: int
+
+    @property
+    def bounds(self) -> Box:
+        return self.box
+
+
+@dataclass(frozen=True)
+class TextRun:
+    xy: Tuple[float, float]
+    text: str
+    # Requested font name and the size resolved by layout
+    font_name: str
+    font_size: int
+    rgb: RGB
+    # Ink box of the run (including stroke) at xy
+    bbox: Box
+    stroke_width: int = 0
+    stroke_rgb: Optional[RGB] = None
+
+    @property
+    def bounds(self) -> Box:
+        return self.bbox
+
+
+@dataclass(frozen=True)
+class Composite:
+    # Content digest of the source image; backends resolve it from their image table
+    image_id: str
+    xy: Tuple[int, int]
+    size: Tuple[int, int]
+
+    @property
+    def bounds(self) -> Box:
+        return (self.xy[0], self.xy[1], self.xy[0] + self.size[0], self.xy[1] + self.size[1])
+
+
+PlanOp = Union[FillRect, OutlineRect, Line, Ellipse, TextRun, Composite]
+
+_OP_TYPES = {cls.__name__: cls for cls in (FillRect, OutlineRect, Line, Ellipse, TextRun, Composite)}
+
+
+def _op_to_dict(op: PlanOp) -> dict[str, Any]:
+    return {"op": type(op).__name__, **asdict(op)}
+
+
+def _op_from_dict(data: dict[str, Any]) -> PlanOp:
+    data = dict(data)
+    cls = _OP_TYPES.get(data.pop("op", None))
+    if cls is None:
+        raise ValueError(f"Unknown plan op: {data!r}")
+    kwargs = {}
+    for f in fields(cls):
+        if f.name not in data:
+            continue
+        value = data[f.name]
+        # JSON turns tuples into lists; ops must stay hashable.
+        kwargs[f.name] = tuple(value) if isinstance(value, list) else value
+    return cls(**kwargs)
+
+
+@dataclass(frozen=True)
+class RenderPlan:
+    """Flat, backend-independent description of one lineup canvas.
+
+    `base` holds the background + tiles and is shared by screens with the same
+    base layer key; `top` holds branding and overlay, applied per screen.
+    """
+
+    width: int
+    height: int
+    base: Tuple[PlanOp, ...] = field(default_factory=tuple)
+    top: Tuple[PlanOp, ...] = field(default_factory=tuple)
+
+    @property
+    def ops(self) -> Tuple[PlanOp, ...]:
+        return self.base + self.top
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "width": self.width,
+            "height": self.height,
+            "base": [_op_to_dict(op) for op in self.base],
+            "top": [_op_to_dict(op) for op in self.top],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "RenderPlan":
+        return cls(
+            width=int(data["width"]),
+            height=int(data["height"]),
+            base=tuple(_op_from_dict(op) for op in data.get("base", [])),
+            top=tuple(_op_from_dict(op) for op in data.get("top", [])),
+        )
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, text: str) -> "RenderPlan":
+        return cls.from_dict(json.loads(text))
+
+    def digest(self) -> str:
+        return hashlib.sha256(self.to_json().encode("utf-8")).hexdigest()
+
+
+def _scale_box(box: Box, scale: float) -> Box:
+    return tuple(v * scale for v in box)  # type: ignore[return-value]
+
+
+def _scale_width(width: int, scale: float) -> int:
+    return max(1, int(round(width * scale))) if width else 0
+
+
+def scale_plan(plan: RenderPlan, scale: float, min_font_px: int = 1) -> RenderPlan:
+    """Return `plan` laid out at `scale` (e.g. 0.05 for a thumbnail).
+
+    Geometry and font sizes are scaled; strokes and line widths keep at least
+    one pixel. Text that would be smaller than `min_font_px` is dropped.
+    """
+
+    def scale_op(op: PlanOp) -> Optional[PlanOp]:
+        if isinstance(op, FillRect):
+            return FillRect(_scale_box(op.box, scale), op.rgb)
+        if isinstance(op, OutlineRect):
+            return OutlineRect(_scale_box(op.box, scale), op.rgb, _scale_width(op.width, scale))
+        if isinstance(op, Line):
+            return Line(_scale_box(op.xy, scale), op.rgb, _scale_width(op.width, scale))
+        if isinstance(op, Ellipse):
+            return Ellipse(_scale_box(op.box, scale), op.rgb, _scale_width(op.width, scale))
+        if isinstance(op, TextRun):
+            size = int(round(op.font_size * scale))
+            if size < max(1, min_font_px):
+                return None
+            return TextRun(
+                (op.xy[0] * scale, op.xy[1] * scale),
+                op.text,
+                op.font_name,
+                size,
+                op.rgb,
+                _scale_box(op.bbox, scale),
+                stroke_width=_scale_width(op.stroke_width, scale),
+                stroke_rgb=op.stroke_rgb,
+            )
+        if isinstance(op, Composite):
+            return Composite(
+                op.image_id,
+                (int(round(op.xy[0] * scale)), int(round(op.xy[1] * scale))),
+                (max(1, int(round(op.size[0] * scale))), max(1, int(round(op.size[1] * scale)))),
+            )
+        raise TypeError(f"Unsupported plan op: {op!r}")
+
+    def scale_ops(ops: Tuple[PlanOp, ...]) -> Tuple[PlanOp, ...]:
+        return tuple(scaled for scaled in map(scale_op, ops) if scaled is not None)
+
+    return RenderPlan(
+        width=max(1, int(round(plan.width * scale))),
+        height=max(1, int(round(plan.height * scale))),
+        base=scale_ops(plan.base),
+        top=scale_ops(plan.top),
+    )
+
+
+@dataclass(frozen=True)
+class PlanDiff:
+    size_changed: bool
+    removed: Tuple[PlanOp, ...]
+    added: Tuple[PlanOp, ...]
+
+    def __bool__(self) -> bool:
+        return self.size_changed or bool(self.removed) or bool(self.added)
+
+
+def diff_plans(old: RenderPlan, new: RenderPlan) -> PlanDiff:
+    """Return the ops only in `old` and only in `new` (order-insensitive)."""
+    old_ops = Counter(old.ops)
+    new_ops = Counter(new.ops)
+    return PlanDiff(
+        size_changed=(old.width, old.height) != (new.width, new.height),
+        removed=tuple((old_ops - new_ops).elements()),
+        added=tuple((new_ops - old_ops).elements()),
+    )
+
+
+class PlanBackend(Protocol):
+    def execute(self, plan: RenderPlan, region: Optional[Tuple[int, int, int, int]] = None) -> Any:
+        """Rasterize `plan` (or only `region` of it) and return the result."""
+        ...
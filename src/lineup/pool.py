@@ -0,0 +1,379 @@
+from __future__ import annotations
+
+import threading
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional
+
+from PIL import Image
+
+from .metrics import METRICS
+from .models import ScreenSpec, TileType
+from .renderer import BANDED_MIN_PIXELS, RenderOptions, lineup_canvas_size, render_lineup_png
+
+# 1.6 GB at _BYTES_PER_PIXEL, so the pixel cap binds for plain renders and the
+# byte cap for work that holds more per pixel (e.g. banded base layers).
+DEFAULT_MAX_INFLIGHT_PIXELS = 200_000_000
+DEFAULT_MAX_INFLIGHT_BYTES = 2 * 1024 * 1024 * 1024
+# Pillow keeps RGB canvases at 4 bytes per pixel; a render holds the cached base
+# layer and the composited copy at the same time.
+_BYTES_PER_PIXEL = 8
+# Bands drawn ahead in render_workers processes (see renderer._iter_drawn_bands),
+# and their copies in transit, can together hold up to another canvas.
+_BAND_BYTES_PER_PIXEL = 4
+
+
+class RenderRejected(Exception):
+    """Raised when a render can never fit the pool's budget or the queue is full."""
+
+
+def estimate_render_cost(screen: ScreenSpec, tiles: Dict[str, TileType], opts: RenderOptions) -> tuple[int, int]:
+    """Return (canvas pixels, estimated peak bytes) for a render, without allocating."""
+    w, h = lineup_canvas_size(screen, tiles, opts.lineup_type)
+    pixels = max(0, w) * max(0, h)
+    per_pixel = _BYTES_PER_PIXEL
+    if opts.render_workers > 1 and pixels >= BANDED_MIN_PIXELS:
+        per_pixel += _BAND_BYTES_PER_PIXEL
+    return pixels, pixels * per_pixel
+
+
+class RenderTicket:
+    """Handle for a render submitted to a RenderPool."""
+
+    def __init__(
+        self,
+        pool: "RenderPool",
+        run: Optional[Callable[[], Any]],
+        pixels: int,
+        nbytes: int,
+        background: bool = False,
+    ) -> None:
+        self._pool = pool
+        self._run = run
+        self.pixels = pixels
+        self.nbytes = nbytes
+        self.background = background
+        self.future: Future = Future()
+
+    @property
+    def position(self) -> int:
+        """1-based place in its queue; 0 once the render has started or finished."""
+        return self._pool._position(self)
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout: Optional[float] = None) -> Image.Image:
+        return self.future.result(timeout)
+
+    def cancel(self) -> bool:
+        """Drop the render if it has not started yet."""
+        return self._pool._cancel(self)
+
+
+class RenderLease:
+    """Share of a RenderPool's budget held by work running outside the pool's workers."""
+
+    def __init__(self, ticket: RenderTicket) -> None:
+        self._ticket = ticket
+        self._released = False
+
+    @property
+    def pixels(self) -> int:
+        return self._ticket.pixels
+
+    def release(self) -> None:
+        """Return the budget to the pool; later calls do nothing."""
+        if not self._released:
+            self._released = True
+            self._ticket._pool._release(self._ticket)
+
+    def __enter__(self) -> "RenderLease":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class RenderPool:
+    """One worker pool shared by every session in the process.
+
+    Renders are admitted in FIFO order only while the canvas pixels and
+    estimated memory of everything running stay within `max_pixels` and
+    `max_bytes`; the rest wait in a bounded queue. A render larger than the
+    whole budget, or one arriving at a full queue, is rejected up front.
+
+    Background renders (e.g. speculative prefetch) have their own queue. They
+    start only while no interactive render is waiting, and at most
+    `max_background` of them run at once, so a worker is always left for
+    interactive work.
+
+    Batch work that renders on its own threads (exports, streamed ZIPs) takes
+    its share with `reserve`: a lease waits its turn in the interactive queue
+    and counts against the budget until released, without holding a worker.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_pixels: int = DEFAULT_MAX_INFLIGHT_PIXELS,
+        max_bytes: int = DEFAULT_MAX_INFLIGHT_BYTES,
+        max_queued: int = 32,
+        max_background: int = 1,
+    ) -> None:
+        self.max_pixels = max_pixels
+        self.max_bytes = max_bytes
+        self.max_queued = max_queued
+        self.max_background = max(0, min(max_background, max_workers - 1))
+        self._queue: deque[RenderTicket] = deque()
+        self._background: deque[RenderTicket] = deque()
+        self._background_running = 0
+        self._cond = threading.Condition()
+        self._inflight_pixels = 0
+        self._inflight_bytes = 0
+        self._closed = False
+        self._workers = [
+            threading.Thread(target=self._work, name=f"lineup-render-pool-{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    @property
+    def queued(self) -> int:
+        with self._cond:
+            return len(self._queue) + len(self._background)
+
+    @property
+    def inflight_bytes(self) -> int:
+        with self._cond:
+            return self._inflight_bytes
+
+    def submit(
+        self,
+        screen: ScreenSpec,
+        tiles: Dict[str, TileType],
+        opts: RenderOptions,
+        render: Callable[[ScreenSpec, Dict[str, TileType], RenderOptions], Image.Image] = render_lineup_png,
+        background: bool = False,
+    ) -> RenderTicket:
+        pixels, nbytes = estimate_render_cost(screen, tiles, opts)
+        return self.submit_call(lambda: render(screen, tiles, opts), pixels, nbytes, background)
+
+    def submit_call(
+        self,
+        run: Callable[[], Any],
+        pixels: int,
+        nbytes: Optional[int] = None,
+        background: bool = False,
+    ) -> RenderTicket:
+        """Queue `run()` on a worker, admitted once `pixels` and `nbytes` fit the budget."""
+        if nbytes is None:
+            nbytes = pixels * _BYTES_PER_PIXEL
+        if pixels > self.max_pixels or nbytes > self.max_bytes:
+            METRICS.inc("render_pool_rejected")
+            raise RenderRejected(
+                f"A {pixels / 1e6:.0f} MP render needs about {nbytes / 2**20:.0f} MB, more than this "
+                f"machine's render budget ({self.max_pixels / 1e6:.0f} MP, {self.max_bytes / 2**20:.0f} MB)."
+            )
+        return self._enqueue(RenderTicket(self, run, pixels, nbytes, background))
+
+    def _enqueue(self, ticket: RenderTicket) -> RenderTicket:
+        queue = self._background if ticket.background else self._queue
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Render pool is shut down.")
+            if len(queue) >= self.max_queued:
+                METRICS.inc("render_pool_rejected")
+                raise RenderRejected("Too many renders are waiting; try again shortly.")
+            queue.append(ticket)
+            self._grant_leases()
+            self._cond.notify_all()
+        return ticket
+
+    def render(
+        self,
+        screen: ScreenSpec,
+        tiles: Dict[str, TileType],
+        opts: RenderOptions,
+        on_wait: Optional[Callable[[int], None]] = None,
+        poll_s: float = 0.25,
+    ) -> Image.Image:
+        """Submit a render and block until it finishes.
+
+        `on_wait(position)` is called every `poll_s` seconds while the render is
+        queued or running (position 0). The render is withdrawn if the caller
+        is interrupted while it is still queued.
+        """
+        return self._wait(self.submit(screen, tiles, opts), on_wait, poll_s)
+
+    def run(
+        self,
+        fn: Callable[[], Any],
+        pixels: int,
+        nbytes: Optional[int] = None,
+        on_wait: Optional[Callable[[int], None]] = None,
+        poll_s: float = 0.25,
+    ) -> Any:
+        """Run `fn()` on a worker as an interactive render costing `pixels` and `nbytes`; block for its result."""
+        return self._wait(self.submit_call(fn, pixels, nbytes), on_wait, poll_s)
+
+    def reserve(
+        self,
+        pixels: int,
+        nbytes: Optional[int] = None,
+        cancelled: Optional[threading.Event] = None,
+        on_wait: Optional[Callable[[int], None]] = None,
+        poll_s: float = 0.25,
+    ) -> RenderLease:
+        """Block until `pixels` and `nbytes` of the budget are free and return a lease on them.
+
+        The caller does the work on its own thread and must release the lease
+        (or use it as a context manager). A request larger than the whole
+        budget is trimmed to it, so oversized work still runs, alone. Setting
+        `cancelled` while waiting withdraws the request and raises
+        RenderRejected.
+        """
+        if nbytes is None:
+            nbytes = pixels * _BYTES_PER_PIXEL
+        ticket = self._enqueue(RenderTicket(self, None, min(pixels, self.max_pixels), min(nbytes, self.max_bytes)))
+        try:
+            while True:
+                try:
+                    ticket.result(timeout=poll_s)
+                    return RenderLease(ticket)
+                except FutureTimeout:
+                    if cancelled is not None and cancelled.is_set():
+                        raise RenderRejected("Cancelled while waiting for render budget.")
+                    if on_wait:
+                        on_wait(ticket.position)
+        except BaseException:
+            if not ticket.cancel() and ticket.future.done() and not ticket.future.cancelled():
+                # Granted just as the caller gave up.
+                self._release(ticket)
+            raise
+
+    def _wait(self, ticket: RenderTicket, on_wait: Optional[Callable[[int], None]], poll_s: float) -> Any:
+        try:
+            while True:
+                try:
+                    return ticket.result(timeout=poll_s)
+                except FutureTimeout:
+                    if on_wait:
+                        on_wait(ticket.position)
+        except BaseException:
+            ticket.cancel()
+            raise
+
+    def _position(self, ticket: RenderTicket) -> int:
+        with self._cond:
+            try:
+                return (self._background if ticket.background else self._queue).index(ticket) + 1
+            except ValueError:
+                return 0
+
+    def _cancel(self, ticket: RenderTicket) -> bool:
+        with self._cond:
+            try:
+                (self._background if ticket.background else self._queue).remove(ticket)
+            except ValueError:
+                return False
+            self._grant_leases()
+            self._cond.notify_all()
+        return ticket.future.cancel()
+
+    def _release(self, ticket: RenderTicket) -> None:
+        with self._cond:
+            self._inflight_pixels -= ticket.pixels
+            self._inflight_bytes -= ticket.nbytes
+            self._grant_leases()
+            self._cond.notify_all()
+
+    def _grant_leases(self) -> None:
+        # Called with the lock held. Leases need no worker, so they are granted
+        # here as soon as they reach the head of the queue and fit.
+        while self._queue and self._queue[0]._run is None and self._fits(self._queue[0]):
+            ticket = self._queue.popleft()
+            if ticket.future.set_running_or_notify_cancel():
+                self._inflight_pixels += ticket.pixels
+                self._inflight_bytes += ticket.nbytes
+                ticket.future.set_result(None)
+
+    def _fits(self, ticket: RenderTicket) -> bool:
+        return (
+            self._inflight_pixels + ticket.pixels <= self.max_pixels
+            and self._inflight_bytes + ticket.nbytes <= self.max_bytes
+        )
+
+    def _next_queue(self) -> Optional[deque[RenderTicket]]:
+        # Only heads are considered, so a large render is never starved by
+        # smaller ones arriving behind it.
+        if self._queue:
+            head = self._queue[0]
+            return self._queue if head._run is not None and self._fits(head) else None
+        if (
+            self._background
+            and self._background_running < self.max_background
+            and self._fits(self._background[0])
+        ):
+            return self._background
+        return None
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and self._next_queue() is None:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                ticket = self._next_queue().popleft()
+                self._inflight_pixels += ticket.pixels
+                self._inflight_bytes += ticket.nbytes
+                if ticket.background:
+                    self._background_running += 1
+                self._cond.notify_all()
+            try:
+                if ticket.future.set_running_or_notify_cancel():
+                    try:
+                        ticket.future.set_result(ticket._run())
+                    except BaseException as exc:
+                        ticket.future.set_exception(exc)
+            finally:
+                with self._cond:
+                    self._inflight_pixels -= ticket.pixels
+                    self._inflight_bytes -= ticket.nbytes
+                    if ticket.background:
+                        self._background_running -= 1
+                    self._grant_leases()
+                    self._cond.notify_all()
+            # Don't keep the finished render's closure (and whatever it holds) alive while idle.
+            ticket = None
+
+    def shutdown(self) -> None:
+        """Stop the workers after their current render; queued renders are cancelled."""
+        with self._cond:
+            self._closed = True
+            pending = list(self._queue) + list(self._background)
+            self._queue.clear()
+            self._background.clear()
+            self._cond.notify_all()
+        for ticket in pending:
+            ticket.future.cancel()
+        for worker in self._workers:
+            worker.join()
+
+
+_pool: RenderPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> RenderPool:
+    """Return the process-wide render pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = RenderPool()
+            METRICS.register_gauge("render_pool_queued", lambda: _pool.queued if _pool else 0)
+            METRICS.register_gauge("render_pool_inflight_bytes", lambda: _pool.inflight_bytes if _pool else 0)
+        return _pool
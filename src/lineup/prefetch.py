@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import threading
+import weakref
+from concurrent.futures import CancelledError
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Dict, Optional, Sequence
+
+from PIL import Image
+
+from .cache import LRUCache, image_nbytes
+from .metrics import METRICS
+from .models import ScreenSpec, TileType
+from .pool import RenderPool, RenderRejected, get_render_pool
+from .renderer import RenderOptions, lineup_canvas_size, render_spec_key
+
+PREFETCH_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Larger screens are left to the interactive path: one of them would evict
+# most of the cache and hold the background worker for seconds.
+PREFETCH_MAX_PIXELS = 16_000_000
+
+# Shared by every session: keys are spec hashes, so the same screen and options
+# loaded in two browser tabs are rendered once.
+_preview_cache = LRUCache(PREFETCH_CACHE_MAX_BYTES)
+
+
+def neighbor_order(count: int, current: int) -> list[int]:
+    """Indices around `current` nearest first (+1, -1, +2, -2, ...), excluding it."""
+    order = []
+    for step in range(1, count):
+        for i in (current + step, current - step):
+            if 0 <= i < count:
+                order.append(i)
+    return order
+
+
+class Prefetcher:
+    """Speculatively renders the previews an operator is likely to click next.
+
+    `schedule` replaces the plan with every screen of the show, nearest to the
+    current selection first. A background thread renders them one at a time as
+    background work on the shared render pool, which only starts it while no
+    interactive render is waiting. Finished images land in a bounded cache that
+    `get` reads; a new plan drops whatever of the old one is still queued.
+
+    The thread holds only a weak reference, so a prefetcher that is dropped
+    with its session's state stops planning and rendering for it.
+    """
+
+    def __init__(self, pool: Optional[RenderPool] = None, cache: Optional[LRUCache] = None) -> None:
+        self._pool = pool
+        self._cache = _preview_cache if cache is None else cache
+        self._cond = threading.Condition()
+        self._plan: list[tuple[str, ScreenSpec, Dict[str, TileType], RenderOptions]] = []
+        self._generation = 0
+        self._closed = False
+        self.rendered = 0
+        weakref.finalize(self, _wake, self._cond)
+        threading.Thread(
+            target=_prefetch_worker, args=(weakref.ref(self), self._cond), name="lineup-prefetch", daemon=True
+        ).start()
+
+    def get(self, screen: ScreenSpec, tiles: Dict[str, TileType], opts: RenderOptions) -> Optional[Image.Image]:
+        """Return the cached preview for this spec, if one was rendered."""
+        img = self._cache.get(render_spec_key(screen, tiles, opts))
+        METRICS.inc("prefetch_hits" if img is not None else "prefetch_misses")
+        return img
+
+    def remember(self, screen: ScreenSpec, tiles: Dict[str, TileType], opts: RenderOptions, img: Image.Image) -> None:
+        """Cache an interactively rendered preview so returning to it is instant."""
+        if img.width * img.height <= PREFETCH_MAX_PIXELS:
+            self._cache.put(render_spec_key(screen, tiles, opts), img, image_nbytes(img))
+
+    def schedule(
+        self,
+        screens: Sequence[ScreenSpec],
+        tiles: Dict[str, TileType],
+        opts: RenderOptions,
+        current: int = 0,
+    ) -> int:
+        """Plan background renders of `screens` around index `current`.
+
+        Screens already cached or too large are skipped. Returns how many were
+        planned.
+        """
+        plan = []
+        for i in neighbor_order(len(screens), current):
+            screen = screens[i]
+            w, h = lineup_canvas_size(screen, tiles, opts.lineup_type)
+            if w * h > PREFETCH_MAX_PIXELS:
+                continue
+            key = render_spec_key(screen, tiles, opts)
+            if key not in self._cache:
+                plan.append((key, screen, tiles, opts))
+        with self._cond:
+            self._plan = plan
+            self._generation += 1
+            self._cond.notify_all()
+        return len(plan)
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._plan)
+
+    def _stale(self, generation: int) -> bool:
+        with self._cond:
+            return self._closed or generation != self._generation
+
+    def _next_job(self) -> Optional[tuple]:
+        """With the lock held, take the next planned render and its plan generation."""
+        if not self._plan:
+            return None
+        return self._plan.pop(0), self._generation
+
+    def _render_job(self, job: tuple, generation: int) -> None:
+        key, screen, tiles, opts = job
+        if key in self._cache:
+            return
+        pool = self._pool or get_render_pool()
+        try:
+            ticket = pool.submit(screen, tiles, opts, background=True)
+            while True:
+                try:
+                    img = ticket.result(timeout=0.1)
+                    break
+                except FutureTimeout:
+                    # A new plan (or close) withdraws the render if it has not started.
+                    if self._stale(generation) and ticket.cancel():
+                        img = None
+                        break
+        except (RenderRejected, CancelledError, RuntimeError):
+            # Queue full or pool shutting down: speculative work is simply dropped.
+            return
+        except Exception:
+            METRICS.inc("prefetch_errors")
+            return
+        if img is not None:
+            self._cache.put(key, img, image_nbytes(img))
+            self.rendered += 1
+            METRICS.inc("prefetch_renders")
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._plan = []
+            self._cond.notify_all()
+
+
+def _wake(cond: threading.Condition) -> None:
+    with cond:
+        cond.notify_all()
+
+
+def _prefetch_worker(ref: "weakref.ReferenceType[Prefetcher]", cond: threading.Condition) -> None:
+    # Holds the prefetcher only while checking its plan or rendering, never while
+    # waiting, so dropping the prefetcher ends this thread.
+    while True:
+        with cond:
+            while True:
+                prefetcher = ref()
+                if prefetcher is None or prefetcher._closed:
+                    return
+                job = prefetcher._next_job()
+                if job is not None:
+                    break
+                del prefetcher
+                if ref() is None:
+                    return
+                cond.wait()
+        prefetcher._render_job(*job)
+        del prefetcher
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import threading
+import time
+import weakref
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Dict, Optional
+
+from PIL import Image
+
+from .models import ScreenSpec, TileType
+from .pool import RenderPool, get_render_pool
+from .renderer import (
+    BANDED_MIN_PIXELS,
+    RenderOptions,
+    iter_lineup_bands,
+    lineup_canvas_size,
+    render_lineup_png,
+    render_spec_key,
+)
+
+DEFAULT_DEBOUNCE_S = 0.35
+# Superseded renders of large canvases stop at the next band boundary.
+_CANCEL_BANDS = 8
+
+
+class RenderCancelled(Exception):
+    """Raised inside a preview render that a newer request has superseded."""
+
+
+class PreviewRenderer:
+    """Debounced, latest-wins background renders for one interactive session.
+
+    `submit` records the newest spec and returns its key right away. A
+    background thread waits until no newer spec has arrived for `debounce_s`,
+    then renders it on the shared render pool. A spec that is superseded is
+    dropped while queued, or abandoned at the next band boundary once it is
+    rendering. Only the latest finished image is kept.
+
+    The background thread holds only a weak reference, so a renderer that is
+    dropped (e.g. with its session's state) stops its thread and frees its
+    image without `close` being called.
+    """
+
+    def __init__(self, debounce_s: float = DEFAULT_DEBOUNCE_S, pool: Optional[RenderPool] = None) -> None:
+        self.debounce_s = debounce_s
+        self._pool = pool
+        self._cond = threading.Condition()
+        self._pending: Optional[tuple[str, ScreenSpec, Dict[str, TileType], RenderOptions]] = None
+        self._latest_key: Optional[str] = None
+        self._rendering_key: Optional[str] = None
+        self._submitted_at = 0.0
+        self._result: Optional[tuple[str, Image.Image]] = None
+        self._error: Optional[tuple[str, BaseException]] = None
+        self._closed = False
+        self.cancelled = 0
+        weakref.finalize(self, _wake, self._cond)
+        threading.Thread(
+            target=_preview_worker, args=(weakref.ref(self), self._cond), name="lineup-preview", daemon=True
+        ).start()
+
+    def submit(self, screen: ScreenSpec, tiles: Dict[str, TileType], opts: RenderOptions) -> str:
+        """Make this spec the one to render and return its key."""
+        key = render_spec_key(screen, tiles, opts)
+        with self._cond:
+            if key == self._latest_key:
+                return key
+            self._latest_key = key
+            self._error = None
+            if key == self._rendering_key or (self._result and self._result[0] == key):
+                # Already rendering or rendered: just stop the newer spec, if any.
+                self._pending = None
+            else:
+                self._pending = (key, screen, tiles, opts)
+                self._submitted_at = time.monotonic()
+            self._cond.notify_all()
+        return key
+
+    @property
+    def last_image(self) -> Optional[Image.Image]:
+        """The most recent finished preview, which may be for an older spec."""
+        with self._cond:
+            return self._result[1] if self._result else None
+
+    def wait(self, key: str, timeout: float) -> Optional[Image.Image]:
+        """Return the image for `key` once rendered, or None if not ready within `timeout`.
+
+        Re-raises the render's error if it failed.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._result and self._result[0] == key:
+                    return self._result[1]
+                if self._error and self._error[0] == key:
+                    raise self._error[1]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._closed:
+                    return None
+                self._cond.wait(remaining)
+
+    def _superseded(self, key: str) -> bool:
+        with self._cond:
+            return self._closed or key != self._latest_key
+
+    def _render(self, key: str, screen: ScreenSpec, tiles: Dict[str, TileType], opts: RenderOptions) -> Image.Image:
+        if self._superseded(key):
+            raise RenderCancelled(key)
+        w, h = lineup_canvas_size(screen, tiles, opts.lineup_type)
+        if w * h < BANDED_MIN_PIXELS:
+            return render_lineup_png(screen, tiles, opts)
+        img = Image.new("RGB", (w, h), (0, 0, 0))
+        for rect, band in iter_lineup_bands(screen, tiles, opts, count=_CANCEL_BANDS):
+            if self._superseded(key):
+                raise RenderCancelled(key)
+            img.paste(band, rect[:2])
+        return img
+
+    def _next_job(self) -> tuple[Optional[tuple], Optional[float]]:
+        """With the lock held, take the pending spec once its debounce is over.
+
+        Returns (job, None), or (None, seconds until one may be due; None if nothing is pending).
+        """
+        if self._pending is None:
+            return None, None
+        wait = self._submitted_at + self.debounce_s - time.monotonic()
+        if wait > 0:
+            return None, wait
+        job, self._pending = self._pending, None
+        self._rendering_key = job[0]
+        return job, None
+
+    def _render_job(self, key: str, screen: ScreenSpec, tiles: Dict[str, TileType], opts: RenderOptions) -> None:
+        pool = self._pool or get_render_pool()
+        try:
+            ticket = pool.submit(screen, tiles, opts, render=lambda s, t, o: self._render(key, s, t, o))
+            while True:
+                try:
+                    img = ticket.result(timeout=0.1)
+                    break
+                except FutureTimeout:
+                    if self._superseded(key) and ticket.cancel():
+                        raise RenderCancelled(key) from None
+        except RenderCancelled:
+            with self._cond:
+                self._rendering_key = None
+                self.cancelled += 1
+                if key == self._latest_key and self._pending is None:
+                    # Re-requested while it was being abandoned; render it after all.
+                    self._pending = (key, screen, tiles, opts)
+                    self._submitted_at = time.monotonic() - self.debounce_s
+            return
+        except Exception as exc:
+            with self._cond:
+                self._rendering_key = None
+                self._error = (key, exc)
+                self._cond.notify_all()
+            return
+        with self._cond:
+            self._rendering_key = None
+            self._result = (key, img)
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+def _wake(cond: threading.Condition) -> None:
+    with cond:
+        cond.notify_all()
+
+
+def _preview_worker(ref: "weakref.ReferenceType[PreviewRenderer]", cond: threading.Condition) -> None:
+    # Holds the renderer only while checking its state or rendering, never while
+    # waiting, so dropping the renderer ends this thread.
+    while True:
+        with cond:
+            while True:
+                preview = ref()
+                if preview is None or preview._closed:
+                    return
+                job, wait = preview._next_job()
+                if job is not None:
+                    break
+                del preview
+                if ref() is None:
+                    return
+                cond.wait(wait)
+        preview._render_job(*job)
+        del preview
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from types import FrameType
+from typing import Iterator, Optional
+
+DEFAULT_INTERVAL_S = 0.005
+DEFAULT_TOP = 15
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+# Samples taken outside any section (loading the CSV, writing the last file).
+UNLABELED = "(other)"
+
+# A thread whose innermost Python frame is in one of these modules is parked on
+# a lock, queue or socket (or an executor waiting for work); its samples are
+# counted as idle, not as hotspots.
+_IDLE_FILES = ("/threading.py", "/queue.py", "/selectors.py", "/socketserver.py", "/concurrent/futures/thread.py")
+
+Frame = tuple[str, str, int]
+
+
+@dataclass(frozen=True)
+class Hotspot:
+    function: str
+    location: str
+    # Seconds with the function innermost on a busy stack
+    self_s: float
+    # Seconds with the function anywhere on a busy stack
+    total_s: float
+    self_share: float
+
+
+def _stack(frame: Optional[FrameType]) -> tuple[Frame, ...]:
+    """Return the frames of `frame`'s stack, outermost first."""
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append((getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    frames.reverse()
+    return tuple(frames)
+
+
+def _is_idle(stack: tuple[Frame, ...]) -> bool:
+    return not stack or stack[-1][1].replace("\\", "/").endswith(_IDLE_FILES)
+
+
+class SamplingProfiler:
+    """Low-overhead sampling profiler for the threads doing one job.
+
+    A daemon thread snapshots Python stacks every `interval_s` seconds, so the
+    job itself runs uninstrumented (it works the same in the frozen build).
+    Only the thread that calls `start` and threads added with `track_thread`
+    are sampled, so other sessions sharing the process do not show up in the
+    job's hotspots; with `all_threads` (for a process running just the job)
+    every thread is. Each sample is grouped by its thread's current `section`,
+    e.g. one per lineup type. Native code (Pillow, zlib) is attributed to the
+    Python frame that called it.
+    """
+
+    def __init__(self, interval_s: float = DEFAULT_INTERVAL_S, all_threads: bool = False) -> None:
+        self.interval_s = interval_s
+        self.all_threads = all_threads
+        self._samples: dict[str, Counter[tuple[Frame, ...]]] = {}
+        self._idle: Counter[str] = Counter()
+        # Current section of each thread that has entered one
+        self._labels: dict[int, str] = {}
+        self._threads: set[int] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at = 0.0
+        self.elapsed_s = 0.0
+
+    def start(self) -> "SamplingProfiler":
+        self.track_thread()
+        self._stop.clear()
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample_loop, name="lineup-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.elapsed_s += time.perf_counter() - self.started_at
+
+    def __enter__(self) -> "SamplingProfiler":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def track_thread(self, ident: Optional[int] = None) -> None:
+        """Sample thread `ident` (default: the calling thread) from now on."""
+        with self._lock:
+            self._threads.add(threading.get_ident() if ident is None else ident)
+
+    def untrack_thread(self, ident: Optional[int] = None) -> None:
+        """Stop sampling a thread, e.g. before it exits and its ident can be reused."""
+        ident = threading.get_ident() if ident is None else ident
+        with self._lock:
+            self._threads.discard(ident)
+            self._labels.pop(ident, None)
+
+    @contextmanager
+    def section(self, label: str) -> Iterator[None]:
+        """Attribute the calling thread's samples inside the block to `label`."""
+        ident = threading.get_ident()
+        with self._lock:
+            previous = self._labels.get(ident, UNLABELED)
+            self._labels[ident] = label
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._labels[ident] = previous
+
+    def _sample_loop(self) -> None:
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval_s):
+            now = time.perf_counter()
+            # Weight each sample by the real gap, so a late tick is not undercounted.
+            weight, last = now - last, now
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, frame in frames.items():
+                    if ident == own or not (self.all_threads or ident in self._threads):
+                        continue
+                    label = self._labels.get(ident, UNLABELED)
+                    stack = _stack(frame)
+                    if _is_idle(stack):
+                        self._idle[label] += weight
+                    else:
+                        self._samples.setdefault(label, Counter())[stack] += weight
+            del frames
+
+    @property
+    def sections(self) -> list[str]:
+        with self._lock:
+            return [label for label, counts in self._samples.items() if counts]
+
+    def hotspots(self, label: str, top: int = DEFAULT_TOP) -> list[Hotspot]:
+        """Return the `top` functions by self time within one section."""
+        with self._lock:
+            counts = dict(self._samples.get(label, {}))
+        self_s: Counter[Frame] = Counter()
+        total_s: Counter[Frame] = Counter()
+        for stack, seconds in counts.items():
+            self_s[stack[-1]] += seconds
+            for frame in set(stack):
+                total_s[frame] += seconds
+        busy = sum(counts.values()) or 1.0
+        return [
+            Hotspot(name, f"{os.path.basename(path)}:{line}", seconds, total_s[(name, path, line)], seconds / busy)
+            for (name, path, line), seconds in self_s.most_common(top)
+        ]
+
+    def format_summary(self, top: int = DEFAULT_TOP) -> str:
+        """Plain-text hotspot table per section, for logs and bug reports."""
+        lines = [f"Profile: {self.elapsed_s:.2f}s wall, sampled every {self.interval_s * 1000:g} ms"]
+        for label in self.sections:
+            with self._lock:
+                busy = sum(self._samples[label].values())
+                idle = self._idle[label]
+            lines.append("")
+            lines.append(f"[{label}] busy {busy:.2f} thread-s, idle {idle:.2f} thread-s")
+            lines.append(f"  {'self s':>8} {'self %':>7} {'total s':>8}  function")
+            for spot in self.hotspots(label, top):
+                lines.append(
+                    f"  {spot.self_s:8.3f} {spot.self_share:7.1%} {spot.total_s:8.3f}  {spot.function} ({spot.location})"
+                )
+        return "\n".join(lines)
+
+    def to_speedscope(self, name: str = "lineup") -> dict:
+        """Return the samples as a speedscope file: one sampled profile per section."""
+        frame_index: dict[Frame, int] = {}
+        shared = []
+        profiles = []
+        for label in self.sections:
+            with self._lock:
+                counts = dict(self._samples[label])
+            samples, weights = [], []
+            for stack, seconds in counts.items():
+                indices = []
+                for frame in stack:
+                    if frame not in frame_index:
+                        frame_index[frame] = len(shared)
+                        shared.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                    indices.append(frame_index[frame])
+                samples.append(indices)
+                weights.append(seconds)
+            profiles.append(
+                {
+                    "type": "sampled",
+                    "name": label,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            )
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "lineup-generator",
+            "activeProfileIndex": 0,
+            "shared": {"frames": shared},
+            "profiles": profiles,
+        }
+
+    def to_collapsed(self) -> str:
+        """Return the samples as collapsed stacks (flamegraph.pl / speedscope input).
+
+        Each line is `section;outer;...;inner <microseconds>`.
+        """
+        lines = []
+        for label in self.sections:
+            with self._lock:
+                counts = dict(self._samples[label])
+            for stack, seconds in counts.items():
+                names = ";".join(f"{name} ({os.path.basename(path)}:{line})" for name, path, line in stack)
+                lines.append(f"{label};{names} {round(seconds * 1_000_000)}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path, top: int = DEFAULT_TOP) -> Path:
+        """Write the flame graph to `path` and the hotspot summary next to it.
+
+        `.txt`, `.folded` and `.collapsed` paths get collapsed stacks; anything
+        else gets speedscope JSON. Returns the summary's path.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix in {".txt", ".folded", ".collapsed"}:
+            path.write_text(self.to_collapsed(), encoding="utf-8")
+        else:
+            path.write_text(json.dumps(self.to_speedscope(path.stem)), encoding="utf-8")
+        summary = path.with_name(f"{path.stem}.hotspots.txt")
+        summary.write_text(self.format_summary(top) + "\n", encoding="utf-8")
+        return summary
@@ -1,12 +1,24 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Dict, Tuple
+import bisect
+import hashlib
+import json
+import math
+import multiprocessing
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from typing import Dict, Iterable, Iterator, Tuple
 
 from PIL import Image, ImageDraw, ImageFont
 
+from .cache import LRUCache, image_nbytes
+from .metrics import METRICS
 from .models import ScreenSpec, TileType, compute_row_tile_type_id, compute_screen_resolution
 from .palette import PALETTE, darken
+from .plan import Composite, Ellipse, FillRect, Line, OutlineRect, PlanOp, RenderPlan, TextRun
 
 @dataclass
 class RenderOptions:
@@ -35,6 +47,33 @@ class RenderOptions:
 
     lineup_type: str = "RGB"
 
+    # Reuse cached background/tile, branding and overlay layers between renders
+    use_layer_cache: bool = True
+
+    # Worker processes drawing bands of one large canvas (see BANDED_MIN_PIXELS)
+    render_workers: int = 1
+
+LAYER_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+_layer_cache = LRUCache(LAYER_CACHE_MAX_BYTES)
+# Rough per-op footprint used to charge cached plans against the layer cache budget
+_PLAN_OP_NBYTES = 256
+# Canvases smaller than this are not worth splitting into bands
+BANDED_MIN_PIXELS = 16_000_000
+# Circle X Grid line pitch; lineup_bands cuts on the same lines
+_CIRCLEX_GRID_SPACING = 100
+# Blank pixels drawn before a region's clipped lines; see PillowBackend._draw_line
+_LINE_MARGIN = 2
+METRICS.register_gauge("layer_cache_hits", lambda: _layer_cache.hits)
+METRICS.register_gauge("layer_cache_misses", lambda: _layer_cache.misses)
+METRICS.register_gauge("layer_cache_bytes", lambda: _layer_cache.total_bytes)
+
+def clear_layer_cache() -> None:
+    _layer_cache.clear()
+
+# (left, top, right, bottom) in canvas pixels; right/bottom are exclusive.
+Rect = Tuple[int, int, int, int]
+
 def _load_font(font_name: str, size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
     candidates = (
         font_name,
@@ -68,8 +107,8 @@ def _fit_font_size_to_width(font_name: str, text: str, max_width: float, max_siz
             hi = mid - 1
     return best
 
-def _draw_centered_multiline(draw: ImageDraw.ImageDraw, xy, lines, fonts, fill, stroke_fill, stroke_width, line_spacing=0.2):
-    """Draw multiple lines centered at xy (x,y) with per-line fonts."""
+def _layout_centered_multiline(draw: ImageDraw.ImageDraw, xy, lines, fonts, stroke_width, line_spacing=0.2):
+    """Return (xy, text, font) runs for multiple lines centered at xy (x,y) with per-line fonts."""
     x, y = xy
     # measure total height
     metrics = []
@@ -86,25 +125,41 @@ def _draw_centered_multiline(draw: ImageDraw.ImageDraw, xy, lines, fonts, fill,
     total_h += int((len(lines) - 1) * metrics[0][1] * line_spacing) if len(lines) > 1 else 0
 
     # top-left start
+    runs = []
     cur_y = y - total_h / 2
     for (line, font), (w, h) in zip(zip(lines, fonts), metrics):
-        draw.text(
-            (x - w / 2, cur_y),
-            line,
-            font=font,
-            fill=fill,
-            stroke_fill=stroke_fill,
-            stroke_width=stroke_width,
-        )
+        runs.append(((x - w / 2, cur_y), line, font))
         cur_y += h + int(h * line_spacing)
+    return runs
 
-def _fit_image_to_canvas(img: Image.Image, max_w: int, max_h: int) -> Image.Image:
-    if img.width <= max_w and img.height <= max_h:
-        return img
-    scale = min(max_w / img.width, max_h / img.height)
-    new_w = max(1, int(round(img.width * scale)))
-    new_h = max(1, int(round(img.height * scale)))
-    return img.resize((new_w, new_h), Image.LANCZOS)
+def _draw_text_translated(draw: ImageDraw.ImageDraw, xy, text, font, fill, origin: tuple[int, int]) -> None:
+    """Draw text at canvas position `xy` onto a draw whose (0, 0) is canvas `origin`."""
+    x, y = xy
+    ox, oy = origin
+    flip_x = x >= 0 > x - ox
+    flip_y = y >= 0 > y - oy
+    if not (flip_x or flip_y):
+        draw.text((x - ox, y - oy), text, font=font, fill=fill)
+        return
+    # Pillow positions text by truncating coordinates toward zero, so a coordinate
+    # that changes sign renders differently. Draw that axis from a non-negative
+    # origin into a mask and blit it instead.
+    bbox = draw.textbbox((x, y), text, font=font)
+    mx = math.floor(min(bbox[0], x)) if flip_x else ox
+    my = math.floor(min(bbox[1], y)) if flip_y else oy
+    size = (math.ceil(bbox[2]) + 1 - mx, math.ceil(bbox[3]) + 1 - my)
+    if size[0] <= 0 or size[1] <= 0:
+        return
+    mask = Image.new("L", size, 0)
+    ImageDraw.Draw(mask).text((x - mx, y - my), text, font=font, fill=255)
+    draw.bitmap((mx - ox, my - oy), mask, fill=fill)
+
+def _fitted_size(w: int, h: int, max_w: int, max_h: int) -> tuple[int, int]:
+    """Return (w, h) scaled down, preserving aspect, to fit within max_w x max_h."""
+    if w <= max_w and h <= max_h:
+        return w, h
+    scale = min(max_w / w, max_h / h)
+    return max(1, int(round(w * scale))), max(1, int(round(h * scale)))
 
 def _compute_step_heights(total_h: int, steps: int) -> list[int]:
     base = total_h // steps
@@ -117,66 +172,89 @@ def _greyscale_value(step_idx: int, steps: int) -> int:
     return int(round(255 * step_idx / (steps - 1)))
 
 
-def render_lineup_png(screen: ScreenSpec, tiles: Dict[str, TileType], opts: RenderOptions) -> Image.Image:
-    if opts.lineup_type == "CircleXGrid":
+def lineup_canvas_size(screen: ScreenSpec, tiles: Dict[str, TileType], lineup_type: str) -> tuple[int, int]:
+    """Return the (width, height) of the canvas rendered for `lineup_type`."""
+    if lineup_type == "CircleXGrid":
         if screen.expected_w_px is None or screen.expected_h_px is None:
             raise ValueError("Circle X Grid requires expected pixel width/height.")
-        total_w, total_h = screen.expected_w_px, screen.expected_h_px
-    elif opts.lineup_type == "GreyscaleSteps" and (
+        return screen.expected_w_px, screen.expected_h_px
+    if lineup_type == "GreyscaleSteps" and (
         screen.expected_w_px is not None and screen.expected_h_px is not None
     ):
-        total_w, total_h = screen.expected_w_px, screen.expected_h_px
-    else:
-        total_w, total_h = compute_screen_resolution(screen, tiles)
-    img = Image.new("RGB", (total_w, total_h), (0, 0, 0))
-    draw = ImageDraw.Draw(img)
+        return screen.expected_w_px, screen.expected_h_px
+    return compute_screen_resolution(screen, tiles)
 
-    # Determine outline thickness
-    stroke = max(1, int(min(total_w, total_h) * opts.outline_frac))
 
+def _base_layer_key(screen: ScreenSpec, tiles: Dict[str, TileType], opts: RenderOptions, total_w: int, total_h: int):
+    """Return a key covering every input that affects the background + tiles layer."""
+    if opts.lineup_type == "CircleXGrid":
+        color = None if opts.circlex_grid_black_bg else screen.base_color_name
+        return ("base", "CircleXGrid", total_w, total_h, color)
+    if opts.lineup_type == "GreyscaleSteps":
+        return ("base", "GreyscaleSteps", total_w, total_h)
+    row_sizes = tuple(
+        (tiles[t_id].w_px, tiles[t_id].h_px)
+        for t_id in (compute_row_tile_type_id(screen, r) for r in range(screen.rows))
+    )
+    return (
+        "base",
+        opts.lineup_type,
+        total_w,
+        total_h,
+        screen.cols,
+        row_sizes,
+        screen.tile_label,
+        screen.base_color_name,
+        opts.tile_text_rgb,
+        opts.font_name,
+        opts.tile_label_width_frac,
+    )
+
+
+def _compile_base_ops(
+    screen: ScreenSpec,
+    tiles: Dict[str, TileType],
+    opts: RenderOptions,
+    total_w: int,
+    total_h: int,
+) -> tuple[PlanOp, ...]:
+    """Lay out the background + tiles as plan ops covering the full canvas."""
+    ops: list[PlanOp] = []
     if opts.lineup_type == "CircleXGrid":
         if opts.circlex_grid_black_bg:
             base_rgb = (0, 0, 0)
         else:
             base_rgb = _resolve_color(screen.base_color_name)
-        draw.rectangle([0, 0, total_w, total_h], fill=base_rgb)
-
-        grid_spacing = 100
-        _draw_grid(
-            draw,
-            total_w,
-            total_h,
-            grid_spacing,
-            color=(255, 255, 255),
-            line_width=2,
-        )
-        draw.rectangle([0, 0, total_w - 1, total_h - 1], outline=(255, 255, 255), width=2)
-        _draw_circle_x(
-            draw,
-            total_w,
-            total_h,
-            color=(255, 255, 255),
-            line_width=10,
-        )
+        white = (255, 255, 255)
+        ops.append(FillRect((0, 0, total_w, total_h), base_rgb))
+
+        ops.extend(_grid_lines(total_w, total_h, _CIRCLEX_GRID_SPACING, color=white, line_width=2))
+        ops.append(OutlineRect((0, 0, total_w - 1, total_h - 1), white, 2))
+
+        cx = total_w / 2
+        cy = total_h / 2
+        radius = int(round(min(total_w, total_h) * 0.45))
+        ops.append(Ellipse((cx - radius, cy - radius, cx + radius, cy + radius), white, 10))
+        ops.append(Line((0, 0, total_w, total_h), white, 10))
+        ops.append(Line((0, total_h, total_w, 0), white, 10))
     elif opts.lineup_type == "GreyscaleSteps":
         steps = 11
         heights = _compute_step_heights(total_h, steps)
         y = 0
         for i, h in enumerate(heights):
             v = _greyscale_value(i, steps)
-            draw.rectangle([0, y, total_w, y + h], fill=(v, v, v))
+            ops.append(FillRect((0, y, total_w, y + h), (v, v, v)))
             y += h
     else:
         dual_colors = _parse_dual_colors(screen.base_color_name)
         base_rgb = _resolve_color(screen.base_color_name)
+        measure = ImageDraw.Draw(Image.new("RGB", (1, 1)))
 
         # Draw tiles + per-tile text
-        tile_index = 1
         y = 0
         for r in range(screen.rows):
             tile_type_id = compute_row_tile_type_id(screen, r)
             tile = tiles[tile_type_id]
-            x = 0
 
             # Fonts scale to fit label width; number uses same size as label.
             max_label_w = tile.w_px * opts.tile_label_width_frac
@@ -188,15 +266,20 @@ def render_lineup_png(screen: ScreenSpec, tiles: Dict[str, TileType], opts: Rend
             )
             label_size = max(10, int(label_size * 0.8))
             label_font = _load_font(opts.font_name, label_size)
-            num_font = label_font
+
+            # Centered text with no stroke for tile text (matches samples)
+            lb = screen.tile_label
+            bbox_l = measure.textbbox((0, 0), lb, font=label_font)
 
             for c in range(screen.cols):
+                x = c * tile.w_px
+                tile_index = r * screen.cols + c + 1
                 # checkerboard by row/col so rows alternate (prevents full-row stripes)
                 if dual_colors:
                     fill_rgb = dual_colors[0] if ((r + c) % 2 == 0) else dual_colors[1]
                 else:
                     fill_rgb = darken(base_rgb, 0.75) if ((r + c) % 2 == 0) else base_rgb
-                draw.rectangle([x, y, x + tile.w_px, y + tile.h_px], fill=fill_rgb)
+                ops.append(FillRect((x, y, x + tile.w_px, y + tile.h_px), fill_rgb))
 
                 # Tile label + number (two lines centered)
                 cx = x + tile.w_px / 2
@@ -204,82 +287,632 @@ def render_lineup_png(screen: ScreenSpec, tiles: Dict[str, TileType], opts: Rend
                 label_y = y + tile.h_px * 0.22
                 num_y = y + tile.h_px * 0.62
 
-                # Centered text with no stroke for tile text (matches samples)
-                # (You can add stroke here if desired.)
-                lb = screen.tile_label
                 nb = f"{tile_index:02d}"
+                bbox_n = measure.textbbox((0, 0), nb, font=label_font)
+                for text, bbox, center_y in ((lb, bbox_l, label_y), (nb, bbox_n, num_y)):
+                    w = bbox[2] - bbox[0]
+                    h = bbox[3] - bbox[1]
+                    tx, ty = cx - w / 2, center_y - h / 2
+                    ops.append(
+                        TextRun(
+                            (tx, ty),
+                            text,
+                            opts.font_name,
+                            label_size,
+                            opts.tile_text_rgb,
+                            # +/-1px: the run is measured at (0, 0), not at its sub-pixel offset
+                            (tx + bbox[0] - 1, ty + bbox[1] - 1, tx + bbox[2] + 1, ty + bbox[3] + 1),
+                        )
+                    )
+            y += tile.h_px
+    return tuple(ops)
 
-                bbox_l = draw.textbbox((0, 0), lb, font=label_font)
-                lw = bbox_l[2] - bbox_l[0]
-                lh = bbox_l[3] - bbox_l[1]
-                draw.text((cx - lw / 2, label_y - lh / 2), lb, font=label_font, fill=opts.tile_text_rgb)
 
-                bbox_n = draw.textbbox((0, 0), nb, font=num_font)
-                nw = bbox_n[2] - bbox_n[0]
-                nh = bbox_n[3] - bbox_n[1]
-                draw.text((cx - nw / 2, num_y - nh / 2), nb, font=num_font, fill=opts.tile_text_rgb)
+def _base_plan_ops(
+    screen: ScreenSpec,
+    tiles: Dict[str, TileType],
+    opts: RenderOptions,
+    total_w: int,
+    total_h: int,
+) -> tuple[PlanOp, ...]:
+    key = ("plan",) + _base_layer_key(screen, tiles, opts, total_w, total_h)
+    cached = _layer_cache.get(key) if opts.use_layer_cache else None
+    if cached is not None:
+        return cached
+    ops = _compile_base_ops(screen, tiles, opts, total_w, total_h)
+    if opts.use_layer_cache:
+        _layer_cache.put(key, ops, _PLAN_OP_NBYTES * len(ops))
+    return ops
+
+
+def _render_base_layer(
+    screen: ScreenSpec,
+    tiles: Dict[str, TileType],
+    opts: RenderOptions,
+    total_w: int,
+    total_h: int,
+) -> Image.Image:
+    """Return the background + tiles layer; callers must not mutate the result."""
+    key = _base_layer_key(screen, tiles, opts, total_w, total_h)
+    cached = _layer_cache.get(key) if opts.use_layer_cache else None
+    if cached is not None:
+        return cached
 
-                tile_index += 1
-                x += tile.w_px
-            y += tile.h_px
+    img = Image.new("RGB", (total_w, total_h), (0, 0, 0))
+    ops = _base_plan_ops(screen, tiles, opts, total_w, total_h)
+    bands = []
+    if opts.render_workers > 1 and total_w * total_h >= BANDED_MIN_PIXELS:
+        bands = lineup_bands(screen, tiles, opts, opts.render_workers * 2)
+    if len(bands) > 1:
+        for band, part in _iter_drawn_bands(opts.render_workers, ops, {}, bands):
+            img.paste(part, band[:2])
+    else:
+        PillowBackend(use_cache=opts.use_layer_cache).draw(img, ops)
+    if opts.use_layer_cache:
+        _layer_cache.put(key, img, image_nbytes(img))
+    return img
 
-    if opts.branding_image is not None:
-        branding = opts.branding_image
-        if branding.mode != "RGBA":
-            branding = branding.convert("RGBA")
-        branding = _fit_image_to_canvas(branding, total_w, total_h)
-        img.paste(branding, (0, total_h - branding.height), branding)
 
-    if opts.show_overlay:
-        # Center overlay (draw last)
-        title = screen.screen_name
-        subtitle = f"{total_w}x{total_h}"
+# id(img) -> (weak ref, mode, size, digest). Branding images are hashed once,
+# not on every plan compile and spec key; entries go when the image is freed.
+_image_digests: dict[int, tuple[weakref.ref, str, tuple[int, int], str]] = {}
+_image_digests_lock = threading.Lock()
+
+
+def _image_digest(img: Image.Image) -> str:
+    """Return a content digest of `img`, computed once per image object; callers must not mutate it."""
+    key = id(img)
+    with _image_digests_lock:
+        entry = _image_digests.get(key)
+    if entry is not None and entry[0]() is img and entry[1:3] == (img.mode, img.size):
+        return entry[3]
+    digest = hashlib.blake2b(img.tobytes(), digest_size=16).hexdigest()
+    ref = weakref.ref(img, lambda _ref, key=key: _forget_image_digest(key, _ref))
+    with _image_digests_lock:
+        _image_digests[key] = (ref, img.mode, img.size, digest)
+    return digest
+
+
+def _forget_image_digest(key: int, ref: weakref.ref) -> None:
+    with _image_digests_lock:
+        entry = _image_digests.get(key)
+        if entry is not None and entry[0] is ref:
+            del _image_digests[key]
+
+
+def _branding_layer(branding: Image.Image, image_id: str, size: tuple[int, int], use_cache: bool) -> Image.Image:
+    """Return the branding image as RGBA at `size` (scaled down to fit the canvas)."""
+    key = ("branding", image_id, branding.mode, branding.size, size)
+    cached = _layer_cache.get(key) if use_cache else None
+    if cached is not None:
+        return cached
+
+    if branding.mode != "RGBA":
+        branding = branding.convert("RGBA")
+    if branding.size != size:
+        branding = branding.resize(size, Image.LANCZOS)
+    if use_cache:
+        _layer_cache.put(key, branding, image_nbytes(branding))
+    return branding
+
+
+def _overlay_text_runs(draw: ImageDraw.ImageDraw, screen_name: str, total_w: int, total_h: int, opts: RenderOptions, stroke: int):
+    """Return ((x, y), text, font, font_size) runs for the centered overlay."""
+    title = screen_name
+    subtitle = f"{total_w}x{total_h}"
+
+    overlay_max_w = total_w * 0.85
+    overlay_title_size = _fit_font_size_to_width(
+        opts.font_name,
+        title,
+        overlay_max_w,
+        max_size=max(20, int(min(total_w, total_h) * opts.overlay_title_frac)),
+        min_size=20,
+    )
+    overlay_sub_size = _fit_font_size_to_width(
+        opts.font_name,
+        subtitle,
+        overlay_max_w,
+        max_size=max(16, int(min(total_w, total_h) * opts.overlay_sub_frac)),
+        min_size=16,
+    )
+    overlay_title_font = _load_font(opts.font_name, overlay_title_size)
+    overlay_sub_font = _load_font(opts.font_name, overlay_sub_size)
 
-        overlay_max_w = total_w * 0.85
-        overlay_title_size = _fit_font_size_to_width(
-            opts.font_name,
+    if opts.lineup_type == "CircleXGrid":
+        runs = _layout_centered_split_lines(
+            draw,
+            (total_w / 2, total_h / 2),
             title,
-            overlay_max_w,
-            max_size=max(20, int(min(total_w, total_h) * opts.overlay_title_frac)),
-            min_size=20,
-        )
-        overlay_sub_size = _fit_font_size_to_width(
-            opts.font_name,
             subtitle,
-            overlay_max_w,
-            max_size=max(16, int(min(total_w, total_h) * opts.overlay_sub_frac)),
-            min_size=16,
+            overlay_title_font,
+            overlay_sub_font,
+            stroke_width=stroke,
+            gap=max(int(min(total_w, total_h) * 0.08), int(overlay_title_size * 1.2)),
         )
-        overlay_title_font = _load_font(opts.font_name, overlay_title_size)
-        overlay_sub_font = _load_font(opts.font_name, overlay_sub_size)
-
-        if opts.lineup_type == "CircleXGrid":
-            _draw_centered_split_lines(
-                draw,
-                (total_w / 2, total_h / 2),
-                title,
-                subtitle,
-                overlay_title_font,
-                overlay_sub_font,
-                fill=opts.overlay_text_rgb,
-                stroke_fill=opts.outline_rgb,
+    else:
+        runs = _layout_centered_multiline(
+            draw,
+            (total_w / 2, total_h / 2),
+            [title, subtitle],
+            [overlay_title_font, overlay_sub_font],
+            stroke_width=stroke,
+            line_spacing=0.25,
+        )
+    return [run + (size,) for run, size in zip(runs, (overlay_title_size, overlay_sub_size))]
+
+
+def _overlay_ops(screen_name: str, total_w: int, total_h: int, opts: RenderOptions) -> tuple[PlanOp, ...]:
+    """Return the centered screen name + resolution as stroked text runs."""
+    # Determine outline thickness
+    stroke = max(1, int(min(total_w, total_h) * opts.outline_frac))
+    key = (
+        "overlay",
+        screen_name,
+        total_w,
+        total_h,
+        opts.lineup_type,
+        opts.font_name,
+        opts.overlay_title_frac,
+        opts.overlay_sub_frac,
+        stroke,
+        opts.overlay_text_rgb,
+        opts.outline_rgb,
+    )
+    cached = _layer_cache.get(key) if opts.use_layer_cache else None
+    if cached is not None:
+        return cached
+
+    measure = ImageDraw.Draw(Image.new("L", (1, 1)))
+    ops = []
+    for (x, y), text, font, size in _overlay_text_runs(measure, screen_name, total_w, total_h, opts, stroke):
+        bbox = measure.textbbox((x, y), text, font=font, stroke_width=stroke)
+        ops.append(
+            TextRun(
+                (x, y),
+                text,
+                opts.font_name,
+                size,
+                opts.overlay_text_rgb,
+                (bbox[0] - 1, bbox[1] - 1, bbox[2] + 1, bbox[3] + 1),
                 stroke_width=stroke,
-                gap=max(int(min(total_w, total_h) * 0.08), int(overlay_title_size * 1.2)),
+                stroke_rgb=opts.outline_rgb,
             )
-        else:
-            _draw_centered_multiline(
-                draw,
-                (total_w / 2, total_h / 2),
-                [title, subtitle],
-                [overlay_title_font, overlay_sub_font],
-                fill=opts.overlay_text_rgb,
-                stroke_fill=opts.outline_rgb,
-                stroke_width=stroke,
-                line_spacing=0.25,
+        )
+    ops = tuple(ops)
+    if opts.use_layer_cache:
+        _layer_cache.put(key, ops, _PLAN_OP_NBYTES * len(ops))
+    return ops
+
+
+def _compile_top_ops(screen: ScreenSpec, opts: RenderOptions, total_w: int, total_h: int) -> tuple[PlanOp, ...]:
+    """Lay out branding (bottom-left) and the overlay (centered, drawn last)."""
+    ops: tuple[PlanOp, ...] = ()
+    if opts.branding_image is not None:
+        bw, bh = _fitted_size(opts.branding_image.width, opts.branding_image.height, total_w, total_h)
+        ops += (Composite(_image_digest(opts.branding_image), (0, total_h - bh), (bw, bh)),)
+    if opts.show_overlay:
+        ops += _overlay_ops(screen.screen_name, total_w, total_h, opts)
+    return ops
+
+
+def _plan_images(opts: RenderOptions) -> dict[str, Image.Image]:
+    if opts.branding_image is None:
+        return {}
+    return {_image_digest(opts.branding_image): opts.branding_image}
+
+
+def _ops_in_region(ops: Iterable[PlanOp], region: Rect) -> Iterator[PlanOp]:
+    left, top, right, bottom = region
+    for op in ops:
+        b = op.bounds
+        if not (b[0] > right or b[2] < left or b[1] > bottom or b[3] < top):
+            yield op
+
+
+class PillowBackend:
+    """Rasterize render plans with Pillow.
+
+    Region renders are drawn translated so they line up with the same crop of a
+    full render.
+    """
+
+    def __init__(self, images: Dict[str, Image.Image] | None = None, use_cache: bool = True) -> None:
+        # Source images for Composite ops, keyed by image_id
+        self.images = images or {}
+        self.use_cache = use_cache
+
+    def execute(self, plan: RenderPlan, region: Rect | None = None) -> Image.Image:
+        """Return an RGB image of `plan`, or of only `region` of its canvas."""
+        left, top, right, bottom = region or (0, 0, plan.width, plan.height)
+        img = Image.new("RGB", (right - left, bottom - top), (0, 0, 0))
+        self.draw(img, plan.ops, origin=(left, top))
+        return img
+
+    def draw(self, img: Image.Image, ops: Iterable[PlanOp], origin: tuple[int, int] = (0, 0)) -> None:
+        """Draw `ops` onto `img`, which shows the canvas from `origin`.
+
+        Ops entirely outside the image are skipped.
+        """
+        left, top = origin
+        right, bottom = left + img.width, top + img.height
+        draw = ImageDraw.Draw(img)
+        fonts: dict[tuple[str, int], ImageFont.FreeTypeFont | ImageFont.ImageFont] = {}
+        for op in _ops_in_region(ops, (left, top, right, bottom)):
+            if isinstance(op, FillRect):
+                x0, y0, x1, y1 = op.box
+                draw.rectangle([x0 - left, y0 - top, x1 - left, y1 - top], fill=op.rgb)
+            elif isinstance(op, OutlineRect):
+                x0, y0, x1, y1 = op.box
+                draw.rectangle([x0 - left, y0 - top, x1 - left, y1 - top], outline=op.rgb, width=op.width)
+            elif isinstance(op, Line):
+                self._draw_line(draw, op, (left, top, right, bottom))
+            elif isinstance(op, Ellipse):
+                self._draw_ellipse(draw, op, (left, top, right, bottom))
+            elif isinstance(op, TextRun):
+                font_key = (op.font_name, op.font_size)
+                font = fonts.get(font_key)
+                if font is None:
+                    font = fonts[font_key] = _load_font(op.font_name, op.font_size)
+                if op.stroke_width:
+                    self._paste_stroked_text(img, op, font, origin)
+                else:
+                    _draw_text_translated(draw, op.xy, op.text, font, op.rgb, origin)
+            elif isinstance(op, Composite):
+                layer = _branding_layer(self.images[op.image_id], op.image_id, op.size, self.use_cache)
+                img.paste(layer, (op.xy[0] - left, op.xy[1] - top), layer)
+            else:
+                raise TypeError(f"Unsupported plan op: {op!r}")
+
+    @staticmethod
+    def _draw_line(draw: ImageDraw.ImageDraw, op: Line, region: Rect) -> None:
+        ox, oy, right, bottom = region
+        x0, y0, x1, y1 = op.xy
+        if ox == 0 and oy == 0:
+            draw.line(op.xy, fill=op.rgb, width=op.width)
+            return
+        # Pillow's wide-line scanlines round differently once a slanted line is
+        # shifted in x, and negative y start rows are clipped unevenly. Draw into
+        # a mask that starts a few rows above the visible part and, for slanted
+        # lines, keeps the canvas's x origin; then blit the region's columns, so
+        # regions match crops pixel for pixel. Axis-aligned lines on whole pixels
+        # shift exactly, so their mask only spans their own columns.
+        b = op.bounds
+        my = max(oy, math.floor(b[1])) - _LINE_MARGIN
+        mx = 0
+        if (x0 == x1 or y0 == y1) and all(float(v).is_integer() for v in op.xy):
+            mx = max(0, max(ox, math.floor(b[0])) - _LINE_MARGIN)
+        mask_w, mask_h = min(right, math.ceil(b[2]) + 1) - mx, min(bottom, math.ceil(b[3]) + 1) - my
+        if mx + mask_w <= ox or mask_h <= 0:
+            return
+        mask = Image.new("L", (mask_w, mask_h), 0)
+        ImageDraw.Draw(mask).line((x0 - mx, y0 - my, x1 - mx, y1 - my), fill=255, width=op.width)
+        draw.bitmap((max(mx, ox) - ox, my - oy), mask.crop((max(0, ox - mx), 0, mask_w, mask_h)), fill=op.rgb)
+
+    @staticmethod
+    def _draw_ellipse(draw: ImageDraw.ImageDraw, op: Ellipse, region: Rect) -> None:
+        ox, oy, right, bottom = region
+        bbox = op.box
+        if ox == 0 and oy == 0:
+            draw.ellipse(bbox, outline=op.rgb, width=op.width)
+        elif bbox[0] < right and bbox[1] < bottom and bbox[2] >= ox and bbox[3] >= oy:
+            # Pillow rasterizes negative ellipse coordinates differently, so draw the
+            # ellipse from its own top-left and blit it to keep regions pixel-identical.
+            mx, my = math.floor(bbox[0]), math.floor(bbox[1])
+            size = (min(right, math.ceil(bbox[2]) + 1) - mx, min(bottom, math.ceil(bbox[3]) + 1) - my)
+            mask = Image.new("L", size, 0)
+            ImageDraw.Draw(mask).ellipse(
+                [bbox[0] - mx, bbox[1] - my, bbox[2] - mx, bbox[3] - my], outline=255, width=op.width
             )
+            draw.bitmap((mx - ox, my - oy), mask, fill=op.rgb)
+
+    def _paste_stroked_text(self, img: Image.Image, op: TextRun, font, origin: tuple[int, int]) -> None:
+        ox, oy = origin
+        (x0, y0), stroke_mask, fill_mask = self._stroked_text_masks(op, font)
+        img.paste(op.stroke_rgb or (0, 0, 0), (x0 - ox, y0 - oy), stroke_mask)
+        img.paste(op.rgb, (x0 - ox, y0 - oy), fill_mask)
+
+    def _stroked_text_masks(self, op: TextRun, font) -> tuple[tuple[int, int], Image.Image, Image.Image]:
+        """Return ((x0, y0), stroke_mask, fill_mask) coverage masks for a stroked run.
+
+        Pillow draws stroked text as a stroke pass followed by a fill pass; keeping
+        both coverage masks lets the run be composited in any color, at any region
+        origin, pixel-identically to drawing it onto the canvas directly.
+        """
+        key = ("text_masks", op.xy, op.text, op.font_name, op.font_size, op.stroke_width)
+        cached = _layer_cache.get(key) if self.use_cache else None
+        if cached is not None:
+            return cached
+
+        x, y = op.xy
+        measure = ImageDraw.Draw(Image.new("L", (1, 1)))
+        bbox = measure.textbbox((x, y), op.text, font=font, stroke_width=op.stroke_width)
+        # Integer origin at or above/left of the text anchor keeps the run's sub-pixel
+        # offset identical to drawing it on the canvas.
+        x0 = math.floor(min(bbox[0], x)) - 1
+        y0 = math.floor(min(bbox[1], y)) - 1
+        size = (math.ceil(bbox[2]) + 1 - x0, math.ceil(bbox[3]) + 1 - y0)
+        stroke_mask = Image.new("L", size, 0)
+        ImageDraw.Draw(stroke_mask).text(
+            (x - x0, y - y0), op.text, font=font, fill=255, stroke_width=op.stroke_width, stroke_fill=255
+        )
+        fill_mask = Image.new("L", size, 0)
+        ImageDraw.Draw(fill_mask).text((x - x0, y - y0), op.text, font=font, fill=255)
+        masks = ((x0, y0), stroke_mask, fill_mask)
+        if self.use_cache:
+            _layer_cache.put(key, masks, 2 * size[0] * size[1])
+        return masks
+
+
+def _composite_top_layers(
+    img: Image.Image,
+    screen: ScreenSpec,
+    opts: RenderOptions,
+    total_w: int,
+    total_h: int,
+    origin: tuple[int, int] = (0, 0),
+) -> None:
+    """Paste branding and overlay onto `img`, which shows the canvas from `origin`."""
+    ops = _compile_top_ops(screen, opts, total_w, total_h)
+    if ops:
+        PillowBackend(_plan_images(opts), use_cache=opts.use_layer_cache).draw(img, ops, origin)
+
+
+def _used_tiles(screen: ScreenSpec, tiles: Dict[str, TileType]) -> list[tuple[str, int, int]]:
+    tile_ids = {compute_row_tile_type_id(screen, r) for r in range(screen.rows)} | {screen.default_tile_type_id}
+    return sorted((t, tiles[t].w_px, tiles[t].h_px) for t in tile_ids if t in tiles)
+
+
+def screen_spec_key(screen: ScreenSpec, tiles: Dict[str, TileType]) -> str:
+    """Return a hash of the sheet data behind `screen`: its row and the tile types it uses.
+
+    Unlike render_spec_key it ignores render options, so it tells whether an
+    export was made from the sheet as it is now.
+    """
+    spec = {"screen": repr(screen), "tiles": _used_tiles(screen, tiles)}
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def render_spec_key(screen: ScreenSpec, tiles: Dict[str, TileType], opts: RenderOptions) -> str:
+    """Return a hash of every input that affects the rendered pixels.
+
+    Cheaper than a plan digest (no layout or font fitting); use it to key
+    caches of finished renders.
+    """
+    options = {}
+    for f in fields(opts):
+        if f.name in ("use_layer_cache", "render_workers"):
+            continue
+        value = getattr(opts, f.name)
+        options[f.name] = _image_digest(value) if isinstance(value, Image.Image) else value
+    spec = {
+        "screen": repr(screen),
+        "tiles": _used_tiles(screen, tiles),
+        "options": options,
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True, default=repr).encode("utf-8")).hexdigest()
+
+
+def compile_render_plan(screen: ScreenSpec, tiles: Dict[str, TileType], opts: RenderOptions) -> RenderPlan:
+    """Resolve layout, fonts and colors for `screen` into a backend-independent plan.
+
+    The branding image is referenced by content digest; pass it to the backend
+    (see `plan_images`) to execute the plan.
+    """
+    total_w, total_h = lineup_canvas_size(screen, tiles, opts.lineup_type)
+    return RenderPlan(
+        width=total_w,
+        height=total_h,
+        base=_base_plan_ops(screen, tiles, opts, total_w, total_h),
+        top=_compile_top_ops(screen, opts, total_w, total_h),
+    )
+
+
+def plan_images(opts: RenderOptions) -> dict[str, Image.Image]:
+    """Return the source images a plan compiled with `opts` refers to."""
+    return _plan_images(opts)
+
+
+def base_layer_key(screen: ScreenSpec, tiles: Dict[str, TileType], opts: RenderOptions):
+    """Return a hashable key shared by screens whose background + tiles are identical.
+
+    `screen_name` only reaches the pixels through the overlay, so screens that
+    differ only by name share a key.
+    """
+    total_w, total_h = lineup_canvas_size(screen, tiles, opts.lineup_type)
+    return _base_layer_key(screen, tiles, opts, total_w, total_h)
+
 
+@METRICS.timed("render_base")
+def render_base_layer(screen: ScreenSpec, tiles: Dict[str, TileType], opts: RenderOptions) -> Image.Image:
+    """Return the shared background + tiles layer; callers must not mutate it."""
+    total_w, total_h = lineup_canvas_size(screen, tiles, opts.lineup_type)
+    return _render_base_layer(screen, tiles, opts, total_w, total_h)
+
+
+@METRICS.timed("composite")
+def composite_lineup_layers(base: Image.Image, screen: ScreenSpec, opts: RenderOptions) -> Image.Image:
+    """Return a copy of `base` with the branding and `screen`'s overlay applied."""
+    img = base.copy()
+    _composite_top_layers(img, screen, opts, base.width, base.height)
+    return img
+
+
+@METRICS.timed("render")
+def render_lineup_png(screen: ScreenSpec, tiles: Dict[str, TileType], opts: RenderOptions) -> Image.Image:
+    # Layers are cached independently, so toggling the overlay or swapping the
+    # branding only recomposites; the tiles are not redrawn.
+    return composite_lineup_layers(render_base_layer(screen, tiles, opts), screen, opts)
+
+
+def compute_output_slices(total_w: int, total_h: int, max_w: int = 3840, max_h: int = 2160) -> list[Rect]:
+    """Split a canvas into row-major rects no larger than max_w x max_h.
+
+    Slices are packed from the top-left; the last column/row takes the remainder,
+    matching how processor outputs are mapped onto a wall.
+    """
+    if max_w <= 0 or max_h <= 0:
+        raise ValueError("Output slice size must be positive.")
+    return [
+        (left, top, min(left + max_w, total_w), min(top + max_h, total_h))
+        for top in range(0, total_h, max_h)
+        for left in range(0, total_w, max_w)
+    ]
+
+
+def lineup_bands(screen: ScreenSpec, tiles: Dict[str, TileType], opts: RenderOptions, count: int) -> list[Rect]:
+    """Split the canvas into up to `count` full-width horizontal bands.
+
+    Cuts fall on tile-row (or greyscale step) edges, so no tile or tile label
+    straddles two bands; Circle X Grid canvases are cut on their horizontal
+    grid lines. Bands render pixel-identically wherever they are cut.
+    """
+    total_w, total_h = lineup_canvas_size(screen, tiles, opts.lineup_type)
+    if opts.lineup_type == "RGB":
+        edges, y = [], 0
+        for r in range(screen.rows):
+            y += tiles[compute_row_tile_type_id(screen, r)].h_px
+            edges.append(y)
+    elif opts.lineup_type == "GreyscaleSteps":
+        edges, y = [], 0
+        for h in _compute_step_heights(total_h, 11):
+            y += h
+            edges.append(y)
+    else:
+        # Same offset as _grid_lines: the grid is centred vertically.
+        edges = list(range(-((total_h % _CIRCLEX_GRID_SPACING) // 2), total_h, _CIRCLEX_GRID_SPACING))
+    edges = [e for e in edges if 0 < e < total_h]
+
+    cuts = set()
+    for i in range(1, max(1, count)):
+        target = total_h * i / count
+        at = bisect.bisect_left(edges, target)
+        candidates = edges[max(0, at - 1):at + 1]
+        if candidates:
+            cuts.add(min(candidates, key=lambda e: abs(e - target)))
+    ys = [0] + sorted(cuts) + [total_h]
+    return [(0, top, total_w, bottom) for top, bottom in zip(ys, ys[1:])]
+
+
+# Band worker processes by worker count, shared by every render. Pillow holds the
+# GIL while it draws, so only separate processes put one canvas on several cores.
+_band_executors: dict[int, ProcessPoolExecutor] = {}
+_band_executors_lock = threading.Lock()
+
+
+def _band_executor(workers: int) -> ProcessPoolExecutor:
+    with _band_executors_lock:
+        executor = _band_executors.get(workers)
+        if executor is None:
+            # Spawned, not forked: forking would copy locks held by the parent's render threads.
+            executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            _band_executors[workers] = executor
+        return executor
+
+
+def _draw_band(ops: tuple[PlanOp, ...], images: Dict[str, Image.Image], band: Rect) -> Image.Image:
+    """Draw `band` of a canvas from plan ops; runs in a band worker process."""
+    img = Image.new("RGB", (band[2] - band[0], band[3] - band[1]), (0, 0, 0))
+    # Nothing is cached here: worker memory is outside the layer cache's budget.
+    PillowBackend(images, use_cache=False).draw(img, ops, origin=band[:2])
+    return img
+
+
+def _iter_drawn_bands(
+    workers: int,
+    ops: tuple[PlanOp, ...],
+    images: Dict[str, Image.Image],
+    bands: list[Rect],
+) -> Iterator[tuple[Rect, Image.Image]]:
+    """Yield (band, image) top to bottom, drawn on worker processes at most `workers` bands ahead.
+
+    Each worker is sent only the ops (and source images) that touch its band.
+    """
+    executor = _band_executor(workers)
+    pending: deque = deque()
+    try:
+        for band in bands:
+            band_ops = tuple(_ops_in_region(ops, band))
+            band_images = {op.image_id: images[op.image_id] for op in band_ops if isinstance(op, Composite)}
+            pending.append((band, executor.submit(_draw_band, band_ops, band_images, band)))
+            if len(pending) > workers:
+                done, future = pending.popleft()
+                yield done, future.result()
+        while pending:
+            done, future = pending.popleft()
+            yield done, future.result()
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+def iter_lineup_bands(
+    screen: ScreenSpec,
+    tiles: Dict[str, TileType],
+    opts: RenderOptions,
+    count: int | None = None,
+) -> Iterator[tuple[Rect, Image.Image]]:
+    """Yield finished bands top to bottom, drawn on `render_workers` processes.
+
+    For streaming a very large canvas to an encoder or frame buffer: each band
+    matches the same rows of render_lineup_png, and the full canvas is never
+    allocated. With one worker, bands are drawn on the calling thread.
+    """
+    workers = max(1, opts.render_workers)
+    bands = lineup_bands(screen, tiles, opts, count or workers * 2)
+    if workers == 1:
+        for rect in bands:
+            yield rect, render_lineup_region(screen, tiles, opts, rect)
+        return
+    total_w, total_h = lineup_canvas_size(screen, tiles, opts.lineup_type)
+    ops = _base_plan_ops(screen, tiles, opts, total_w, total_h) + _compile_top_ops(screen, opts, total_w, total_h)
+    yield from _iter_drawn_bands(workers, ops, _plan_images(opts), bands)
+
+
+@METRICS.timed("render_region")
+def render_lineup_region(
+    screen: ScreenSpec,
+    tiles: Dict[str, TileType],
+    opts: RenderOptions,
+    region: Rect,
+) -> Image.Image:
+    """Render only `region` of the lineup canvas.
+
+    Tiles outside the region are skipped; branding and overlay keep their
+    full-canvas positions, so the result matches a crop of render_lineup_png.
+    """
+    total_w, total_h = lineup_canvas_size(screen, tiles, opts.lineup_type)
+    left, top = max(0, region[0]), max(0, region[1])
+    right, bottom = min(total_w, region[2]), min(total_h, region[3])
+    if right <= left or bottom <= top:
+        raise ValueError(f"Region {region} does not overlap the {total_w}x{total_h} canvas.")
+
+    img = Image.new("RGB", (right - left, bottom - top), (0, 0, 0))
+    ops = _base_plan_ops(screen, tiles, opts, total_w, total_h)
+    PillowBackend(use_cache=opts.use_layer_cache).draw(img, ops, origin=(left, top))
+    _composite_top_layers(img, screen, opts, total_w, total_h, origin=(left, top))
     return img
 
+
+def iter_lineup_regions(
+    screen: ScreenSpec,
+    tiles: Dict[str, TileType],
+    opts: RenderOptions,
+    regions: Iterable[Rect] | None = None,
+    max_w: int = 3840,
+    max_h: int = 2160,
+) -> Iterator[tuple[Rect, Image.Image]]:
+    """Yield (rect, image) per region, one at a time.
+
+    Without explicit `regions`, the canvas is sliced with compute_output_slices.
+    The full canvas is never allocated.
+    """
+    if regions is None:
+        total_w, total_h = lineup_canvas_size(screen, tiles, opts.lineup_type)
+        regions = compute_output_slices(total_w, total_h, max_w, max_h)
+    for rect in regions:
+        yield rect, render_lineup_region(screen, tiles, opts, rect)
+
 def _parse_hex_color(value: str) -> tuple[int, int, int] | None:
     raw = value.strip()
     if raw.startswith("#"):
@@ -318,18 +951,16 @@ def _parse_dual_colors(name: str) -> tuple[tuple[int, int, int], tuple[int, int,
         return None
     return (first, second)
 
-def _draw_centered_split_lines(
+def _layout_centered_split_lines(
     draw: ImageDraw.ImageDraw,
     xy,
     top_line: str,
     bottom_line: str,
     top_font: ImageFont.ImageFont,
     bottom_font: ImageFont.ImageFont,
-    fill,
-    stroke_fill,
     stroke_width,
     gap: int,
-) -> None:
+):
     x, y = xy
     top_bbox = draw.textbbox((0, 0), top_line, font=top_font, stroke_width=stroke_width)
     top_w = top_bbox[2] - top_bbox[0]
@@ -337,63 +968,36 @@ def _draw_centered_split_lines(
 
     bottom_bbox = draw.textbbox((0, 0), bottom_line, font=bottom_font, stroke_width=stroke_width)
     bottom_w = bottom_bbox[2] - bottom_bbox[0]
-    bottom_h = bottom_bbox[3] - bottom_bbox[1]
 
     top_y = y - gap / 2 - top_h
     bottom_y = y + gap / 2
 
-    draw.text(
-        (x - top_w / 2, top_y),
-        top_line,
-        font=top_font,
-        fill=fill,
-        stroke_fill=stroke_fill,
-        stroke_width=stroke_width,
-    )
-    draw.text(
-        (x - bottom_w / 2, bottom_y),
-        bottom_line,
-        font=bottom_font,
-        fill=fill,
-        stroke_fill=stroke_fill,
-        stroke_width=stroke_width,
-    )
+    return [
+        ((x - top_w / 2, top_y), top_line, top_font),
+        ((x - bottom_w / 2, bottom_y), bottom_line, bottom_font),
+    ]
 
-def _draw_grid(
-    draw: ImageDraw.ImageDraw,
+def _grid_lines(
     total_w: int,
     total_h: int,
     spacing: int,
     color: Tuple[int, int, int],
     line_width: int,
-) -> None:
+) -> list[Line]:
     if spacing <= 0:
-        return
+        return []
 
+    lines = []
     remainder = total_h % spacing
     y_offset = remainder // 2
 
     x = 0
     while x <= total_w:
-        draw.line((x, 0, x, total_h), fill=color, width=line_width)
+        lines.append(Line((x, 0, x, total_h), color, line_width))
         x += spacing
 
     y = -y_offset
     while y <= total_h:
-        draw.line((0, y, total_w, y), fill=color, width=line_width)
+        lines.append(Line((0, y, total_w, y), color, line_width))
         y += spacing
-
-def _draw_circle_x(
-    draw: ImageDraw.ImageDraw,
-    total_w: int,
-    total_h: int,
-    color: Tuple[int, int, int],
-    line_width: int,
-) -> None:
-    cx = total_w / 2
-    cy = total_h / 2
-    radius = int(round(min(total_w, total_h) * 0.45))
-    bbox = [cx - radius, cy - radius, cx + radius, cy + radius]
-    draw.ellipse(bbox, outline=color, width=line_width)
-    draw.line((0, 0, total_w, total_h), fill=color, width=line_width)
-    draw.line((0, total_h, total_w, 0), fill=color, width=line_width)
+    return lines
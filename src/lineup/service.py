@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+from .cache import LRUCache
+from .export import encode_png
+from .metrics import METRICS
+from .models import LINEUP_TYPES, ScreenSpec, TileType
+from .renderer import RenderOptions, lineup_canvas_size, render_lineup_png
+
+DEFAULT_PORT = 8502
+DEFAULT_HOST = "127.0.0.1"
+# Largest canvas one request may render. Renders hold about 8 bytes per pixel,
+# so peak memory stays near max_workers x 1.2 GB.
+DEFAULT_MAX_CANVAS_PIXELS = 150_000_000
+
+# RenderOptions fields a client may set; fonts and branding stay server-side.
+_OPTION_FIELDS = {
+    "lineup_type": str,
+    "show_overlay": bool,
+    "circlex_grid_black_bg": bool,
+    "tile_text_rgb": tuple,
+    "overlay_text_rgb": tuple,
+    "outline_rgb": tuple,
+}
+_SCREEN_FIELDS = {
+    "screen_name": str,
+    "tile_label": str,
+    "rows": int,
+    "cols": int,
+    "default_tile_type_id": str,
+    "secondary_tile_type_id": str,
+    "secondary_placement": str,
+    "secondary_rows": int,
+    "base_color_name": str,
+    "expected_w_px": int,
+    "expected_h_px": int,
+}
+
+
+class ServiceBusy(Exception):
+    """Raised when the render queue is full."""
+
+
+class CanvasTooLarge(ValueError):
+    """Raised when a request's canvas exceeds the service's pixel cap."""
+
+
+def _coerce(value: Any, kind: type, label: str) -> Any:
+    if kind is tuple:
+        if not (isinstance(value, list) and len(value) == 3 and all(isinstance(v, int) for v in value)):
+            raise ValueError(f"{label} must be an [r, g, b] list")
+        return tuple(value)
+    if kind is int and isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+        raise ValueError(f"{label} must be of type {kind.__name__}")
+    return value
+
+
+def parse_render_request(
+    payload: Any,
+    max_pixels: int = DEFAULT_MAX_CANVAS_PIXELS,
+) -> tuple[ScreenSpec, dict[str, TileType], RenderOptions]:
+    """Build (screen, tiles, opts) from a JSON render request.
+
+    Raises ValueError for malformed or unrenderable requests, and
+    CanvasTooLarge when the canvas would exceed `max_pixels`.
+
+    Expected shape::
+
+        {"screen": {ScreenSpec fields},
+         "tiles": {"192x384": {"w_px": 192, "h_px": 384}, ...},
+         "options": {"lineup_type": "RGB", "show_overlay": true, ...}}
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get("screen"), dict):
+        raise ValueError("Request must be a JSON object with a 'screen' object.")
+
+    screen_kwargs = {}
+    for key, value in payload["screen"].items():
+        if key not in _SCREEN_FIELDS:
+            raise ValueError(f"Unknown screen field '{key}'")
+        if value is not None:
+            screen_kwargs[key] = _coerce(value, _SCREEN_FIELDS[key], f"screen.{key}")
+    try:
+        screen = ScreenSpec(**screen_kwargs)
+    except TypeError as exc:
+        raise ValueError(f"Invalid screen: {exc}") from exc
+    if screen.rows <= 0 or screen.cols <= 0:
+        raise ValueError("screen.rows and screen.cols must be positive")
+    if screen.secondary_rows < 0:
+        raise ValueError("screen.secondary_rows must not be negative")
+    for key in ("expected_w_px", "expected_h_px"):
+        if getattr(screen, key) is not None and getattr(screen, key) <= 0:
+            raise ValueError(f"screen.{key} must be positive")
+
+    tiles: dict[str, TileType] = {}
+    raw_tiles = payload.get("tiles") or {}
+    if not isinstance(raw_tiles, dict):
+        raise ValueError("'tiles' must be an object keyed by tile_type_id")
+    for tile_id, spec in raw_tiles.items():
+        if not isinstance(spec, dict):
+            raise ValueError(f"tiles.{tile_id} must be an object")
+        w_px = _coerce(spec.get("w_px"), int, f"tiles.{tile_id}.w_px")
+        h_px = _coerce(spec.get("h_px"), int, f"tiles.{tile_id}.h_px")
+        if w_px <= 0 or h_px <= 0:
+            raise ValueError(f"tiles.{tile_id} must have positive w_px/h_px")
+        tiles[tile_id] = TileType(tile_type_id=tile_id, w_px=w_px, h_px=h_px)
+
+    opts = RenderOptions()
+    raw_opts = payload.get("options") or {}
+    if not isinstance(raw_opts, dict):
+        raise ValueError("'options' must be an object")
+    for key, value in raw_opts.items():
+        if key not in _OPTION_FIELDS:
+            raise ValueError(f"Unsupported option '{key}'")
+        setattr(opts, key, _coerce(value, _OPTION_FIELDS[key], f"options.{key}"))
+
+    if opts.lineup_type not in LINEUP_TYPES:
+        raise ValueError(f"options.lineup_type must be one of {', '.join(LINEUP_TYPES)}")
+    has_expected_size = screen.expected_w_px is not None and screen.expected_h_px is not None
+    if opts.lineup_type == "CircleXGrid" and not has_expected_size:
+        raise ValueError("CircleXGrid requires expected_w_px and expected_h_px")
+    if (opts.lineup_type == "RGB" or not has_expected_size) and screen.default_tile_type_id not in tiles:
+        raise ValueError(
+            f"{opts.lineup_type} requires tile specs for the screen's default_tile_type_id"
+            + ("" if opts.lineup_type == "RGB" else " (or expected_w_px/expected_h_px)")
+        )
+    if screen.secondary_rows and screen.secondary_tile_type_id not in tiles:
+        raise ValueError("secondary_tile_type_id must reference an entry in 'tiles'")
+    width, height = lineup_canvas_size(screen, tiles, opts.lineup_type)
+    pixels = width * height
+    if pixels > max_pixels:
+        raise CanvasTooLarge(
+            f"Canvas is {pixels / 1e6:.0f} MP; this service renders at most {max_pixels / 1e6:.0f} MP per request"
+        )
+    return screen, tiles, opts
+
+
+def _request_key(screen: ScreenSpec, tiles: dict[str, TileType], opts: RenderOptions) -> str:
+    canonical = json.dumps(
+        {
+            "screen": repr(screen),
+            "tiles": sorted((t.tile_type_id, t.w_px, t.h_px) for t in tiles.values()),
+            "options": {key: getattr(opts, key) for key in sorted(_OPTION_FIELDS)},
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class RenderService:
+    """Render lineup PNGs on a bounded worker pool.
+
+    Identical requests that arrive while a render is in flight share its result,
+    and finished PNGs are kept in a byte-bounded cache with strong ETags.
+    Requests for canvases over `max_pixels` are refused before rendering.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_pending: int = 16,
+        cache_bytes: int = 256 * 1024 * 1024,
+        max_pixels: int = DEFAULT_MAX_CANVAS_PIXELS,
+    ) -> None:
+        self.max_pending = max_pending
+        self.max_pixels = max_pixels
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lineup-render")
+        self._cache = LRUCache(cache_bytes)
+        self._inflight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.renders = 0
+
+    def render(self, payload: Any) -> tuple[bytes, str]:
+        """Return (png_bytes, etag) for a JSON render request."""
+        screen, tiles, opts = parse_render_request(payload, self.max_pixels)
+        key = _request_key(screen, tiles, opts)
+        cached = self._cache.get(key)
+        if cached is not None:
+            METRICS.inc("service_cache_hits")
+            return cached
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
+            future = self._inflight.get(key)
+            if future is None:
+                if len(self._inflight) >= self.max_pending:
+                    METRICS.inc("service_rejected")
+                    raise ServiceBusy("Render queue is full")
+                future = self._pool.submit(self._render, key, screen, tiles, opts)
+                self._inflight[key] = future
+            else:
+                METRICS.inc("service_coalesced")
+        return future.result()
+
+    def _render(
+        self,
+        key: str,
+        screen: ScreenSpec,
+        tiles: dict[str, TileType],
+        opts: RenderOptions,
+    ) -> tuple[bytes, str]:
+        try:
+            png = encode_png(render_lineup_png(screen, tiles, opts))
+            result = (png, f'"{hashlib.blake2b(png, digest_size=16).hexdigest()}"')
+            self._cache.put(key, result, len(png))
+            with self._lock:
+                self.renders += 1
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True)
+
+
+class _RenderHandler(BaseHTTPRequestHandler):
+    server_version = "LineupRender/0.1"
+
+    @property
+    def service(self) -> RenderService:
+        return self.server.service  # type: ignore[attr-defined]
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self._send(200, b'{"status": "ok"}', "application/json")
+            return
+        if url.path == "/metrics":
+            self._send(200, METRICS.to_prometheus().encode("utf-8"), "text/plain; version=0.0.4")
+            return
+        if url.path != "/render":
+            self._send_error(404, "Not found")
+            return
+        spec = parse_qs(url.query).get("spec")
+        if not spec:
+            self._send_error(400, "Missing 'spec' query parameter")
+            return
+        self._handle_render(spec[0])
+
+    def do_POST(self) -> None:
+        if urlparse(self.path).path != "/render":
+            self._send_error(404, "Not found")
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        self._handle_render(self.rfile.read(length).decode("utf-8", errors="replace"))
+
+    def _handle_render(self, body: str) -> None:
+        try:
+            png, etag = self.service.render(json.loads(body))
+        except json.JSONDecodeError as exc:
+            self._send_error(400, f"Invalid JSON: {exc}")
+            return
+        except CanvasTooLarge as exc:
+            self._send_error(413, str(exc))
+            return
+        except ValueError as exc:
+            self._send_error(400, str(exc))
+            return
+        except ServiceBusy as exc:
+            self._send_error(503, str(exc), extra_headers={"Retry-After": "1"})
+            return
+        except Exception as exc:
+            self._send_error(500, f"Render failed: {exc}")
+            return
+
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        match = self.headers.get("If-None-Match", "")
+        if etag in [tag.strip() for tag in match.split(",")] or match.strip() == "*":
+            self._send(304, b"", None, headers)
+            return
+        self._send(200, png, "image/png", headers)
+
+    def _send_error(self, status: int, message: str, extra_headers: dict[str, str] | None = None) -> None:
+        body = json.dumps({"error": message}).encode("utf-8")
+        self._send(status, body, "application/json", extra_headers)
+
+    def _send(
+        self,
+        status: int,
+        body: bytes,
+        content_type: str | None,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+
+def make_server(
+    service: RenderService,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+) -> ThreadingHTTPServer:
+    """Return an HTTP server exposing `service` at GET/POST /render, GET /health and GET /metrics."""
+    server = ThreadingHTTPServer((host, port), _RenderHandler)
+    server.daemon_threads = True
+    server.service = service  # type: ignore[attr-defined]
+    return server
@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from .io_google import fetch_google_sheet_csv, load_lineup_colors_from_csv, load_screens_from_google_csv
+from .metrics import METRICS
+from .models import ScreenSpec, TileType, intern_tile_type
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = ".lineupsnap"
+_MAGIC = b"LINEUPSN"
+
+# magic, format version, flags, string count, tile count, screen count, color
+# count, saved_at (unix s), payload CRC32, source SHA-256
+_HEADER = struct.Struct("<8sHHIIIIdI32s")
+# String indexes: source, sheet name, colors source
+_META = struct.Struct("<III")
+# tile_type_id index, w_px, h_px
+_TILE = struct.Struct("<Iii")
+# screen_name, tile_label, default_tile_type_id, secondary_tile_type_id and
+# base_color_name indexes; rows, cols, secondary_rows, expected_w_px,
+# expected_h_px; secondary_placement code
+_SCREEN = struct.Struct("<IIIIIiiiiiB3x")
+# color name index, hex index
+_COLOR = struct.Struct("<II")
+
+_NONE = 0xFFFFFFFF
+_NO_SIZE = -1
+_PLACEMENTS = (None, "top", "bottom")
+
+
+class SnapshotError(ValueError):
+    """Raised for a snapshot that is corrupt, truncated or from another format version."""
+
+
+@dataclass(frozen=True)
+class ShowSnapshot:
+    tiles: Dict[str, TileType]
+    screens: list[ScreenSpec]
+    lineup_colors: Dict[str, str]
+    # Sheet URL or CSV path the show was parsed from
+    source: str
+    # SHA-256 of the screen notes CSV and LineupColors CSV text
+    source_hash: str
+    sheet_name: Optional[str] = None
+    # Where lineup colors came from: a sheet URL, a CSV path, or "" for none
+    colors_source: str = ""
+    saved_at: float = 0.0
+
+
+def source_digest(sheet_text: str, colors_text: str = "") -> str:
+    """Hash of the inputs a show is parsed from, used to spot a changed sheet."""
+    h = hashlib.sha256(sheet_text.encode("utf-8"))
+    h.update(b"\0")
+    h.update(colors_text.encode("utf-8"))
+    return h.hexdigest()
+
+
+class _Strings:
+    def __init__(self) -> None:
+        self.index: dict[str, int] = {}
+
+    def __call__(self, value: Optional[str]) -> int:
+        if value is None:
+            return _NONE
+        return self.index.setdefault(value, len(self.index))
+
+
+def encode_snapshot(snap: ShowSnapshot) -> bytes:
+    """Pack a show into the versioned binary snapshot format.
+
+    Strings are interned into one table, and tiles, screens and colors are
+    fixed-size records that index into it, so loading is a handful of
+    struct.iter_unpack calls rather than CSV parsing.
+    """
+    intern = _Strings()
+    meta = _META.pack(intern(snap.source), intern(snap.sheet_name), intern(snap.colors_source))
+    tiles = b"".join(_TILE.pack(intern(t.tile_type_id), t.w_px, t.h_px) for t in snap.tiles.values())
+    screens = b"".join(
+        _SCREEN.pack(
+            intern(s.screen_name),
+            intern(s.tile_label),
+            intern(s.default_tile_type_id),
+            intern(s.secondary_tile_type_id),
+            intern(s.base_color_name),
+            s.rows,
+            s.cols,
+            s.secondary_rows,
+            _NO_SIZE if s.expected_w_px is None else s.expected_w_px,
+            _NO_SIZE if s.expected_h_px is None else s.expected_h_px,
+            _PLACEMENTS.index(s.secondary_placement),
+        )
+        for s in snap.screens
+    )
+    colors = b"".join(_COLOR.pack(intern(name), intern(hex_)) for name, hex_ in snap.lineup_colors.items())
+    encoded = [value.encode("utf-8") for value in intern.index]
+    lengths = struct.pack(f"<{len(encoded)}I", *map(len, encoded))
+    payload = b"".join((lengths, *encoded, meta, tiles, screens, colors))
+    header = _HEADER.pack(
+        _MAGIC,
+        SNAPSHOT_VERSION,
+        0,
+        len(encoded),
+        len(snap.tiles),
+        len(snap.screens),
+        len(snap.lineup_colors),
+        snap.saved_at,
+        zlib.crc32(payload),
+        bytes.fromhex(snap.source_hash),
+    )
+    return header + payload
+
+
+def decode_snapshot(data: bytes) -> ShowSnapshot:
+    """Unpack a snapshot written by encode_snapshot."""
+    if len(data) < _HEADER.size or data[:8] != _MAGIC:
+        raise SnapshotError("Not a lineup show snapshot.")
+    _, version, _flags, n_strings, n_tiles, n_screens, n_colors, saved_at, crc, digest = _HEADER.unpack_from(data)
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Snapshot format version {version} is not supported (expected {SNAPSHOT_VERSION}).")
+    view = memoryview(data)[_HEADER.size:]
+    if zlib.crc32(view) != crc:
+        raise SnapshotError("Snapshot is corrupt (checksum mismatch).")
+    try:
+        lengths = struct.unpack_from(f"<{n_strings}I", view)
+        pos = 4 * n_strings
+        strings = []
+        for length in lengths:
+            strings.append(str(view[pos:pos + length], "utf-8"))
+            pos += length
+
+        def opt(i: int) -> Optional[str]:
+            return None if i == _NONE else strings[i]
+
+        def section(record: struct.Struct, count: int):
+            nonlocal pos
+            chunk = view[pos:pos + record.size * count]
+            pos += record.size * count
+            return record.iter_unpack(chunk)
+
+        source, sheet_name, colors_source = _META.unpack_from(view, pos)
+        pos += _META.size
+        tiles = {strings[i]: intern_tile_type(strings[i], w, h) for i, w, h in section(_TILE, n_tiles)}
+        # Positional, in ScreenSpec field order: this is the bulk of a load.
+        screens = [
+            ScreenSpec(
+                strings[name],
+                strings[label],
+                rows,
+                cols,
+                strings[default],
+                opt(secondary),
+                _PLACEMENTS[placement],
+                secondary_rows,
+                strings[color],
+                None if w == _NO_SIZE else w,
+                None if h == _NO_SIZE else h,
+            )
+            for name, label, default, secondary, color, rows, cols, secondary_rows, w, h, placement in section(
+                _SCREEN, n_screens
+            )
+        ]
+        lineup_colors = {strings[name]: strings[hex_] for name, hex_ in section(_COLOR, n_colors)}
+    except (struct.error, IndexError, UnicodeDecodeError) as exc:
+        raise SnapshotError(f"Snapshot is truncated or malformed: {exc}") from exc
+    return ShowSnapshot(
+        tiles=tiles,
+        screens=screens,
+        lineup_colors=lineup_colors,
+        source=strings[source],
+        source_hash=digest.hex(),
+        sheet_name=opt(sheet_name),
+        colors_source=opt(colors_source) or "",
+        saved_at=saved_at,
+    )
+
+
+def save_snapshot(path: Path, snap: ShowSnapshot) -> None:
+    """Write `snap` atomically, so a reader never sees a half-written file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(encode_snapshot(snap))
+    os.replace(tmp, path)
+
+
+@METRICS.timed("snapshot_load")
+def load_snapshot(path: Path) -> ShowSnapshot:
+    return decode_snapshot(Path(path).read_bytes())
+
+
+def snapshot_path(snapshot_dir: Path, source: str, sheet_name: Optional[str] = None) -> Path:
+    """Snapshot file for a sheet URL or CSV path (+ sheet name) inside `snapshot_dir`."""
+    key = hashlib.sha1(f"{source}\0{sheet_name or ''}".encode("utf-8")).hexdigest()[:12]
+    stem = Path(source.rstrip("/")).stem if not _is_url(source) else (sheet_name or "sheet")
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", stem).strip("_")[:40] or "show"
+    return Path(snapshot_dir) / f"{slug}-{key}{SNAPSHOT_SUFFIX}"
+
+
+def _is_url(source: str) -> bool:
+    return source.startswith(("http://", "https://"))
+
+
+def fetch_show_source(source: str, sheet_name: Optional[str] = None, colors_source: str = "") -> tuple[str, str]:
+    """Read (screen notes CSV text, LineupColors CSV text) from a sheet URL or CSV path.
+
+    A LineupColors tab that is missing or fails to load reads as "", as in the
+    app; only the screen notes are required.
+    """
+    if _is_url(source):
+        sheet_text = fetch_google_sheet_csv(source, sheet_name=sheet_name)
+    else:
+        sheet_text = Path(source).read_text(encoding="utf-8")
+    colors_text = ""
+    if colors_source:
+        try:
+            if _is_url(colors_source):
+                colors_text = fetch_google_sheet_csv(colors_source, sheet_name="LineupColors")
+            else:
+                colors_text = Path(colors_source).read_text(encoding="utf-8")
+        except (OSError, ValueError):
+            colors_text = ""
+    return sheet_text, colors_text
+
+
+def build_snapshot(
+    source: str,
+    sheet_text: str,
+    colors_text: str = "",
+    sheet_name: Optional[str] = None,
+    colors_source: str = "",
+) -> ShowSnapshot:
+    """Parse a show the same way the app does and wrap it as a snapshot."""
+    lineup_colors = load_lineup_colors_from_csv(colors_text) if colors_text else {}
+    tiles, screens = load_screens_from_google_csv(sheet_text, lineup_colors=lineup_colors)
+    return ShowSnapshot(
+        tiles=tiles,
+        screens=screens,
+        lineup_colors=lineup_colors,
+        source=source,
+        source_hash=source_digest(sheet_text, colors_text),
+        sheet_name=sheet_name,
+        colors_source=colors_source,
+        saved_at=time.time(),
+    )
+
+
+class SnapshotRevalidator:
+    """Checks a snapshot against its live source on a background thread.
+
+    `status` moves from "checking" to "fresh" (source unchanged), "updated"
+    (source changed; `snapshot` holds the reparsed show, already saved to
+    `path`) or "failed" (`error` says why; the old snapshot stays usable).
+    `on_change(new_snapshot)` is called from the background thread.
+    """
+
+    def __init__(
+        self,
+        snap: ShowSnapshot,
+        path: Path,
+        on_change: Optional[Callable[[ShowSnapshot], None]] = None,
+        fetch: Callable[[str, Optional[str], str], tuple[str, str]] = fetch_show_source,
+    ) -> None:
+        self.path = Path(path)
+        self.snapshot = snap
+        self.status = "checking"
+        self.error: Optional[BaseException] = None
+        self._on_change = on_change
+        self._fetch = fetch
+        self._done = threading.Event()
+        threading.Thread(target=self._run, name="lineup-snapshot-revalidate", daemon=True).start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def _run(self) -> None:
+        snap = self.snapshot
+        try:
+            with METRICS.timed("snapshot_revalidate"):
+                sheet_text, colors_text = self._fetch(snap.source, snap.sheet_name, snap.colors_source)
+                if source_digest(sheet_text, colors_text) == snap.source_hash:
+                    self.status = "fresh"
+                    return
+                fresh = build_snapshot(snap.source, sheet_text, colors_text, snap.sheet_name, snap.colors_source)
+                save_snapshot(self.path, fresh)
+            self.snapshot = fresh
+            self.status = "updated"
+            METRICS.inc("snapshot_updates")
+            if self._on_change:
+                self._on_change(fresh)
+        except Exception as exc:
+            self.error = exc
+            self.status = "failed"
+        finally:
+            self._done.set()
+
+
+def open_show(
+    source: str,
+    snapshot_dir: Path,
+    sheet_name: Optional[str] = None,
+    colors_source: str = "",
+    on_change: Optional[Callable[[ShowSnapshot], None]] = None,
+) -> tuple[ShowSnapshot, Optional[SnapshotRevalidator]]:
+    """Open a show from its snapshot if there is one, else from the source.
+
+    With a usable snapshot the show is returned right away together with a
+    revalidator already checking the live source. Otherwise the source is
+    fetched and parsed now, a snapshot is saved, and no revalidator is
+    returned. Source errors propagate as OSError/ValueError, like the loaders.
+    """
+    path = snapshot_path(snapshot_dir, source, sheet_name)
+    if path.exists():
+        try:
+            snap = load_snapshot(path)
+        except (OSError, SnapshotError):
+            METRICS.inc("snapshot_invalid")
+        else:
+            if snap.colors_source == colors_source:
+                METRICS.inc("snapshot_hits")
+                return snap, SnapshotRevalidator(snap, path, on_change)
+    sheet_text, colors_text = fetch_show_source(source, sheet_name, colors_source)
+    snap = build_snapshot(source, sheet_text, colors_text, sheet_name, colors_source)
+    try:
+        save_snapshot(path, snap)
+    except OSError:
+        # A read-only folder only costs the next open its head start.
+        METRICS.inc("snapshot_save_errors")
+    return snap, None
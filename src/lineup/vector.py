@@ -0,0 +1,451 @@
+from __future__ import annotations
+
+import base64
+import io
+import math
+import struct
+import zlib
+from typing import Dict
+from xml.sax.saxutils import escape, quoteattr
+
+from PIL import Image, ImageFont
+
+from .models import ScreenSpec, TileType
+from .plan import Composite, Ellipse, FillRect, Line, OutlineRect, RenderPlan, TextRun
+from .renderer import RenderOptions, _load_font, compile_render_plan, plan_images
+
+# Bezier control point offset for approximating a quarter ellipse
+_KAPPA = 0.5522847498
+
+# Largest page side most PDF viewers accept in default user units
+_PDF_MAX_PAGE = 14400
+# Font size used to measure embedded font widths (PDF glyph space is 1/1000 em)
+_PDF_FONT_UNITS = 1000
+# TrueType tables a PDF viewer needs from an embedded FontFile2; layout tables are dropped
+_TTF_KEEP_TABLES = (b"cmap", b"cvt ", b"fpgm", b"glyf", b"head", b"hhea", b"hmtx", b"loca", b"maxp", b"prep")
+
+
+def _font_info(fonts: dict, run: TextRun):
+    """Return (font, family, ascent) for a text run, loading each font once."""
+    key = (run.font_name, run.font_size)
+    info = fonts.get(key)
+    if info is None:
+        font = _load_font(run.font_name, run.font_size)
+        if isinstance(font, ImageFont.FreeTypeFont):
+            family = font.getname()[0] or "sans-serif"
+        else:
+            family = "sans-serif"
+        if hasattr(font, "getmetrics"):
+            ascent = font.getmetrics()[0]
+        else:
+            ascent = font.getbbox("A")[3]
+        info = fonts[key] = (font, family, ascent)
+    return info
+
+
+def _ttf_checksum(data: bytes) -> int:
+    data += b"\0" * (-len(data) % 4)
+    return sum(struct.unpack(f">{len(data) // 4}I", data)) & 0xFFFFFFFF
+
+
+def _ttf_cmap_lookup(cmap: bytes) -> Dict[int, int] | None:
+    """Return code point -> glyph id from the Windows Unicode BMP (format 4) subtable."""
+    for i in range(struct.unpack_from(">H", cmap, 2)[0]):
+        platform, encoding, offset = struct.unpack_from(">HHI", cmap, 4 + 8 * i)
+        if (platform, encoding) == (3, 1) and struct.unpack_from(">H", cmap, offset)[0] == 4:
+            break
+    else:
+        return None
+    segs = struct.unpack_from(">H", cmap, offset + 6)[0] // 2
+    ends = struct.unpack_from(f">{segs}H", cmap, offset + 14)
+    starts = struct.unpack_from(f">{segs}H", cmap, offset + 16 + 2 * segs)
+    deltas = struct.unpack_from(f">{segs}h", cmap, offset + 16 + 4 * segs)
+    range_pos = offset + 16 + 6 * segs
+    range_offsets = struct.unpack_from(f">{segs}H", cmap, range_pos)
+    glyphs = {}
+    for seg, (start, end, delta, range_offset) in enumerate(zip(starts, ends, deltas, range_offsets)):
+        for code in range(start, min(end, 0xFFFE) + 1):
+            if range_offset:
+                pos = range_pos + 2 * seg + range_offset + 2 * (code - start)
+                glyph = struct.unpack_from(">H", cmap, pos)[0]
+                glyph = (glyph + delta) & 0xFFFF if glyph else 0
+            else:
+                glyph = (code + delta) & 0xFFFF
+            glyphs[code] = glyph
+    return glyphs
+
+
+def _subset_truetype(data: bytes, text: str) -> bytes | None:
+    """Return `data` with every glyph not needed for `text` emptied, or None if unsupported.
+
+    Glyph ids, cmap and metrics are kept as they are, so the font still maps
+    characters the same way; only outlines and layout tables are dropped.
+    """
+    if data[:4] not in (b"\x00\x01\x00\x00", b"true"):
+        return None
+    tables = {}
+    for i in range(struct.unpack_from(">H", data, 4)[0]):
+        tag, _checksum, offset, length = struct.unpack_from(">4sIII", data, 12 + 16 * i)
+        tables[tag] = data[offset:offset + length]
+    if not {b"glyf", b"loca", b"head", b"maxp", b"cmap"} <= tables.keys():
+        return None
+    cmap = _ttf_cmap_lookup(tables[b"cmap"])
+    if cmap is None:
+        return None
+    long_loca = struct.unpack_from(">h", tables[b"head"], 50)[0] == 1
+    num_glyphs = struct.unpack_from(">H", tables[b"maxp"], 4)[0]
+    if long_loca:
+        loca = struct.unpack_from(f">{num_glyphs + 1}I", tables[b"loca"])
+    else:
+        loca = [2 * v for v in struct.unpack_from(f">{num_glyphs + 1}H", tables[b"loca"])]
+    glyf = tables[b"glyf"]
+
+    keep = {0}
+    pending = [cmap.get(ord(ch), 0) for ch in set(text)]
+    while pending:
+        glyph = pending.pop()
+        if glyph in keep or glyph >= num_glyphs:
+            continue
+        keep.add(glyph)
+        outline = glyf[loca[glyph]:loca[glyph + 1]]
+        if len(outline) >= 10 and struct.unpack_from(">h", outline, 0)[0] < 0:
+            # Composite glyph: keep every component it references.
+            pos = 10
+            while True:
+                flags, component = struct.unpack_from(">HH", outline, pos)
+                pending.append(component)
+                pos += 4 + (4 if flags & 0x0001 else 2)
+                pos += 2 if flags & 0x0008 else 4 if flags & 0x0040 else 8 if flags & 0x0080 else 0
+                if not flags & 0x0020:
+                    break
+
+    new_glyf = bytearray()
+    offsets = []
+    for glyph in range(num_glyphs):
+        offsets.append(len(new_glyf))
+        if glyph in keep:
+            new_glyf += glyf[loca[glyph]:loca[glyph + 1]]
+            new_glyf += b"\0" * (-len(new_glyf) % 4)
+    offsets.append(len(new_glyf))
+    tables[b"glyf"] = bytes(new_glyf)
+    if long_loca:
+        tables[b"loca"] = struct.pack(f">{len(offsets)}I", *offsets)
+    else:
+        tables[b"loca"] = struct.pack(f">{len(offsets)}H", *(o // 2 for o in offsets))
+    head = bytearray(tables[b"head"])
+    head[8:12] = b"\0\0\0\0"
+    tables[b"head"] = bytes(head)
+
+    kept = [tag for tag in sorted(tables) if tag in _TTF_KEEP_TABLES]
+    entry_selector = max(0, len(kept).bit_length() - 1)
+    search_range = 16 * (1 << entry_selector)
+    out = bytearray(struct.pack(">4sHHHH", data[:4], len(kept), search_range, entry_selector,
+                                16 * len(kept) - search_range))
+    offset = 12 + 16 * len(kept)
+    body = bytearray()
+    for tag in kept:
+        table = tables[tag]
+        out += struct.pack(">4sIII", tag, _ttf_checksum(table), offset + len(body), len(table))
+        body += table + b"\0" * (-len(table) % 4)
+    font = out + body
+    head_pos = offset + sum(len(tables[t]) + (-len(tables[t]) % 4) for t in kept[:kept.index(b"head")])
+    struct.pack_into(">I", font, head_pos + 8, (0xB1B0AFBA - _ttf_checksum(bytes(font))) & 0xFFFFFFFF)
+    return bytes(font)
+
+
+def _hex(rgb) -> str:
+    return "#%02x%02x%02x" % tuple(rgb)
+
+
+def _png_bytes(img: Image.Image) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _branding_source(images: Dict[str, Image.Image], op: Composite) -> Image.Image:
+    img = images[op.image_id]
+    if img.mode != "RGBA":
+        img = img.convert("RGBA")
+    if img.size != op.size:
+        img = img.resize(op.size, Image.LANCZOS)
+    return img
+
+
+class SvgBackend:
+    """Execute render plans as SVG documents.
+
+    Geometry follows the raster backend: rect boxes are inclusive, outlines and
+    ellipse strokes sit inside their box, and text runs keep their top-left
+    anchor and resolved font size.
+    """
+
+    def __init__(self, images: Dict[str, Image.Image] | None = None) -> None:
+        self.images = images or {}
+
+    def execute(self, plan: RenderPlan, region=None) -> str:
+        left, top, right, bottom = region or (0, 0, plan.width, plan.height)
+        w, h = right - left, bottom - top
+        fonts: dict = {}
+        # Repeated paint/font attributes become CSS classes to keep large walls small.
+        classes: dict[str, str] = {}
+
+        def css(rule: str) -> str:
+            name = classes.get(rule)
+            if name is None:
+                name = classes[rule] = f"c{len(classes)}"
+            return name
+
+        body = [f'<rect x="{left}" y="{top}" width="{w}" height="{h}" fill="#000000"/>']
+        for op in plan.ops:
+            b = op.bounds
+            if b[0] > right or b[2] < left or b[1] > bottom or b[3] < top:
+                continue
+            if isinstance(op, FillRect):
+                x0, y0, x1, y1 = op.box
+                cls = css(f"fill:{_hex(op.rgb)};shape-rendering:crispEdges")
+                body.append(f'<rect class="{cls}" x="{x0:g}" y="{y0:g}" width="{x1 - x0 + 1:g}" height="{y1 - y0 + 1:g}"/>')
+            elif isinstance(op, OutlineRect):
+                x0, y0, x1, y1 = op.box
+                half = op.width / 2
+                cls = css(f"fill:none;stroke:{_hex(op.rgb)};stroke-width:{op.width}")
+                body.append(
+                    f'<rect class="{cls}" x="{x0 + half:g}" y="{y0 + half:g}" '
+                    f'width="{x1 - x0 + 1 - op.width:g}" height="{y1 - y0 + 1 - op.width:g}"/>'
+                )
+            elif isinstance(op, Line):
+                x0, y0, x1, y1 = op.xy
+                cls = css(f"stroke:{_hex(op.rgb)};stroke-width:{op.width}")
+                body.append(f'<line class="{cls}" x1="{x0:g}" y1="{y0:g}" x2="{x1:g}" y2="{y1:g}"/>')
+            elif isinstance(op, Ellipse):
+                x0, y0, x1, y1 = op.box
+                cls = css(f"fill:none;stroke:{_hex(op.rgb)};stroke-width:{op.width}")
+                body.append(
+                    f'<ellipse class="{cls}" cx="{(x0 + x1 + 1) / 2:g}" cy="{(y0 + y1 + 1) / 2:g}" '
+                    f'rx="{(x1 - x0 + 1 - op.width) / 2:g}" ry="{(y1 - y0 + 1 - op.width) / 2:g}"/>'
+                )
+            elif isinstance(op, TextRun):
+                _font, family, ascent = _font_info(fonts, op)
+                rule = f"font-family:{quoteattr(family)};font-size:{op.font_size}px;fill:{_hex(op.rgb)};white-space:pre"
+                if op.stroke_width:
+                    rule += (
+                        f";stroke:{_hex(op.stroke_rgb or (0, 0, 0))};stroke-width:{2 * op.stroke_width}"
+                        ";stroke-linejoin:round;paint-order:stroke"
+                    )
+                body.append(
+                    f'<text class="{css(rule)}" x="{op.xy[0]:.2f}" y="{op.xy[1] + ascent:.2f}">{escape(op.text)}</text>'
+                )
+            elif isinstance(op, Composite):
+                data = base64.b64encode(_png_bytes(_branding_source(self.images, op))).decode("ascii")
+                body.append(
+                    f'<image x="{op.xy[0]}" y="{op.xy[1]}" width="{op.size[0]}" height="{op.size[1]}" '
+                    f'href="data:image/png;base64,{data}"/>'
+                )
+
+        style = "\n".join(f".{name}{{{rule}}}" for rule, name in classes.items())
+        out = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{w}" height="{h}" viewBox="{left} {top} {w} {h}">',
+            f"<style>\n{escape(style)}\n</style>",
+            *body,
+            "</svg>",
+        ]
+        return "\n".join(out) + "\n"
+
+
+def _pdf_string(text: str) -> str:
+    raw = text.encode("cp1252", errors="replace").decode("latin-1")
+    return "(" + raw.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+class _PdfWriter:
+    def __init__(self) -> None:
+        self.objects: list[bytes] = []
+
+    def add(self, body: bytes | str) -> int:
+        self.objects.append(body.encode("latin-1") if isinstance(body, str) else body)
+        return len(self.objects)
+
+    def stream(self, data: bytes, extra: str = "", compress: bool = True) -> int:
+        if compress:
+            data = zlib.compress(data)
+            extra += " /Filter /FlateDecode"
+        return self.add(f"<< /Length {len(data)}{extra} >>\nstream\n".encode("latin-1") + data + b"\nendstream")
+
+    def finish(self, root: int) -> bytes:
+        out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for num, body in enumerate(self.objects, start=1):
+            offsets.append(len(out))
+            out += f"{num} 0 obj\n".encode("latin-1") + body + b"\nendobj\n"
+        xref = len(out)
+        out += f"xref\n0 {len(self.objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+        for offset in offsets:
+            out += f"{offset:010d} 00000 n \n".encode("latin-1")
+        out += (
+            f"trailer\n<< /Size {len(self.objects) + 1} /Root {root} 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+        ).encode("latin-1")
+        return bytes(out)
+
+
+class PdfBackend:
+    """Execute render plans as a single-page PDF (one canvas pixel per PDF unit).
+
+    TrueType fonts are embedded so labels keep the raster layout, once per
+    font file and subset to the glyphs on the page; the bitmap fallback font
+    maps to Helvetica. Canvases beyond the usual PDF page limit
+    use /UserUnit so the page still opens at full size.
+    """
+
+    def __init__(self, images: Dict[str, Image.Image] | None = None) -> None:
+        self.images = images or {}
+
+    def execute(self, plan: RenderPlan, region=None) -> bytes:
+        left, top, right, bottom = region or (0, 0, plan.width, plan.height)
+        w, h = right - left, bottom - top
+        unit = max(1, math.ceil(max(w, h) / _PDF_MAX_PAGE))
+        scale = 1 / unit
+
+        writer = _PdfWriter()
+        # One embedded font per font file, whatever sizes it is used at: the
+        # size is set per text run with Tf. Text is collected so the font
+        # can be subset once every run is known.
+        font_names: dict[str, str] = {}
+        font_text: dict[str, tuple[ImageFont.FreeTypeFont | ImageFont.ImageFont, list[str]]] = {}
+        image_objs: dict[str, int] = {}
+        fonts: dict = {}
+
+        # Flip to a top-left origin in canvas pixels.
+        ops = [f"{scale:g} 0 0 {-scale:g} 0 {h * scale:g} cm", f"1 0 0 1 {-left} {-top} cm", "0 J"]
+
+        def rg(rgb) -> str:
+            return " ".join(f"{c / 255:.4g}" for c in rgb)
+
+        for op in plan.ops:
+            b = op.bounds
+            if b[0] > right or b[2] < left or b[1] > bottom or b[3] < top:
+                continue
+            if isinstance(op, FillRect):
+                x0, y0, x1, y1 = op.box
+                ops.append(f"{rg(op.rgb)} rg {x0:g} {y0:g} {x1 - x0 + 1:g} {y1 - y0 + 1:g} re f")
+            elif isinstance(op, OutlineRect):
+                x0, y0, x1, y1 = op.box
+                half = op.width / 2
+                ops.append(
+                    f"{rg(op.rgb)} RG {op.width} w {x0 + half:g} {y0 + half:g} "
+                    f"{x1 - x0 + 1 - op.width:g} {y1 - y0 + 1 - op.width:g} re S"
+                )
+            elif isinstance(op, Line):
+                x0, y0, x1, y1 = op.xy
+                ops.append(f"{rg(op.rgb)} RG {op.width} w {x0:g} {y0:g} m {x1:g} {y1:g} l S")
+            elif isinstance(op, Ellipse):
+                x0, y0, x1, y1 = op.box
+                cx, cy = (x0 + x1 + 1) / 2, (y0 + y1 + 1) / 2
+                rx, ry = (x1 - x0 + 1 - op.width) / 2, (y1 - y0 + 1 - op.width) / 2
+                kx, ky = rx * _KAPPA, ry * _KAPPA
+                ops.append(
+                    f"{rg(op.rgb)} RG {op.width} w {cx + rx:g} {cy:g} m "
+                    f"{cx + rx:g} {cy + ky:g} {cx + kx:g} {cy + ry:g} {cx:g} {cy + ry:g} c "
+                    f"{cx - kx:g} {cy + ry:g} {cx - rx:g} {cy + ky:g} {cx - rx:g} {cy:g} c "
+                    f"{cx - rx:g} {cy - ky:g} {cx - kx:g} {cy - ry:g} {cx:g} {cy - ry:g} c "
+                    f"{cx + kx:g} {cy - ry:g} {cx + rx:g} {cy - ky:g} {cx + rx:g} {cy:g} c S"
+                )
+            elif isinstance(op, TextRun):
+                font, _family, ascent = _font_info(fonts, op)
+                font_key = getattr(font, "path", None) if isinstance(font, ImageFont.FreeTypeFont) else None
+                font_key = font_key if isinstance(font_key, str) else ""
+                name = font_names.get(font_key)
+                if name is None:
+                    name = font_names[font_key] = f"F{len(font_names) + 1}"
+                    font_text[name] = (font, [])
+                font_text[name][1].append(op.text)
+                # Text space is flipped back upright at the run's baseline.
+                tm = f"1 0 0 -1 {op.xy[0]:.2f} {op.xy[1] + ascent:.2f} Tm"
+                text = _pdf_string(op.text)
+                if op.stroke_width:
+                    stroke = rg(op.stroke_rgb or (0, 0, 0))
+                    ops.append(
+                        f"BT /{name} {op.font_size} Tf {tm} {stroke} rg {stroke} RG {2 * op.stroke_width} w "
+                        f"1 j 2 Tr {text} Tj ET"
+                    )
+                ops.append(f"BT /{name} {op.font_size} Tf {tm} {rg(op.rgb)} rg 0 Tr {text} Tj ET")
+            elif isinstance(op, Composite):
+                ref = image_objs.get(op.image_id)
+                if ref is None:
+                    ref = image_objs[op.image_id] = self._image_xobject(writer, _branding_source(self.images, op))
+                bw, bh = op.size
+                ops.append(f"q {bw} 0 0 {-bh} {op.xy[0]} {op.xy[1] + bh} cm /Im{ref} Do Q")
+
+        content = writer.stream("\n".join(ops).encode("latin-1"))
+        font_objs = {
+            name: self._font_resource(writer, font, "".join(texts)) for name, (font, texts) in font_text.items()
+        }
+        font_dict = " ".join(f"/{name} {num} 0 R" for name, num in font_objs.items())
+        image_dict = " ".join(f"/Im{num} {num} 0 R" for num in image_objs.values())
+        resources = f"<< /Font << {font_dict} >> /XObject << {image_dict} >> >>"
+        pages = len(writer.objects) + 2
+        page = writer.add(
+            f"<< /Type /Page /Parent {pages} 0 R /MediaBox [0 0 {w * scale:g} {h * scale:g}] "
+            f"/UserUnit {unit} /Resources {resources} /Contents {content} 0 R >>"
+        )
+        writer.add(f"<< /Type /Pages /Kids [{page} 0 R] /Count 1 >>")
+        root = writer.add(f"<< /Type /Catalog /Pages {pages} 0 R >>")
+        return writer.finish(root)
+
+    @staticmethod
+    def _font_resource(writer: _PdfWriter, font, text: str) -> int:
+        path = getattr(font, "path", None)
+        if not isinstance(font, ImageFont.FreeTypeFont) or not isinstance(path, str):
+            return writer.add("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+        # Widths in 1/1000 em for the WinAnsi range, measured with the same font.
+        ref = ImageFont.truetype(path, _PDF_FONT_UNITS, index=getattr(font, "index", 0))
+        widths = []
+        for code in range(32, 256):
+            char = bytes([code]).decode("cp1252", errors="replace")
+            widths.append(str(round(ref.getlength(char))))
+        ascent, descent = ref.getmetrics()
+        base_name = "".join(ch for ch in (font.getname()[0] or "Font") if ch.isalnum()) or "Font"
+        with open(path, "rb") as handle:
+            data = handle.read()
+        # Only glyphs for the characters on the page are kept; unknown formats are embedded whole.
+        pdf_text = text.encode("cp1252", errors="replace").decode("cp1252")
+        subset = _subset_truetype(data, pdf_text)
+        if subset is not None:
+            data = subset
+            base_name = f"LNUPSB+{base_name}"
+        font_file = writer.stream(data, f" /Length1 {len(data)}")
+        descriptor = writer.add(
+            f"<< /Type /FontDescriptor /FontName /{base_name} /Flags 32 "
+            f"/FontBBox [0 {-descent} 1000 {ascent}] "
+            f"/ItalicAngle 0 /Ascent {ascent} /Descent {-descent} "
+            f"/CapHeight {ascent} /StemV 80 /FontFile2 {font_file} 0 R >>"
+        )
+        return writer.add(
+            f"<< /Type /Font /Subtype /TrueType /BaseFont /{base_name} /FirstChar 32 /LastChar 255 "
+            f"/Widths [{' '.join(widths)}] /Encoding /WinAnsiEncoding /FontDescriptor {descriptor} 0 R >>"
+        )
+
+    @staticmethod
+    def _image_xobject(writer: _PdfWriter, img: Image.Image) -> int:
+        rgb = img.convert("RGB")
+        alpha = writer.stream(
+            img.getchannel("A").tobytes(),
+            f" /Type /XObject /Subtype /Image /Width {img.width} /Height {img.height} "
+            "/ColorSpace /DeviceGray /BitsPerComponent 8",
+        )
+        return writer.stream(
+            rgb.tobytes(),
+            f" /Type /XObject /Subtype /Image /Width {img.width} /Height {img.height} "
+            f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /SMask {alpha} 0 R",
+        )
+
+
+def render_lineup_svg(screen: ScreenSpec, tiles: Dict[str, TileType], opts: RenderOptions) -> str:
+    """Return the lineup as an SVG document with the same layout as render_lineup_png."""
+    return SvgBackend(plan_images(opts)).execute(compile_render_plan(screen, tiles, opts))
+
+
+def render_lineup_pdf(screen: ScreenSpec, tiles: Dict[str, TileType], opts: RenderOptions) -> bytes:
+    """Return the lineup as a single-page PDF with the same layout as render_lineup_png."""
+    return PdfBackend(plan_images(opts)).execute(compile_render_plan(screen, tiles, opts))
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict
+
+from .export import export_pngs_to_dir
+from .io_google import load_screens_from_google_csv
+from .catalog import ScreenCatalog
+from .models import ScreenSpec, TileType
+from .renderer import RenderOptions
+
+
+def _screen_signature(screen: ScreenSpec, tiles: Dict[str, TileType]) -> tuple:
+    """Return everything about `screen` that can change its rendered PNG."""
+    tile_ids = (screen.default_tile_type_id, screen.secondary_tile_type_id)
+    used_tiles = tuple((tiles[t].w_px, tiles[t].h_px) if t in tiles else None for t in tile_ids)
+    return (screen, used_tiles)
+
+
+@dataclass
+class _WatchedShow:
+    content_hash: str | None = None
+    # screen signature -> exported, for change detection between passes
+    exported: set[tuple] = field(default_factory=set)
+
+
+class ShowWatcher:
+    """Poll a screen notes CSV (or a folder of them) and re-export changed screens.
+
+    Changes are debounced: a burst of saves triggers a single pass once the files
+    have been quiet for `debounce_s`. A pass only re-renders screens whose parsed
+    spec actually changed, and files whose content hash is unchanged (e.g. a save
+    without edits) are skipped entirely.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        out_dir: Path,
+        opts: RenderOptions,
+        version: str,
+        lineup_colors: dict[str, str] | None = None,
+        debounce_s: float = 2.0,
+        log: Callable[[str], None] = print,
+    ) -> None:
+        self.path = path
+        self.out_dir = out_dir
+        self.opts = opts
+        self.version = version
+        self.lineup_colors = lineup_colors
+        self.debounce_s = debounce_s
+        self.log = log
+        self._shows: dict[Path, _WatchedShow] = {}
+        self._last_stat: dict[Path, tuple[int, int]] | None = None
+        self._changed_at: float | None = None
+
+    def _csv_paths(self) -> list[Path]:
+        if self.path.is_dir():
+            return sorted(p for p in self.path.glob("*.csv") if p.is_file())
+        return [self.path] if self.path.is_file() else []
+
+    def _stat_snapshot(self) -> dict[Path, tuple[int, int]]:
+        snapshot = {}
+        for csv_path in self._csv_paths():
+            try:
+                st = csv_path.stat()
+            except OSError:
+                continue
+            snapshot[csv_path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def _show_out_dir(self, csv_path: Path) -> Path:
+        # A folder of shows gets one output folder per CSV so tile labels can't collide.
+        return self.out_dir / csv_path.stem if self.path.is_dir() else self.out_dir
+
+    def poll(self, now: float | None = None) -> int:
+        """Check for changes once; return the number of PNGs exported (0 if idle)."""
+        now = time.monotonic() if now is None else now
+        snapshot = self._stat_snapshot()
+        if snapshot != self._last_stat:
+            self._last_stat = snapshot
+            self._changed_at = now
+            return 0
+        if self._changed_at is None or now - self._changed_at < self.debounce_s:
+            return 0
+        self._changed_at = None
+        return self.export_changed()
+
+    def export_changed(self) -> int:
+        """Re-export screens whose spec changed since the previous pass."""
+        total = 0
+        for csv_path in self._csv_paths():
+            show = self._shows.setdefault(csv_path, _WatchedShow())
+            try:
+                data = csv_path.read_bytes()
+            except OSError as exc:
+                self.log(f"{csv_path.name}: unreadable ({exc})")
+                continue
+            content_hash = hashlib.sha256(data).hexdigest()
+            if content_hash == show.content_hash:
+                continue
+
+            try:
+                tiles, screens = load_screens_from_google_csv(
+                    data.decode("utf-8"), lineup_colors=self.lineup_colors
+                )
+            except (UnicodeDecodeError, ValueError) as exc:
+                # Likely a half-written save; the next change retries.
+                self.log(f"{csv_path.name}: not exported ({exc})")
+                continue
+
+            eligible = ScreenCatalog(screens, tiles).eligible_screens(self.opts.lineup_type)
+            signatures = {_screen_signature(s, tiles): s for s in eligible}
+            changed = [s for sig, s in signatures.items() if sig not in show.exported]
+            removed = len(show.exported - signatures.keys())
+
+            out_dir = self._show_out_dir(csv_path)
+            try:
+                out_dir.mkdir(parents=True, exist_ok=True)
+                count = export_pngs_to_dir(changed, tiles, self.opts, out_dir, self.version)
+            except Exception as exc:
+                # Keep watching the other shows; the hash stays unset so the next pass retries.
+                self.log(f"{csv_path.name}: export failed ({exc})")
+                continue
+            show.content_hash = content_hash
+            show.exported = set(signatures)
+            total += count
+            self.log(
+                f"{csv_path.name}: exported {count} changed screen(s) of {len(eligible)}"
+                + (f", {removed} removed/renamed" if removed else "")
+            )
+        return total
+
+    def run(self, poll_s: float = 0.5, should_stop: Callable[[], bool] = lambda: False) -> None:
+        """Export everything once, then poll until `should_stop()` returns True."""
+        self._last_stat = self._stat_snapshot()
+        self.export_changed()
+        while not should_stop():
+            time.sleep(poll_s)
+            self.poll()
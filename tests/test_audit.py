@@ -0,0 +1,49 @@
+from dataclasses import replace
+
+import pytest
+from PIL import Image
+
+from src.lineup.audit import audit_outputs, parse_png_header, read_png_header
+from src.lineup.catalog import ScreenCatalog
+from src.lineup.export import encode_png, export_pngs_to_dir
+from src.lineup.models import ScreenSpec, TileType
+from src.lineup.renderer import RenderOptions
+
+
+def test_png_header_is_read_without_decoding(tmp_path):
+    path = tmp_path / "a.png"
+    path.write_bytes(encode_png(Image.new("RGB", (320, 96))) + b"trailing")
+    header = read_png_header(path)
+    assert (header.width, header.height, header.bit_depth, header.color_type) == (320, 96, 8, 2)
+    with pytest.raises(ValueError):
+        parse_png_header(b"GIF89a" + bytes(40))
+
+
+def test_audit_reports_missing_wrong_size_stale_and_orphans(tmp_path):
+    tiles = {"FULL": TileType(tile_type_id="FULL", w_px=32, h_px=32)}
+    screens = [
+        ScreenSpec(screen_name="L", tile_label="IMAG_L", rows=2, cols=3, default_tile_type_id="FULL"),
+        ScreenSpec(screen_name="R", tile_label="IMAG_R", rows=2, cols=3, default_tile_type_id="FULL"),
+        ScreenSpec(screen_name="S", tile_label="SIDE", rows=1, cols=2, default_tile_type_id="FULL"),
+    ]
+    export_pngs_to_dir(screens, tiles, RenderOptions(), tmp_path, "v001", write_manifest=True)
+    assert audit_outputs(tmp_path, ScreenCatalog(screens, tiles), "v001").ok
+
+    (tmp_path / "RGB_OV_IMAG_R_v001.png").unlink()
+    (tmp_path / "RGB_OV_SIDE_v001.png").write_bytes(encode_png(Image.new("RGB", (10, 10))))
+    (tmp_path / "RGB_OV_OLD_v001.png").write_bytes(b"")
+    (tmp_path / "RGB_OV_IMAG_L_v002.png").write_bytes(b"")
+    screens[0] = replace(screens[0], cols=4)
+    report = audit_outputs(tmp_path, ScreenCatalog(screens, tiles), "v001")
+    issues = {kind: [(i.filename, i.detail) for i in found] for kind, found in report.by_kind().items()}
+    assert issues == {
+        "missing": [("RGB_OV_IMAG_R_v001.png", "R")],
+        "wrong_size": [
+            ("RGB_OV_IMAG_L_v001.png", "96x64, expected 128x64"),
+            ("RGB_OV_SIDE_v001.png", "10x10, expected 64x32"),
+        ],
+        "stale": [("RGB_OV_IMAG_L_v001.png", "L changed since export")],
+        "modified": [("RGB_OV_SIDE_v001.png", "contents differ from the export manifest")],
+        "orphan": [("RGB_OV_OLD_v001.png", "")],
+    }
+    assert report.checked == 2 and report.expected == 3
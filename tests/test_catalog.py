@@ -0,0 +1,28 @@
+from src.lineup.catalog import ScreenCatalog
+from src.lineup.models import ScreenSpec, TileType
+
+TILES = {"64x64": TileType("64x64", 64, 64)}
+
+
+def test_catalog_indexes_and_eligibility():
+    screens = [
+        ScreenSpec("IMAG", "IMAG_L", rows=2, cols=3, default_tile_type_id="64x64"),
+        ScreenSpec("IMAG", "IMAG_R", rows=2, cols=3, default_tile_type_id="64x64"),
+        ScreenSpec("SIDE", "SIDE", rows=1, cols=1, default_tile_type_id="Manual",
+                   expected_w_px=1920, expected_h_px=1080),
+        # Secondary tile type is missing from the show, so RGB can't render it.
+        ScreenSpec("FLOOR", "FLOOR", rows=2, cols=2, default_tile_type_id="64x64",
+                   secondary_tile_type_id="64x32", secondary_placement="bottom", secondary_rows=1),
+    ]
+    catalog = ScreenCatalog(screens, TILES)
+
+    assert catalog.duplicate_names == ["IMAG"]
+    assert [e.display_name for e in catalog.by_name("IMAG")] == ["IMAG (IMAG_L)", "IMAG (IMAG_R)"]
+    assert catalog.get("IMAG (IMAG_R)").screen.tile_label == "IMAG_R"
+    assert [e.screen.screen_name for e in catalog.by_tile_type("64x64")] == ["IMAG", "IMAG", "FLOOR"]
+
+    assert [e.screen.tile_label for e in catalog.eligible("RGB")] == ["IMAG_L", "IMAG_R"]
+    assert catalog.eligible_screens("CircleXGrid") == [screens[2]]
+    assert catalog.get("SIDE").canvas_sizes == {"GreyscaleSteps": (1920, 1080), "CircleXGrid": (1920, 1080)}
+    assert catalog.get("IMAG (IMAG_L)").resolution == (192, 128)
+    assert any("64x32" in w for w in catalog.get("FLOOR").warnings["RGB"])
@@ -0,0 +1,38 @@
+from src.lineup.catalog import ScreenCatalog
+from src.lineup.contact import render_contact_sheet, render_thumbnail
+from src.lineup.models import ScreenSpec, TileType
+from src.lineup.palette import PALETTE, darken
+from src.lineup.renderer import RenderOptions
+
+TILES = {"192x192": TileType(tile_type_id="192x192", w_px=192, h_px=192)}
+
+
+def _screen(name: str, cols: int) -> ScreenSpec:
+    return ScreenSpec(
+        screen_name=name,
+        tile_label=name,
+        rows=4,
+        cols=cols,
+        default_tile_type_id="192x192",
+        base_color_name="Red",
+    )
+
+
+def test_thumbnail_is_rendered_at_scale_and_cached():
+    screen = _screen("RIBBON", 80)
+    opts = RenderOptions()
+    thumb = render_thumbnail(screen, TILES, opts, (320, 180))
+    assert thumb.size == (320, 16)
+    assert render_thumbnail(screen, TILES, opts, (320, 180)) is thumb
+    assert render_thumbnail(screen, TILES, RenderOptions(show_overlay=False), (320, 180)) is not thumb
+    # Tiles keep the full render's checkerboard colors.
+    small = render_thumbnail(screen, TILES, RenderOptions(show_overlay=False), (320, 180))
+    assert small.getpixel((1, 1)) == darken(PALETTE["Red"], 0.75)
+    assert small.getpixel((5, 1)) == PALETTE["Red"]
+
+
+def test_contact_sheet_grid_size():
+    catalog = ScreenCatalog([_screen(f"S{i}", 6) for i in range(5)], TILES)
+    sheet = render_contact_sheet(catalog, RenderOptions(), (160, 90), columns=3, title="Show")
+    assert sheet.width == 16 + 3 * (160 + 16)
+    assert sheet.height > 2 * (90 + 16)
@@ -0,0 +1,52 @@
+import io
+import urllib.request
+
+from PIL import Image
+
+from src.lineup.deepzoom import DeepZoomPyramid, DeepZoomServer
+
+
+def test_pyramid_levels_and_tiles():
+    img = Image.new("RGB", (1000, 300), (10, 20, 30))
+    pyramid = DeepZoomPyramid(img, tile_size=254, overlap=1)
+    assert pyramid.max_level == 10
+    assert pyramid.level_size(10) == (1000, 300)
+    assert pyramid.level_size(9) == (500, 150)
+    assert pyramid.level_size(0) == (1, 1)
+    assert pyramid.tile_grid(10) == (4, 2)
+    # Interior tiles carry the overlap on both sides; edge tiles are clipped.
+    assert pyramid.tile(10, 0, 0).size == (255, 255)
+    assert pyramid.tile(10, 1, 0).size == (256, 255)
+    assert pyramid.tile(10, 3, 1).size == (1000 - 3 * 254 + 1, 300 - 254 + 1)
+    assert pyramid.tile(8, 0, 0).size == (250, 75)
+
+
+def test_server_serves_dzi_and_tiles():
+    server = DeepZoomServer()
+    try:
+        path = server.publish("abc123", Image.new("RGB", (600, 400), (255, 0, 0)))
+        with urllib.request.urlopen(server.base_url + path) as resp:
+            assert b"canvas" in resp.read()
+        with urllib.request.urlopen(f"{server.base_url}/dz/abc123.dzi") as resp:
+            assert b'<Size Width="600" Height="400"/>' in resp.read()
+        with urllib.request.urlopen(f"{server.base_url}/dz/abc123_files/10/1_1.png") as resp:
+            tile = Image.open(io.BytesIO(resp.read()))
+        assert tile.size == (256, 400 - 254 + 1)
+        assert tile.getpixel((0, 0)) == (255, 0, 0)
+    finally:
+        server.shutdown()
+
+
+def test_server_keeps_pyramids_within_its_byte_budget():
+    img = Image.new("RGB", (100, 100))
+    server = DeepZoomServer(max_bytes=3 * DeepZoomPyramid(img).nbytes)
+    try:
+        for i in range(5):
+            server.publish(f"{i:x}", img)
+        assert [server.pyramid(f"{i:x}") is not None for i in range(5)] == [False, False, True, True, True]
+        # The newest pyramid is kept even when it alone exceeds the budget.
+        server.max_bytes = 1
+        server.publish("ff", img)
+        assert server.pyramid("ff") is not None and server.pyramid("4") is None
+    finally:
+        server.shutdown()
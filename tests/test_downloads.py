@@ -0,0 +1,39 @@
+import io
+import urllib.error
+import urllib.request
+import zipfile
+
+import pytest
+
+from src.lineup.downloads import DownloadServer
+from src.lineup.export import iter_png_zip, iter_rendered_pngs
+from src.lineup.models import ScreenSpec, TileType
+from src.lineup.renderer import RenderOptions
+
+
+def test_zip_is_streamed_in_chunks_when_the_link_is_opened():
+    tiles = {"FULL": TileType(tile_type_id="FULL", w_px=64, h_px=64)}
+    screens = [
+        ScreenSpec(screen_name="L", tile_label="IMAG_L", rows=2, cols=3, default_tile_type_id="FULL"),
+        ScreenSpec(screen_name="R", tile_label="IMAG_R", rows=2, cols=3, default_tile_type_id="FULL"),
+    ]
+    started = []
+
+    def make_chunks():
+        started.append(True)
+        return iter_png_zip(iter_rendered_pngs(screens, tiles, RenderOptions(), "v001"))
+
+    server = DownloadServer()
+    try:
+        path = server.register("RGB_OV_v001.zip", make_chunks, "application/zip")
+        assert not started
+        with urllib.request.urlopen(server.base_url + path) as resp:
+            assert resp.headers["Transfer-Encoding"] == "chunked"
+            assert "RGB_OV_v001.zip" in resp.headers["Content-Disposition"]
+            data = resp.read()
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            assert zf.namelist() == ["RGB_OV_IMAG_L_v001.png", "RGB_OV_IMAG_R_v001.png"]
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(server.base_url + "/dl/unknown/RGB_OV_v001.zip")
+    finally:
+        server.shutdown()
@@ -0,0 +1,140 @@
+import io
+import threading
+import zipfile
+
+import src.lineup.export as export
+from src.lineup.catalog import ScreenCatalog
+from src.lineup.export import (
+    export_filename,
+    export_pngs_to_dir,
+    export_variant_matrix,
+    iter_export_pngs,
+    iter_png_zip,
+    iter_rendered_pngs,
+    variant_matrix_count,
+)
+from src.lineup.models import ScreenSpec, TileType
+from src.lineup.pool import RenderPool, estimate_render_cost
+from src.lineup.profiling import SamplingProfiler
+from src.lineup.renderer import RenderOptions
+
+
+def test_png_zip_stream_roundtrip():
+    tiles = {"FULL": TileType(tile_type_id="FULL", w_px=64, h_px=64)}
+    screens = [
+        ScreenSpec(screen_name="L", tile_label="IMAG_L", rows=2, cols=3, default_tile_type_id="FULL"),
+        ScreenSpec(screen_name="R", tile_label="IMAG_R", rows=2, cols=3, default_tile_type_id="FULL"),
+    ]
+    chunks = list(iter_png_zip(iter_rendered_pngs(screens, tiles, RenderOptions(), "v001")))
+    assert len(chunks) > 2
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+        assert zf.namelist() == ["RGB_OV_IMAG_L_v001.png", "RGB_OV_IMAG_R_v001.png"]
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in zf.infolist())
+        assert zf.testzip() is None
+        assert zf.read("RGB_OV_IMAG_L_v001.png").startswith(b"\x89PNG")
+
+
+def test_export_filename_prefixes():
+    assert export_filename("SCA", "GreyscaleSteps", False, "v002") == "GREY_SCA_v002.png"
+    assert export_filename("SCA", "CircleXGrid", True, "v001") == "CircleX_OV_SCA_v001.png"
+
+
+def test_export_dedups_identical_screens(tmp_path):
+    tiles = {"FULL": TileType(tile_type_id="FULL", w_px=64, h_px=64)}
+    screens = [
+        ScreenSpec(screen_name="IMAG", tile_label="IMAG_L", rows=2, cols=3, default_tile_type_id="FULL"),
+        ScreenSpec(screen_name="IMAG", tile_label="IMAG_R", rows=2, cols=3, default_tile_type_id="FULL"),
+        ScreenSpec(screen_name="SIDE", tile_label="SIDE", rows=2, cols=3, default_tile_type_id="FULL"),
+    ]
+    opts = RenderOptions(lineup_type="GreyscaleSteps")
+    exported = list(iter_export_pngs(screens, tiles, opts, "v001"))
+    assert [e.duplicate_of for e in exported] == [None, "GREY_OV_IMAG_L_v001.png", None]
+    assert exported[0].data == exported[1].data != exported[2].data
+
+    opts = RenderOptions(lineup_type="GreyscaleSteps", show_overlay=False)
+    count = export_pngs_to_dir(screens, tiles, opts, tmp_path, "v001", hardlink_identical=True)
+    assert count == 3
+    assert (tmp_path / "GREY_IMAG_R_v001.png").samefile(tmp_path / "GREY_IMAG_L_v001.png")
+    assert (tmp_path / "GREY_SIDE_v001.png").samefile(tmp_path / "GREY_IMAG_L_v001.png")
+
+
+def test_pipelined_export_matches_sequential_encode(tmp_path):
+    tiles = {"32x32": TileType("32x32", 32, 32)}
+    screens = [
+        ScreenSpec(f"S{i}", f"L{i}", rows=2 + i % 3, cols=3, default_tile_type_id="32x32", base_color_name="Teal")
+        for i in range(8)
+    ]
+    opts = RenderOptions(lineup_type="RGB")
+    expected = dict(iter_rendered_pngs(screens, tiles, opts, "v001"))
+
+    done = []
+    # A budget smaller than one frame forces frames through one at a time.
+    count = export_pngs_to_dir(
+        screens, tiles, opts, tmp_path, "v001", progress=done.append, max_inflight_pixels=1, encode_workers=3
+    )
+    assert count == 8
+    assert done == list(range(1, 9))
+    assert {p.name: p.read_bytes() for p in tmp_path.iterdir()} == expected
+
+
+def test_exports_take_frames_from_the_render_pool_budget(tmp_path, monkeypatch):
+    tiles = {"32x32": TileType("32x32", 32, 32)}
+    screens = [ScreenSpec(f"S{i}", f"L{i}", rows=2, cols=3, default_tile_type_id="32x32") for i in range(4)]
+    opts = RenderOptions()
+    expected = dict(iter_rendered_pngs(screens, tiles, opts, "v001"))
+    pool = RenderPool(max_workers=1, max_pixels=96 * 64)
+    render_base_layer = export.render_base_layer
+
+    def reserved_base_layer(*args):
+        # The base layer is admitted before it is allocated, not just its composites.
+        assert pool.inflight_bytes == estimate_render_cost(screens[0], tiles, opts)[1]
+        return render_base_layer(*args)
+
+    monkeypatch.setattr(export, "render_base_layer", reserved_base_layer)
+    try:
+        # Another session's lease holds the whole budget; the export waits for it.
+        blocker = pool.reserve(96 * 64)
+        threading.Timer(0.3, blocker.release).start()
+        assert export_pngs_to_dir(screens, tiles, opts, tmp_path, "v001", render_pool=pool) == 4
+        assert {p.name: p.read_bytes() for p in tmp_path.iterdir()} == expected
+        assert dict(iter_rendered_pngs(screens, tiles, opts, "v001", render_pool=pool)) == expected
+        assert pool.inflight_bytes == 0
+    finally:
+        pool.shutdown()
+
+
+def test_variant_matrix_exports_every_eligible_variant(tmp_path):
+    tiles = {"32x32": TileType("32x32", 32, 32)}
+    screens = [
+        ScreenSpec("IMAG", "IMAG_L", rows=2, cols=3, default_tile_type_id="32x32", expected_w_px=96, expected_h_px=64),
+        ScreenSpec("SIDE", "SIDE", rows=1, cols=1, default_tile_type_id="none", expected_w_px=120, expected_h_px=80),
+    ]
+    catalog = ScreenCatalog(screens, tiles)
+    assert variant_matrix_count(catalog) == (1 + 2 + 2) * 2
+
+    count = export_variant_matrix(catalog, RenderOptions(), tmp_path, "v002", encode_workers=2)
+    assert count == 10
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        export_filename(label, lineup_type, overlay, "v002")
+        for lineup_type, labels in (("RGB", ["IMAG_L"]), ("GreyscaleSteps", ["IMAG_L", "SIDE"]), ("CircleXGrid", ["IMAG_L", "SIDE"]))
+        for label in labels
+        for overlay in (True, False)
+    )
+    single = RenderOptions(lineup_type="CircleXGrid", show_overlay=False)
+    assert (tmp_path / "CircleX_SIDE_v002.png").read_bytes() == dict(
+        iter_rendered_pngs([screens[1]], tiles, single, "v002")
+    )["CircleX_SIDE_v002.png"]
+
+    # Profiling runs the same single pipeline and labels its samples by lineup type.
+    profiled_dir = tmp_path / "profiled"
+    profiled_dir.mkdir()
+    profiler = SamplingProfiler(interval_s=0.001)
+    with profiler:
+        assert export_variant_matrix(catalog, RenderOptions(), profiled_dir, "v002", profiler=profiler) == 10
+    assert {p.name: p.read_bytes() for p in profiled_dir.iterdir()} == {
+        p.name: p.read_bytes() for p in tmp_path.iterdir() if p.is_file()
+    }
+    assert set(profiler.sections) <= {"RGB", "GreyscaleSteps", "CircleXGrid", "(other)"}
+    # Only the calling thread stays registered once the pipeline's threads are gone.
+    assert profiler._threads == {threading.get_ident()}
@@ -0,0 +1,40 @@
+from src.lineup.frames import frame_layout, render_lineup_into, write_raw_frame
+from src.lineup.models import ScreenSpec, TileType
+from src.lineup.renderer import RenderOptions, render_lineup_png
+
+TILES = {"96x48": TileType(tile_type_id="96x48", w_px=96, h_px=48)}
+SCREEN = ScreenSpec(
+    screen_name="SCA",
+    tile_label="SCA",
+    rows=3,
+    cols=4,
+    default_tile_type_id="96x48",
+    base_color_name="Red",
+)
+
+
+def test_render_into_strided_buffer_matches_png():
+    opts = RenderOptions()
+    img = render_lineup_png(SCREEN, TILES, opts)
+    layout = frame_layout(SCREEN, TILES, opts, "BGRX", stride=4 * 384 + 64)
+    assert (layout.width, layout.height) == img.size
+    buf = bytearray(b"\xAA" * (16 + layout.nbytes))
+    render_lineup_into(buf, SCREEN, TILES, opts, "BGRX", stride=layout.stride, offset=16)
+
+    assert buf[:16] == b"\xAA" * 16
+    expected = img.tobytes("raw", "BGRX")
+    for y in (0, 70, layout.height - 1):
+        row = buf[16 + y * layout.stride:16 + y * layout.stride + layout.row_bytes]
+        assert row == expected[y * layout.row_bytes:(y + 1) * layout.row_bytes]
+    # Row padding is left alone.
+    assert buf[16 + layout.row_bytes:16 + layout.stride] == b"\xAA" * 64
+
+
+def test_write_raw_frame_maps_file_in_place(tmp_path):
+    opts = RenderOptions()
+    path = tmp_path / "SCA.rgb"
+    layout = write_raw_frame(path, SCREEN, TILES, opts)
+    assert path.read_bytes() == render_lineup_png(SCREEN, TILES, opts).tobytes()
+    inode = path.stat().st_ino
+    write_raw_frame(path, SCREEN, TILES, RenderOptions(show_overlay=False))
+    assert path.stat().st_ino == inode and path.stat().st_size == layout.nbytes
@@ -0,0 +1,77 @@
+import io
+import time
+
+import pytest
+
+import src.lineup.io_google as io_google
+from src.lineup.io_google import (
+    _scan_sheet_names,
+    clear_sheet_names_cache,
+    fetch_google_sheet_csv,
+    fetch_google_sheet_names,
+)
+from src.lineup.loadtest import FakeSheetsServer
+
+
+def test_scan_stops_at_end_of_tab_list():
+    head = (
+        b'<html><script>{"sheets":[{"sheetId":0,"name":"Screen \\u00e9","grid":{"rows":[1,2]}},'
+        + b'{"sheetId":7,"name":"Odd \\"]} name"}'
+    )
+    # Far-apart entries in one list are all read; the scan stops where the list closes.
+    page = io.BytesIO(head + b"," + b" " * (1024 * 1024) + b'{"sheetId":8,"name":"Late"}],"other":[]}'
+                      + b"x" * (8 * 1024 * 1024) + b'{"sheetId":9,"name":"Never read"}')
+    names = _scan_sheet_names(page, time.monotonic() + 5)
+    assert names == ["Screen \u00e9", 'Odd "]} name', "Late"]
+    assert page.tell() < 2 * 1024 * 1024
+
+
+def test_scan_ignores_a_closed_array_before_the_first_name():
+    # The nearest "[" before the first name opens [1,2], not the tab list.
+    page = io.BytesIO(b'[{"props":[1,2],"sheetId":0,"name":"Alpha"},{"sheetId":1,"name":"Beta"}]')
+    assert _scan_sheet_names(page, time.monotonic() + 5) == ["Alpha", "Beta"]
+
+
+def test_scan_times_out_instead_of_returning_partial_names():
+    page = io.BytesIO(b'{"sheets":[{"sheetId":0,"name":"A"},' + b" " * (1024 * 1024))
+    with pytest.raises(TimeoutError):
+        _scan_sheet_names(page, time.monotonic() - 1)
+
+
+def test_sheet_names_are_cached_per_spreadsheet():
+    clear_sheet_names_cache()
+    with FakeSheetsServer({"A": "x\n", "B": "y\n"}, edit_page_bytes=2 * 1024 * 1024) as server:
+        assert fetch_google_sheet_names(server.sheet_url, origin=server.base_url) == ["A", "B"]
+        assert fetch_google_sheet_names(server.sheet_url, origin=server.base_url) == ["A", "B"]
+        assert server.requests == 1
+        assert fetch_google_sheet_names(server.sheet_url, ttl_s=0, origin=server.base_url) == ["A", "B"]
+        assert server.requests == 2
+    clear_sheet_names_cache()
+
+
+def test_timed_out_lookup_is_not_cached():
+    clear_sheet_names_cache()
+    with FakeSheetsServer({"A": "x\n", "B": "y\n"}) as server:
+        server.latency_s = 0.3
+        with pytest.raises(TimeoutError):
+            fetch_google_sheet_names(server.sheet_url, timeout=0.1, origin=server.base_url)
+        server.latency_s = 0
+        assert fetch_google_sheet_names(server.sheet_url, origin=server.base_url) == ["A", "B"]
+        assert server.requests == 2
+    clear_sheet_names_cache()
+
+
+def test_sheet_url_host_never_chooses_where_requests_go(monkeypatch):
+    fetched = []
+
+    def fake_urlopen(url, timeout):
+        fetched.append(url)
+        return io.BytesIO(b"a,b\n")
+
+    monkeypatch.setattr(io_google, "urlopen", fake_urlopen)
+    fetch_google_sheet_csv("http://127.0.0.1:9/spreadsheets/d/abc/edit")
+    fetch_google_sheet_csv("http://169.254.169.254/spreadsheets/d/abc/edit", sheet_name="Tab")
+    assert fetched == [
+        "https://docs.google.com/spreadsheets/d/abc/export?format=csv",
+        "https://docs.google.com/spreadsheets/d/abc/gviz/tq?tqx=out:csv&sheet=Tab",
+    ]
@@ -0,0 +1,43 @@
+from src.lineup.catalog import ScreenCatalog
+from src.lineup.io_google import fetch_google_sheet_csv, fetch_google_sheet_names, load_screens_from_google_csv
+from src.lineup.loadtest import FakeSheetsServer, generate_screen_notes_csv, run_load_test, run_memory_benchmark
+
+
+def test_generated_sheet_parses_with_expected_shape():
+    text = generate_screen_notes_csv(40, half_row_ratio=0.5, playback_ratio=0.2, seed=3)
+    assert text == generate_screen_notes_csv(40, half_row_ratio=0.5, playback_ratio=0.2, seed=3)
+    tiles, screens = load_screens_from_google_csv(text)
+    generated = [s for s in screens if s.tile_label.startswith("SC")]
+    assert len(generated) == 40
+    half = [s for s in generated if s.secondary_rows]
+    playback = [s for s in generated if s.default_tile_type_id == "CircleXGrid"]
+    assert half and playback and len(half) + len(playback) < 40
+    catalog = ScreenCatalog(screens, tiles)
+    # Filled-in PIXELS W/H always agree with the tile layout.
+    for entry in catalog.eligible("RGB"):
+        assert not entry.warnings["RGB"], entry.warnings["RGB"]
+
+
+def test_fake_server_serves_export_gviz_and_sheet_names():
+    text = generate_screen_notes_csv(5, seed=1)
+    with FakeSheetsServer({"Screen_Notes": text, "LineupColors": "Name,Hex\nA,#FF0000\n"}, edit_page_bytes=4096) as server:
+        url, origin = server.sheet_url, server.base_url
+        assert fetch_google_sheet_names(url, origin=origin) == ["Screen_Notes", "LineupColors"]
+        assert fetch_google_sheet_csv(url, origin=origin) == text
+        gviz = fetch_google_sheet_csv(url, sheet_name="LineupColors", origin=origin)
+        assert gviz == '"Name","Hex"\n"A","#FF0000"\n'
+        assert load_screens_from_google_csv(fetch_google_sheet_csv(url, "Screen_Notes", origin=origin))[1]
+
+
+def test_run_load_test_reports_every_stage():
+    report = run_load_test(3, size_mix={"small": 1.0}, fetch_rounds=1, lineup_types=("RGB",))
+    assert [s.name for s in report.stages] == ["fetch", "parse", "render", "export"]
+    assert report.stage("render").items == report.stage("export").items > 0
+
+
+def test_memory_benchmark_counts_shared_strings():
+    report = run_memory_benchmark(200, seed=2)
+    assert report.screens == 201 and report.retained_bytes > 0 and report.snapshot_bytes > 0
+    # Tile ids and color names are shared, so far fewer objects than references.
+    assert report.distinct_strings < report.string_refs * 0.7
+    assert "B/screen" in report.format()
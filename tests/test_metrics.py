@@ -0,0 +1,24 @@
+from src.lineup.metrics import MetricsRegistry
+
+
+def test_metrics_histogram_and_prometheus_text():
+    registry = MetricsRegistry()
+    registry.observe("render", 0.02)
+    registry.observe("render", 3.0)
+    with registry.timed("encode"):
+        pass
+    registry.inc("pngs_exported", 2)
+    registry.register_gauge("layer_cache_hits", lambda: 5)
+
+    snap = registry.snapshot()
+    assert snap["latency"]["render"]["count"] == 2
+    assert snap["latency"]["render"]["max_s"] == 3.0
+    assert snap["latency"]["encode"]["count"] == 1
+    assert snap["gauges"]["layer_cache_hits"] == 5
+
+    text = registry.to_prometheus()
+    assert "lineup_pngs_exported_total 2" in text
+    assert 'lineup_render_seconds_bucket{le="0.025"} 1' in text
+    assert 'lineup_render_seconds_bucket{le="+Inf"} 2' in text
+    assert "lineup_render_seconds_count 2" in text
+    assert "lineup_layer_cache_hits 5" in text
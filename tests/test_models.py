@@ -0,0 +1,27 @@
+import pickle
+from dataclasses import replace
+
+from src.lineup.io_google import load_screens_from_google_csv
+from src.lineup.loadtest import generate_screen_notes_csv
+from src.lineup.models import ScreenSpec, intern_tile_type
+
+
+def test_specs_are_slotted_and_hash_like_their_values():
+    a = ScreenSpec("LED " + "A", "A", 2, 3, "128x128", base_color_name="Re" + "d")
+    b = ScreenSpec("LED A", "A", 2, 3, "128x128", base_color_name="Red")
+    assert not hasattr(a, "__dict__")
+    assert a == b and hash(a) == hash(b) and {a: 1}[b] == 1
+    assert a.screen_name is b.screen_name and a.base_color_name is b.base_color_name
+    assert "_hash" not in repr(a)
+    moved = replace(a, rows=4)
+    assert moved != a and hash(moved) == hash(ScreenSpec("LED A", "A", 4, 3, "128x128", base_color_name="Red"))
+    assert pickle.loads(pickle.dumps(a)) == a
+
+
+def test_loads_share_tile_types():
+    text = generate_screen_notes_csv(20, half_row_ratio=0.5, seed=4)
+    first, _ = load_screens_from_google_csv(text)
+    second, _ = load_screens_from_google_csv(text)
+    assert first and all(first[key] is second[key] for key in first)
+    tile = next(iter(first.values()))
+    assert intern_tile_type(tile.tile_type_id, tile.w_px, tile.h_px) is tile
@@ -0,0 +1,28 @@
+from src.lineup.models import ScreenSpec, TileType
+from src.lineup.plan import RenderPlan, TextRun, diff_plans
+from src.lineup.renderer import PillowBackend, RenderOptions, compile_render_plan, plan_images, render_lineup_png
+
+TILES = {"64x64": TileType("64x64", 64, 64)}
+SCREEN = ScreenSpec("IMAG", "IMAG_L", rows=2, cols=3, default_tile_type_id="64x64", base_color_name="Teal")
+
+
+def test_plan_roundtrip_executes_like_render_lineup_png():
+    opts = RenderOptions(lineup_type="RGB", use_layer_cache=False)
+    plan = compile_render_plan(SCREEN, TILES, opts)
+    assert (plan.width, plan.height) == (192, 128)
+
+    restored = RenderPlan.from_json(plan.to_json())
+    assert restored == plan
+    assert restored.digest() == plan.digest()
+
+    img = PillowBackend(plan_images(opts), use_cache=False).execute(restored)
+    assert img.tobytes() == render_lineup_png(SCREEN, TILES, opts).tobytes()
+
+
+def test_plan_diff_only_reports_overlay_changes():
+    opts = RenderOptions(lineup_type="RGB")
+    renamed = ScreenSpec("SIDE", "IMAG_L", rows=2, cols=3, default_tile_type_id="64x64", base_color_name="Teal")
+    diff = diff_plans(compile_render_plan(SCREEN, TILES, opts), compile_render_plan(renamed, TILES, opts))
+    assert not diff.size_changed
+    assert [op.text for op in diff.removed if isinstance(op, TextRun)] == ["IMAG"]
+    assert [op.text for op in diff.added if isinstance(op, TextRun)] == ["SIDE"]
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from src.lineup.models import ScreenSpec, TileType
+from src.lineup.pool import RenderPool, RenderRejected, estimate_render_cost
+from src.lineup.renderer import RenderOptions
+
+TILES = {"100x100": TileType(tile_type_id="100x100", w_px=100, h_px=100)}
+
+
+def _screen(cols: int) -> ScreenSpec:
+    return ScreenSpec(
+        screen_name=f"S{cols}",
+        tile_label=f"S{cols}",
+        rows=2,
+        cols=cols,
+        default_tile_type_id="100x100",
+        base_color_name="Red",
+    )
+
+
+def test_pool_queues_over_budget_and_rejects_oversized():
+    opts = RenderOptions()
+    assert estimate_render_cost(_screen(3), TILES, opts) == (60_000, 480_000)
+    # Bands rendered ahead on several threads are charged on top of the canvas.
+    huge = ScreenSpec("H", "H", rows=100, cols=200, default_tile_type_id="100x100")
+    assert estimate_render_cost(huge, TILES, RenderOptions(render_workers=4))[1] == 200_000_000 * 12
+    pool = RenderPool(max_workers=2, max_pixels=100_000)
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_render(screen, tiles, o):
+        started.set()
+        release.wait(5)
+        return screen.screen_name
+
+    try:
+        with pytest.raises(RenderRejected):
+            pool.submit(_screen(6), TILES, opts)
+        first = pool.submit(_screen(3), TILES, opts, render=slow_render)
+        assert started.wait(5)
+        # A free worker is idle, but the second render does not fit the pixel budget.
+        second = pool.submit(_screen(3), TILES, opts, render=lambda s, t, o: s.screen_name)
+        third = pool.submit(_screen(1), TILES, opts, render=lambda s, t, o: "small")
+        assert (first.position, second.position, third.position) == (0, 1, 2)
+        assert third.cancel() and third.future.cancelled()
+        release.set()
+        assert first.result(5) == "S3" and second.result(5) == "S3"
+        assert pool.render(_screen(2), TILES, opts).size == (200, 200)
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_leases_share_the_budget_in_queue_order():
+    pool = RenderPool(max_workers=1, max_pixels=100_000)
+    try:
+        lease = pool.reserve(80_000)
+        assert pool.inflight_bytes == 640_000
+        # A render that does not fit waits behind the lease, and a later lease behind it.
+        ticket = pool.submit(_screen(3), TILES, RenderOptions(), render=lambda s, t, o: "ran")
+        cancelled = threading.Event()
+        cancelled.set()
+        with pytest.raises(RenderRejected):
+            pool.reserve(10_000, cancelled=cancelled)
+        assert ticket.position == 1 and not ticket.done()
+        lease.release()
+        lease.release()
+        assert ticket.result(5) == "ran"
+        # Oversized work is trimmed to the budget and runs alone.
+        with pool.reserve(10**9) as big:
+            assert big.pixels == 100_000
+        assert pool.run(lambda: "done", 50_000) == "done"
+        assert pool.inflight_bytes == 0
+    finally:
+        pool.shutdown()
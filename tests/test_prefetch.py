@@ -0,0 +1,91 @@
+import gc
+import threading
+import time
+import weakref
+
+from src.lineup.cache import LRUCache
+from src.lineup.models import ScreenSpec, TileType
+from src.lineup.pool import RenderPool
+from src.lineup.prefetch import Prefetcher, neighbor_order
+from src.lineup.renderer import RenderOptions
+
+TILES = {"100x100": TileType(tile_type_id="100x100", w_px=100, h_px=100)}
+
+
+def _screen(i: int) -> ScreenSpec:
+    return ScreenSpec(
+        screen_name=f"S{i}",
+        tile_label=f"S{i}",
+        rows=1,
+        cols=i + 1,
+        default_tile_type_id="100x100",
+        base_color_name="Red",
+    )
+
+
+def test_neighbor_order_starts_next_to_the_selection():
+    assert neighbor_order(6, 2) == [3, 1, 4, 0, 5]
+    assert neighbor_order(3, 0) == [1, 2]
+    assert neighbor_order(1, 0) == []
+
+
+def test_interactive_renders_jump_ahead_of_prefetch():
+    pool = RenderPool(max_workers=2, max_background=1)
+    prefetcher = Prefetcher(pool=pool, cache=LRUCache(64 * 1024 * 1024))
+    order = []
+    first, second = threading.Event(), threading.Event()
+    opts = RenderOptions()
+
+    try:
+        # Occupy both workers, then queue background work ahead of an interactive render.
+        busy = [
+            pool.submit(_screen(9), TILES, opts, render=lambda s, t, o, gate=gate: gate.wait(5))
+            for gate in (first, second)
+        ]
+        background = pool.submit(
+            _screen(8), TILES, opts, render=lambda s, t, o: order.append("prefetch"), background=True
+        )
+        interactive = pool.submit(_screen(7), TILES, opts, render=lambda s, t, o: order.append("interactive"))
+        first.set()
+        interactive.result(5)
+        background.result(5)
+        assert order == ["interactive", "prefetch"]
+        second.set()
+        assert all(b.result(5) for b in busy)
+
+        screens = [_screen(i) for i in range(5)]
+        assert prefetcher.schedule(screens, TILES, opts, current=2) == 4
+        deadline = threading.Event()
+        for _ in range(100):
+            if prefetcher.rendered == 4:
+                break
+            deadline.wait(0.05)
+        assert prefetcher.rendered == 4
+        assert prefetcher.get(screens[2], TILES, opts) is None
+        assert prefetcher.get(screens[0], TILES, opts).size == (100, 100)
+        # Only the screen that was selected (and never prefetched) is left.
+        assert prefetcher.schedule(screens, TILES, opts, current=3) == 1
+    finally:
+        first.set(), second.set()
+        prefetcher.close()
+        pool.shutdown()
+
+
+def test_dropped_prefetcher_stops_its_thread():
+    def threads() -> int:
+        return sum(t.name == "lineup-prefetch" for t in threading.enumerate())
+
+    pool = RenderPool(max_workers=2)
+    try:
+        before = threads()
+        prefetcher = Prefetcher(pool=pool, cache=LRUCache(64 * 1024 * 1024))
+        prefetcher.schedule([_screen(i) for i in range(3)], TILES, RenderOptions())
+        ref = weakref.ref(prefetcher)
+        del prefetcher
+        deadline = time.monotonic() + 5
+        while (ref() is not None or threads() > before) and time.monotonic() < deadline:
+            gc.collect()
+            time.sleep(0.01)
+        assert ref() is None and threads() == before
+    finally:
+        pool.shutdown()
@@ -0,0 +1,64 @@
+import gc
+import threading
+import time
+import weakref
+
+from src.lineup.models import ScreenSpec, TileType
+from src.lineup.pool import RenderPool
+from src.lineup.preview import PreviewRenderer
+from src.lineup.renderer import RenderOptions
+
+TILES = {"216x216": TileType(tile_type_id="216x216", w_px=216, h_px=216)}
+
+
+def _screen(cols: int) -> ScreenSpec:
+    return ScreenSpec(
+        screen_name="MANUAL",
+        tile_label="MAN",
+        rows=2,
+        cols=cols,
+        default_tile_type_id="216x216",
+        base_color_name="Blue",
+    )
+
+
+def test_only_the_latest_spec_is_rendered():
+    pool = RenderPool(max_workers=1)
+    preview = PreviewRenderer(debounce_s=0.2, pool=pool)
+    rendered = []
+    original = preview._render
+    preview._render = lambda key, s, t, o: rendered.append(s.cols) or original(key, s, t, o)
+    try:
+        opts = RenderOptions()
+        # Typing "216" submits 2, 21 and 216 in quick succession.
+        keys = [preview.submit(_screen(cols), TILES, opts) for cols in (2, 21, 216)]
+        assert preview.wait(keys[0], 0.5) is None
+        img = preview.wait(keys[-1], 10)
+        assert img is not None and img.size == (216 * 216, 432)
+        assert rendered == [216]
+        assert preview.wait(preview.submit(_screen(216), TILES, opts), 0.01) is img
+    finally:
+        preview.close()
+        pool.shutdown()
+
+
+def _preview_threads() -> int:
+    return sum(t.name == "lineup-preview" for t in threading.enumerate())
+
+
+def test_dropped_renderer_stops_its_thread():
+    pool = RenderPool(max_workers=1)
+    try:
+        before = _preview_threads()
+        preview = PreviewRenderer(debounce_s=0.01, pool=pool)
+        assert preview.wait(preview.submit(_screen(2), TILES, RenderOptions()), 10) is not None
+        assert _preview_threads() == before + 1
+        ref = weakref.ref(preview)
+        del preview
+        deadline = time.monotonic() + 5
+        while (ref() is not None or _preview_threads() > before) and time.monotonic() < deadline:
+            gc.collect()
+            time.sleep(0.01)
+        assert ref() is None and _preview_threads() == before
+    finally:
+        pool.shutdown()
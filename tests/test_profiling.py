@@ -0,0 +1,61 @@
+import json
+import threading
+import time
+
+from src.lineup.profiling import SamplingProfiler
+
+
+def _spin(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _job_thread(profiler: SamplingProfiler, label: str, seconds: float) -> None:
+    profiler.track_thread()
+    with profiler.section(label):
+        _spin(seconds)
+
+
+def _other_session(stop: threading.Event) -> None:
+    while not stop.is_set():
+        pass
+
+
+def test_profiler_attributes_busy_threads_to_sections(tmp_path):
+    profiler = SamplingProfiler(interval_s=0.002)
+    stop = threading.Event()
+    # Another session's work in the same process is never sampled.
+    other = threading.Thread(target=_other_session, args=(stop,))
+    other.start()
+    try:
+        with profiler:
+            with profiler.section("RGB"):
+                worker = threading.Thread(target=_job_thread, args=(profiler, "RGB", 0.15))
+                worker.start()
+                worker.join()
+            with profiler.section("CircleXGrid"):
+                _spin(0.1)
+    finally:
+        stop.set()
+        other.join()
+    assert profiler.sections == ["RGB", "CircleXGrid"]
+    top = profiler.hotspots("RGB", top=1)[0]
+    assert top.function == "_spin" and top.self_share > 0.5
+    # The main thread parked in join() is idle, not a hotspot.
+    assert all(spot.function != "Thread.join" for spot in profiler.hotspots("RGB"))
+    assert all(spot.function != "_other_session" for label in profiler.sections for spot in profiler.hotspots(label))
+
+    summary = profiler.write(tmp_path / "export.json", top=3)
+    doc = json.loads((tmp_path / "export.json").read_text())
+    assert [p["name"] for p in doc["profiles"]] == ["RGB", "CircleXGrid"]
+    frames = doc["shared"]["frames"]
+    for profile in doc["profiles"]:
+        assert profile["type"] == "sampled" and len(profile["samples"]) == len(profile["weights"])
+        assert all(0 <= i < len(frames) for sample in profile["samples"] for i in sample)
+    assert "[CircleXGrid]" in summary.read_text()
+
+    profiler.write(tmp_path / "export.folded")
+    line = (tmp_path / "export.folded").read_text().splitlines()[0]
+    stack, weight = line.rsplit(" ", 1)
+    assert stack.split(";")[0] in {"RGB", "CircleXGrid"} and int(weight) > 0
@@ -1,5 +1,13 @@
 from src.lineup.models import ScreenSpec, TileType
-from src.lineup.renderer import RenderOptions, render_lineup_png
+from src.lineup.renderer import (
+    RenderOptions,
+    clear_layer_cache,
+    compute_output_slices,
+    iter_lineup_regions,
+    render_lineup_png,
+    render_lineup_region,
+    render_spec_key,
+)
 
 def test_smoke_render():
     tiles = {
@@ -22,3 +30,130 @@ def test_smoke_render():
     img = render_lineup_png(screen, tiles, RenderOptions())
     assert img.width == 13 * 216
     assert img.height == (5 * 216) + (1 * 108)
+
+def test_layer_cache_matches_uncached_render():
+    tiles = {"FULL": TileType(tile_type_id="FULL", w_px=96, h_px=96)}
+    screen = ScreenSpec(
+        screen_name="IMAG L",
+        tile_label="IMAG",
+        rows=3,
+        cols=4,
+        default_tile_type_id="FULL",
+        base_color_name="Teal",
+    )
+    clear_layer_cache()
+    for show_overlay in (True, False, True):
+        cached = render_lineup_png(screen, tiles, RenderOptions(show_overlay=show_overlay))
+        uncached = render_lineup_png(
+            screen, tiles, RenderOptions(show_overlay=show_overlay, use_layer_cache=False)
+        )
+        assert cached.tobytes() == uncached.tobytes()
+
+def test_output_slices_match_full_render():
+    tiles = {
+        "FULL": TileType(tile_type_id="FULL", w_px=80, h_px=60),
+        "HALF": TileType(tile_type_id="HALF", w_px=80, h_px=30),
+    }
+    screen = ScreenSpec(
+        screen_name="WALL",
+        tile_label="WALL",
+        rows=5,
+        cols=9,
+        default_tile_type_id="FULL",
+        secondary_tile_type_id="HALF",
+        secondary_placement="top",
+        secondary_rows=1,
+        expected_w_px=720,
+        expected_h_px=270,
+    )
+    for lineup_type in ("RGB", "GreyscaleSteps", "CircleXGrid"):
+        opts = RenderOptions(lineup_type=lineup_type)
+        full = render_lineup_png(screen, tiles, opts)
+        slices = list(iter_lineup_regions(screen, tiles, opts, max_w=250, max_h=100))
+        assert [rect for rect, _ in slices] == compute_output_slices(720, 270, 250, 100)
+        for rect, img in slices:
+            assert img.tobytes() == full.crop(rect).tobytes()
+
+
+def test_portrait_circlex_regions_match_crops():
+    tiles = {"FULL": TileType(tile_type_id="FULL", w_px=216, h_px=216)}
+    for (w, h), region in (((216, 864), (61, 320, 188, 811)), ((216, 1296), (97, 47, 113, 723))):
+        screen = ScreenSpec(
+            screen_name="PORTRAIT",
+            tile_label="PORT",
+            rows=1,
+            cols=1,
+            default_tile_type_id="FULL",
+            expected_w_px=w,
+            expected_h_px=h,
+        )
+        opts = RenderOptions(lineup_type="CircleXGrid")
+        full = render_lineup_png(screen, tiles, opts)
+        assert render_lineup_region(screen, tiles, opts, region).tobytes() == full.crop(region).tobytes()
+
+
+def test_banded_render_is_pixel_identical(monkeypatch):
+    import src.lineup.renderer as renderer
+
+    # Band even this small canvas, so full renders go through the worker processes too.
+    monkeypatch.setattr(renderer, "BANDED_MIN_PIXELS", 0)
+
+    tiles = {
+        "FULL": TileType(tile_type_id="FULL", w_px=120, h_px=120),
+        "HALF": TileType(tile_type_id="HALF", w_px=120, h_px=60),
+    }
+    screen = ScreenSpec(
+        screen_name="RIBBON",
+        tile_label="RIB",
+        rows=7,
+        cols=9,
+        default_tile_type_id="FULL",
+        secondary_tile_type_id="HALF",
+        secondary_placement="top",
+        secondary_rows=1,
+        base_color_name="Teal",
+        expected_w_px=1080,
+        expected_h_px=780,
+    )
+    for lineup_type in ("RGB", "GreyscaleSteps", "CircleXGrid"):
+        clear_layer_cache()
+        expected = render_lineup_png(screen, tiles, RenderOptions(lineup_type=lineup_type)).tobytes()
+        clear_layer_cache()
+        opts = RenderOptions(lineup_type=lineup_type, render_workers=3)
+        bands = renderer.lineup_bands(screen, tiles, opts, 6)
+        assert len(bands) > 1
+        if lineup_type == "RGB":
+            # Cuts land on tile-row edges: the half row first, then full rows.
+            assert all((top - 60) % 120 == 0 for _, top, _, _ in bands[1:])
+        if lineup_type == "CircleXGrid":
+            # Grid lines are centred: 780 px leaves 80, so they sit at -40 + k * 100.
+            assert all((top + 40) % 100 == 0 for _, top, _, _ in bands[1:])
+        stitched = b"".join(band.tobytes() for _, band in renderer.iter_lineup_bands(screen, tiles, opts))
+        assert stitched == expected
+        assert render_lineup_png(screen, tiles, opts).tobytes() == expected
+
+
+def test_branding_is_hashed_once_per_image():
+    import gc
+
+    from PIL import Image
+
+    import src.lineup.renderer as renderer
+
+    tiles = {"FULL": TileType(tile_type_id="FULL", w_px=64, h_px=64)}
+    screen = ScreenSpec(screen_name="S", tile_label="S", rows=2, cols=3, default_tile_type_id="FULL")
+    branding = Image.new("RGBA", (40, 20), (255, 0, 0, 128))
+    calls = []
+    tobytes = branding.tobytes
+    branding.tobytes = lambda *a: calls.append(1) or tobytes(*a)
+    opts = RenderOptions(branding_image=branding, use_layer_cache=False)
+    key = render_spec_key(screen, tiles, opts)
+    render_lineup_png(screen, tiles, opts)
+    assert render_spec_key(screen, tiles, opts) == key
+    assert len(calls) == 1
+    other = RenderOptions(branding_image=Image.new("RGBA", (40, 20), (0, 0, 255, 128)))
+    assert render_spec_key(screen, tiles, other) != key
+    ref = renderer._image_digests[id(other.branding_image)][0]
+    del other
+    gc.collect()
+    assert all(entry[0] is not ref for entry in renderer._image_digests.values())
@@ -0,0 +1,89 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src.lineup.service import CanvasTooLarge, RenderService, make_server, parse_render_request
+
+REQUEST = {
+    "screen": {
+        "screen_name": "IMAG",
+        "tile_label": "IMAG_L",
+        "rows": 2,
+        "cols": 3,
+        "default_tile_type_id": "64x64",
+        "base_color_name": "Teal",
+    },
+    "tiles": {"64x64": {"w_px": 64, "h_px": 64}},
+    "options": {"lineup_type": "RGB", "show_overlay": False},
+}
+
+
+def test_render_service_http_etag_roundtrip():
+    service = RenderService(max_workers=1)
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/render"
+        body = json.dumps(REQUEST).encode("utf-8")
+        with urllib.request.urlopen(urllib.request.Request(url, data=body)) as resp:
+            etag = resp.headers["ETag"]
+            assert resp.headers["Content-Type"] == "image/png"
+            assert resp.read().startswith(b"\x89PNG")
+
+        req = urllib.request.Request(url, data=body, headers={"If-None-Match": etag})
+        with pytest.raises(urllib.error.HTTPError) as exc_info:
+            urllib.request.urlopen(req)
+        assert exc_info.value.code == 304
+        assert service.renders == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.shutdown()
+
+
+def test_parse_render_request_rejects_bad_fields():
+    with pytest.raises(ValueError):
+        parse_render_request({"screen": {**REQUEST["screen"], "rows": "two"}})
+    with pytest.raises(ValueError):
+        parse_render_request({**REQUEST, "options": {"font_name": "/etc/passwd"}})
+
+
+def test_oversized_or_unrenderable_requests_are_rejected_up_front():
+    huge = {**REQUEST, "screen": {**REQUEST["screen"], "rows": 100_000, "cols": 100_000}}
+    with pytest.raises(CanvasTooLarge):
+        parse_render_request(huge)
+    with pytest.raises(ValueError, match="GreyscaleSteps requires tile specs"):
+        parse_render_request({**REQUEST, "tiles": {}, "options": {"lineup_type": "GreyscaleSteps"}})
+
+    service = RenderService(max_workers=1, max_pixels=10_000)
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/render"
+        with pytest.raises(urllib.error.HTTPError) as exc_info:
+            urllib.request.urlopen(urllib.request.Request(url, data=json.dumps(REQUEST).encode("utf-8")))
+        assert exc_info.value.code == 413
+        assert service.renders == 0
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.shutdown()
+
+
+def test_unknown_lineup_type_cannot_slip_past_the_pixel_cap():
+    # A 1x1 expected size used to size the cap for any type but "RGB", while the
+    # renderer drew the full 200x400 wall of 500 px tiles (20 GP).
+    request = {
+        "screen": {**REQUEST["screen"], "rows": 200, "cols": 400, "expected_w_px": 1, "expected_h_px": 1},
+        "tiles": {REQUEST["screen"]["default_tile_type_id"]: {"w_px": 500, "h_px": 500}},
+        "options": {"lineup_type": "rgb"},
+    }
+    with pytest.raises(ValueError, match="lineup_type must be one of") as exc_info:
+        parse_render_request(request)
+    assert not isinstance(exc_info.value, CanvasTooLarge)
+    with pytest.raises(CanvasTooLarge):
+        parse_render_request({**request, "options": {"lineup_type": "RGB"}})
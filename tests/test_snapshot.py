@@ -0,0 +1,53 @@
+import pytest
+
+from src.lineup.loadtest import generate_lineup_colors_csv, generate_screen_notes_csv
+from src.lineup.snapshot import (
+    SnapshotError,
+    build_snapshot,
+    decode_snapshot,
+    encode_snapshot,
+    open_show,
+    snapshot_path,
+)
+
+
+def test_snapshot_round_trips_and_rejects_damage():
+    snap = build_snapshot(
+        "https://docs.google.com/spreadsheets/d/abc/edit",
+        generate_screen_notes_csv(40, half_row_ratio=0.3, seed=3),
+        generate_lineup_colors_csv(6, seed=3),
+        sheet_name="Main",
+        colors_source="https://docs.google.com/spreadsheets/d/abc/edit",
+    )
+    assert any(s.secondary_placement for s in snap.screens) and any(s.expected_w_px is None for s in snap.screens)
+    data = encode_snapshot(snap)
+    assert decode_snapshot(data) == snap
+
+    with pytest.raises(SnapshotError, match="checksum"):
+        decode_snapshot(data[:-1] + bytes([data[-1] ^ 1]))
+    with pytest.raises(SnapshotError, match="version"):
+        decode_snapshot(data[:8] + b"\x63\x00" + data[10:])
+    with pytest.raises(SnapshotError):
+        decode_snapshot(b"screen notes,,,\n")
+
+
+def test_open_show_uses_snapshot_and_revalidates(tmp_path):
+    csv_path = tmp_path / "show.csv"
+    csv_path.write_text(generate_screen_notes_csv(10, seed=1), encoding="utf-8")
+    snapshots = tmp_path / "snapshots"
+
+    first, revalidator = open_show(str(csv_path), snapshots)
+    assert revalidator is None and snapshot_path(snapshots, str(csv_path)).exists()
+
+    again, revalidator = open_show(str(csv_path), snapshots)
+    assert again == first
+    assert revalidator.wait(5) and revalidator.status == "fresh"
+
+    csv_path.write_text(generate_screen_notes_csv(12, seed=1), encoding="utf-8")
+    stale, revalidator = open_show(str(csv_path), snapshots)
+    assert stale == first
+    assert revalidator.wait(5) and revalidator.status == "updated"
+    assert len(revalidator.snapshot.screens) == len(first.screens) + 2
+    # The refreshed snapshot was saved, so the next open starts from it.
+    latest, _ = open_show(str(csv_path), snapshots)
+    assert latest.screens == revalidator.snapshot.screens
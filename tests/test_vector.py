@@ -0,0 +1,39 @@
+import xml.etree.ElementTree as ET
+
+from src.lineup.models import ScreenSpec, TileType
+from src.lineup.renderer import RenderOptions
+from src.lineup.vector import render_lineup_pdf, render_lineup_svg
+
+TILES = {"64x64": TileType("64x64", 64, 64)}
+SCREEN = ScreenSpec("A&B", "IMAG_L", rows=2, cols=3, default_tile_type_id="64x64",
+                    base_color_name="Teal", expected_w_px=192, expected_h_px=128)
+
+
+def test_svg_matches_raster_layout():
+    for lineup_type in ("RGB", "GreyscaleSteps", "CircleXGrid"):
+        svg = render_lineup_svg(SCREEN, TILES, RenderOptions(lineup_type=lineup_type))
+        root = ET.fromstring(svg.encode("utf-8"))
+        assert (root.get("width"), root.get("height")) == ("192", "128")
+        texts = [el.text for el in root.iter("{http://www.w3.org/2000/svg}text")]
+        assert texts[-2:] == ["A&B", "192x128"]
+        if lineup_type == "RGB":
+            assert texts[:2] == ["IMAG_L", "01"]
+            assert len(texts) == 2 * 6 + 2
+
+
+def test_pdf_is_well_formed():
+    pdf = render_lineup_pdf(SCREEN, TILES, RenderOptions(lineup_type="CircleXGrid"))
+    assert pdf.startswith(b"%PDF-1.4")
+    assert pdf.rstrip().endswith(b"%%EOF")
+    xref = int(pdf.rsplit(b"startxref\n", 1)[1].split(b"\n", 1)[0])
+    assert pdf[xref:xref + 4] == b"xref"
+    assert b"/MediaBox [0 0 192 128]" in pdf
+
+
+def test_pdf_embeds_each_font_file_once_as_a_subset():
+    pdf = render_lineup_pdf(SCREEN, TILES, RenderOptions(lineup_type="RGB"))
+    # Tile numbers, label and overlay use three sizes of the same font.
+    assert pdf.count(b"/FontFile2") <= 1
+    if b"/FontFile2" in pdf:
+        assert b"/Length1 " in pdf and b"/BaseFont /LNUPSB+" in pdf
+    assert len(pdf) < 100_000
@@ -0,0 +1,59 @@
+import shutil
+from pathlib import Path
+
+from src.lineup.renderer import RenderOptions
+from src.lineup.watch import ShowWatcher
+
+SAMPLE_CSV = Path(__file__).resolve().parents[1] / "data" / "_Screen_Notes - V1.csv"
+
+
+def test_watch_reexports_only_changed_screens(tmp_path):
+    csv_path = tmp_path / "notes.csv"
+    shutil.copy(SAMPLE_CSV, csv_path)
+    out_dir = tmp_path / "out"
+    watcher = ShowWatcher(csv_path, out_dir, RenderOptions(), "v001", debounce_s=2.0, log=lambda _: None)
+
+    assert watcher.export_changed() == 3
+    assert sorted(p.name for p in out_dir.iterdir()) == [
+        "RGB_OV_SCA_v001.png",
+        "RGB_OV_SCB_v001.png",
+        "RGB_OV_SCC_v001.png",
+    ]
+
+    # A save without edits is ignored by content hash.
+    csv_path.write_bytes(csv_path.read_bytes())
+    assert watcher.export_changed() == 0
+
+    text = csv_path.read_text(encoding="utf-8")
+    text = text.replace("House Right Screen C,SCC,Yellow", "House Right Screen C,SCC,Blue")
+    csv_path.write_text(text, encoding="utf-8")
+    assert watcher.poll(now=100.0) == 0  # change seen, debounce starts
+    assert watcher.poll(now=101.0) == 0
+    assert watcher.poll(now=102.5) == 1
+    assert watcher.poll(now=110.0) == 0
+
+
+def test_watch_logs_failed_export_and_retries(tmp_path, monkeypatch):
+    import src.lineup.watch as watch
+
+    shows = tmp_path / "shows"
+    shows.mkdir()
+    shutil.copy(SAMPLE_CSV, shows / "a.csv")
+    shutil.copy(SAMPLE_CSV, shows / "b.csv")
+    logs = []
+    watcher = ShowWatcher(shows, tmp_path / "out", RenderOptions(), "v001", log=logs.append)
+
+    real_export = watch.export_pngs_to_dir
+
+    def flaky_export(screens, tiles, opts, out_dir, version):
+        if out_dir.name == "a":
+            raise OSError("disk full")
+        return real_export(screens, tiles, opts, out_dir, version)
+
+    monkeypatch.setattr(watch, "export_pngs_to_dir", flaky_export)
+    assert watcher.export_changed() == 3
+    assert any(line.startswith("a.csv: export failed") for line in logs)
+
+    monkeypatch.setattr(watch, "export_pngs_to_dir", real_export)
+    assert watcher.export_changed() == 3
+    assert watcher.export_changed() == 0